@@ -17,6 +17,12 @@ def parse_args() -> argparse.Namespace:
         help="Directory to write outputs (agent_metrics.csv, edge_metrics.csv, summary.json)",
         default=Path("outputs"),
     )
+    parser.add_argument(
+        "--db",
+        type=Path,
+        help="SQLite database used to cache the compiled population between runs",
+        default=None,
+    )
     return parser.parse_args()
 
 
@@ -29,7 +35,7 @@ def main() -> None:
     project_root = Path(__file__).resolve().parents[1]
     sys.path.append(str(project_root))
 
-    generate_agents = import_module("smartflow.core.agents").generate_agents
+    compile_population = import_module("smartflow.core.population").compile_population
     load_floorplan = import_module("smartflow.core.floorplan").load_floorplan
     model_module = import_module("smartflow.core.model")
     SimulationConfig = model_module.SimulationConfig
@@ -41,7 +47,9 @@ def main() -> None:
     floorplan = load_floorplan(args.layout)
     scenario = load_scenario(args.scenario)
 
-    agents = generate_agents(int(scenario.get("random_seed", 0)), scenario)
+    agents = compile_population(
+        floorplan, scenario, mode="config", seed=int(scenario.get("random_seed", 0)), db_path=args.db
+    ).profiles()
     config = SimulationConfig(
         tick_seconds=float(scenario["tick_seconds"]),
         transition_window_s=float(scenario["transition_window_s"]),
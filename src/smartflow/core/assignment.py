@@ -0,0 +1,329 @@
+"""Static traffic assignment as a fast pre-run congestion estimator.
+
+A microscopic run answers "which corridors overload during this changeover?" in
+minutes; a static user-equilibrium assignment answers it approximately in well
+under a second. Every trip of a period is loaded onto the layout at once and
+route splits are iterated until no trip could switch to a cheaper route.
+
+NEA note (technique):
+    - Edge costs use the same form as `routing._edge_weight`:
+      ``c_e(x) = c0_e * (1 + alpha * r_e(x)^p)`` where ``c0_e`` is the base cost
+      (plus stairs penalty) and ``r_e`` the density ratio.
+    - A period's volume ``x`` (people) spread over the transition window at walking
+      speed ``v`` gives an average occupancy of ``x * length / (window * v)``;
+      dividing by the soft capacity ``length * width * jam`` (as in
+      `SmartFlowModel._edge_capacity_people`) gives
+      ``r_e = x / (window * v * width * jam)``, i.e. a volume-to-capacity ratio
+      directly comparable with the model's congestion map.
+    - Frank-Wolfe solves the Beckmann problem: each iteration loads all demand
+      all-or-nothing on current shortest paths (one tree per origin) and moves
+      towards it by an exact line search. MSA uses the fixed step 1/(n+1).
+    - The relative duality gap ``(sum x*c - sum y*c) / sum x*c`` bounds how far
+      the current flows are from equilibrium.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Tuple
+
+import networkx as nx
+import numpy as np
+
+from .compiled import CompiledGraph, compile_graph
+
+
+def spec_mean(spec: Any, default: float) -> float:
+    """Mean of a scenario distribution spec (number, value, uniform, normal, lognormal)."""
+
+    if spec is None:
+        return default
+    if isinstance(spec, (int, float)):
+        return float(spec)
+    if isinstance(spec, dict):
+        if "value" in spec:
+            return float(spec["value"])
+        if "uniform" in spec:
+            low, high = spec["uniform"][0], spec["uniform"][1]
+            return 0.5 * (float(low) + float(high))
+        if "normal" in spec:
+            return float(spec["normal"].get("mean", default))
+        if "lognormal" in spec:
+            params = spec["lognormal"]
+            mu, sigma = float(params.get("mean", 0.0)), float(params.get("sigma", 1.0))
+            return math.exp(mu + 0.5 * sigma * sigma)
+    return default
+
+
+def od_demand_from_scenario(
+    scenario_data: Mapping[str, Any],
+    *,
+    period_index: int = -1,
+    scale: float = 1.0,
+) -> Dict[Tuple[str, str], float]:
+    """Sum the trips implied by a scenario's ``periods[].movements`` per (origin, destination).
+
+    Standalone movements contribute ``count * scale`` trips (rounded down, like
+    `create_agents_from_scenario`); each chained movement contributes one trip per chain.
+
+    Args:
+        scenario_data: Scenario dictionary.
+        period_index: If >= 0, only this period is included.
+        scale: Population scaling factor.
+    """
+
+    periods = list(scenario_data.get("periods", []))
+    if period_index >= 0:
+        periods = periods[period_index : period_index + 1]
+
+    demand: Dict[Tuple[str, str], float] = {}
+    for period in periods:
+        for move in period.get("movements", []):
+            origin, destination = move.get("origin"), move.get("destination")
+            if origin is None or destination is None or origin == destination:
+                continue
+            trips = 1 if move.get("chain_id") else int(move.get("count", 1) * scale)
+            if trips > 0:
+                key = (str(origin), str(destination))
+                demand[key] = demand.get(key, 0.0) + float(trips)
+    return demand
+
+
+@dataclass(frozen=True)
+class AssignmentResult:
+    """Equilibrium edge volumes and ratios for one demand matrix."""
+
+    # Trips per edge over the period, keyed by (u, v).
+    volumes: Dict[Tuple[str, str], float]
+    # Volume-to-capacity (density) ratios per edge, comparable with `SmartFlowModel.congestion_map`.
+    ratios: Dict[Tuple[str, str], float]
+    # Equilibrium cost per edge (same units as routing costs).
+    costs: Dict[Tuple[str, str], float]
+    relative_gap: float
+    iterations: int
+    # OD pairs whose endpoints are missing or disconnected (their demand is dropped).
+    unassigned: Tuple[Tuple[str, str], ...]
+
+    def overloaded(self, threshold: float = 1.0) -> List[Tuple[Tuple[str, str], float]]:
+        """Edges with ratio >= `threshold`, most loaded first."""
+
+        hot = [(key, r) for key, r in self.ratios.items() if r >= threshold]
+        hot.sort(key=lambda item: item[1], reverse=True)
+        return hot
+
+
+def _shortest_path_tree(compiled: CompiledGraph, costs: List[float], source: int) -> Tuple[List[int], List[int]]:
+    """Dijkstra tree from `source` as (via-edge per node, nodes in settle order)."""
+
+    adjacency = compiled.out_adjacency
+    dist = [math.inf] * compiled.node_count
+    via = [-1] * compiled.node_count
+    dist[source] = 0.0
+    order: List[int] = []
+    heap = [(0.0, source)]
+    while heap:
+        d, n = heapq.heappop(heap)
+        if d > dist[n]:
+            continue
+        order.append(n)
+        for e, m in adjacency[n]:
+            nd = d + costs[e]
+            if nd < dist[m]:
+                dist[m] = nd
+                via[m] = e
+                heapq.heappush(heap, (nd, m))
+    return via, order
+
+
+def _all_or_nothing(
+    compiled: CompiledGraph,
+    costs: np.ndarray,
+    demand: Mapping[int, List[Tuple[int, float]]],
+) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+    """Load every OD flow onto its current shortest path (one tree per origin)."""
+
+    flows = np.zeros(compiled.edge_count, dtype=float)
+    cost_l = costs.tolist()
+    src = compiled.edge_src.tolist()
+    missing: List[Tuple[int, int]] = []
+    node_load = [0.0] * compiled.node_count
+    for origin, targets in demand.items():
+        via, order = _shortest_path_tree(compiled, cost_l, origin)
+        for target, trips in targets:
+            if via[target] < 0:
+                missing.append((origin, target))
+                continue
+            node_load[target] += trips
+        # Push loads up the tree: children are settled after their parents.
+        for n in reversed(order):
+            load = node_load[n]
+            if load and n != origin:
+                e = via[n]
+                flows[e] += load
+                node_load[src[e]] += load
+            node_load[n] = 0.0
+    return flows, missing
+
+
+def _line_search(
+    x: np.ndarray,
+    y: np.ndarray,
+    base: np.ndarray,
+    k: np.ndarray,
+    alpha: float,
+    p: float,
+) -> float:
+    """Exact Frank-Wolfe step: root of ``sum (y - x) * c(x + s(y - x))`` on [0, 1] by bisection."""
+
+    direction = y - x
+
+    def slope(step: float) -> float:
+        flow = x + step * direction
+        return float(np.dot(direction, base * (1.0 + alpha * (k * flow) ** p)))
+
+    if slope(1.0) <= 0.0:
+        return 1.0
+    lo, hi = 0.0, 1.0
+    for _ in range(40):
+        mid = 0.5 * (lo + hi)
+        if slope(mid) > 0.0:
+            hi = mid
+        else:
+            lo = mid
+    return 0.5 * (lo + hi)
+
+
+def static_assignment(
+    graph: nx.DiGraph,
+    demand: Mapping[Tuple[str, str], float],
+    *,
+    window_s: float,
+    stairs_penalty: float = 0.0,
+    congestion_alpha: float = 1.0,
+    congestion_p: float = 2.0,
+    jam_density_ppm2: float = 2.5,
+    walking_speed_mps: float = 1.35,
+    method: str = "frank_wolfe",
+    max_iterations: int = 50,
+    tolerance: float = 1e-3,
+) -> AssignmentResult:
+    """Solve a static user-equilibrium assignment of `demand` over `graph`.
+
+    Args:
+        graph: Layout graph (as produced by `FloorPlan.to_networkx`).
+        demand: Trips per (origin, destination) over one transition window.
+        window_s: Length of the window the trips are spread over.
+        stairs_penalty: Additive stairs cost (use the population mean).
+        congestion_alpha: Congestion strength, as in `SimulationConfig`.
+        congestion_p: Congestion exponent, as in `SimulationConfig`.
+        jam_density_ppm2: Density that maps to ratio 1.0, as in `SimulationConfig`.
+        walking_speed_mps: Mean free-flow walking speed.
+        method: ``"frank_wolfe"`` (exact line search) or ``"msa"`` (step 1/(n+1)).
+        max_iterations: Iteration cap.
+        tolerance: Stop once the relative gap falls below this.
+
+    Raises:
+        ValueError: On a non-positive window, speed or jam density, a negative stairs
+            penalty or congestion strength, or an unknown method.
+    """
+
+    if window_s <= 0 or walking_speed_mps <= 0 or jam_density_ppm2 <= 0:
+        raise ValueError("window_s, walking_speed_mps and jam_density_ppm2 must be positive")
+    if stairs_penalty < 0 or congestion_alpha < 0:
+        raise ValueError("stairs_penalty and congestion_alpha cannot be negative")
+    if method not in ("frank_wolfe", "msa"):
+        raise ValueError(f"Unknown assignment method: {method!r}")
+
+    compiled = compile_graph(graph)
+    index = compiled.node_index
+    by_origin: Dict[int, List[Tuple[int, float]]] = {}
+    unassigned: List[Tuple[str, str]] = []
+    for (origin, destination), trips in demand.items():
+        o, d = index.get(str(origin)), index.get(str(destination))
+        if o is None or d is None:
+            unassigned.append((str(origin), str(destination)))
+            continue
+        if trips > 0 and o != d:
+            by_origin.setdefault(o, []).append((d, float(trips)))
+
+    base = compiled.edge_costs(stairs_penalty=stairs_penalty)
+    k = 1.0 / (float(window_s) * float(walking_speed_mps) * np.maximum(compiled.width_m, 0.1) * float(jam_density_ppm2))
+    alpha = float(congestion_alpha)
+    p = max(0.1, float(congestion_p))
+
+    def cost_of(flow: np.ndarray) -> np.ndarray:
+        return base * (1.0 + alpha * (k * flow) ** p)
+
+    x, missing = _all_or_nothing(compiled, base, by_origin)
+    ids = compiled.node_ids
+    unassigned.extend((ids[o], ids[d]) for o, d in missing)
+
+    gap = 0.0
+    iterations = 0
+    if alpha > 0.0:
+        for iterations in range(1, max(1, int(max_iterations)) + 1):
+            costs = cost_of(x)
+            y, _ = _all_or_nothing(compiled, costs, by_origin)
+            total = float(np.dot(x, costs))
+            gap = (total - float(np.dot(y, costs))) / total if total > 0 else 0.0
+            if gap < tolerance:
+                break
+            if method == "msa":
+                step = 1.0 / (iterations + 1)
+            else:
+                step = _line_search(x, y, base, k, alpha, p)
+            x = x + step * (y - x)
+
+    keys = compiled.edge_keys
+    final = cost_of(x)
+    ratio = k * x
+    return AssignmentResult(
+        volumes={keys[e]: float(x[e]) for e in range(compiled.edge_count)},
+        ratios={keys[e]: float(ratio[e]) for e in range(compiled.edge_count)},
+        costs={keys[e]: float(final[e]) for e in range(compiled.edge_count)},
+        relative_gap=max(0.0, gap),
+        iterations=iterations,
+        unassigned=tuple(unassigned),
+    )
+
+
+def assign_scenario(
+    graph: nx.DiGraph,
+    scenario_data: Mapping[str, Any],
+    *,
+    period_index: int = -1,
+    scale: float = 1.0,
+    congestion_alpha: float = 1.0,
+    congestion_p: float = 2.0,
+    jam_density_ppm2: float = 2.5,
+    **kwargs: Any,
+) -> AssignmentResult:
+    """Run `static_assignment` for a scenario's movements.
+
+    The window, walking speed and stairs penalty default to the scenario's
+    ``transition_window_s`` and the means of its ``behaviour`` distributions (with the
+    same fallbacks as `create_agents_from_scenario`).
+    """
+
+    behaviour = scenario_data.get("behaviour", {}) or {}
+    window_s = float(
+        scenario_data.get("transition_window_s")
+        or scenario_data.get("transition_window")
+        or behaviour.get("transition_window_s")
+        or 300.0
+    )
+    kwargs.setdefault("walking_speed_mps", spec_mean(behaviour.get("speed_base_mps"), 1.35))
+    kwargs.setdefault(
+        "stairs_penalty", max(0.0, spec_mean((behaviour.get("stairs_penalty") or {}).get("student"), 0.5))
+    )
+    return static_assignment(
+        graph,
+        od_demand_from_scenario(scenario_data, period_index=period_index, scale=scale),
+        window_s=window_s,
+        congestion_alpha=congestion_alpha,
+        congestion_p=congestion_p,
+        jam_density_ppm2=jam_density_ppm2,
+        **kwargs,
+    )
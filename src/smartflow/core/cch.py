@@ -0,0 +1,382 @@
+"""Customizable contraction hierarchy (CCH) over the compiled layout graph.
+
+Congestion-aware routing changes edge weights every tick, which defeats
+classic preprocessing. A CCH splits the work in two:
+
+    1. *Structure* (metric independent, once per layout): order the nodes,
+       eliminate them in that order and record the resulting shortcut arcs and
+       lower triangles.
+    2. *Customization* (per metric): push edge costs up through the triangles.
+       This is a handful of vectorised NumPy passes, so a new congestion map is
+       applied in milliseconds.
+
+Queries then only scan the elimination-tree ancestors of the origin and the
+destination (no priority queue).
+
+NEA note (technique):
+    - Ordering uses greedy minimum-degree elimination, which keeps fill-in small on
+      corridor-style layouts (long chains joined by a few junctions and stairs).
+    - Triangles are grouped by elimination-tree height. All triangles in one group
+      are independent, so each group is a single `np.minimum.at`.
+    - Shortcuts are unpacked lazily by finding the triangle (or original edge)
+      that produced their weight, so customization stores no middle nodes.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+import networkx as nx
+import numpy as np
+
+from .compiled import CompiledGraph, compile_graph
+
+
+def _min_degree_order(node_count: int, neighbours: List[set]) -> List[int]:
+    """Greedy minimum-degree elimination order (with fill-in) on an undirected graph."""
+
+    adj = [set(n) for n in neighbours]
+    heap = [(len(adj[v]), v) for v in range(node_count)]
+    heapq.heapify(heap)
+    eliminated = [False] * node_count
+    order: List[int] = []
+    while heap:
+        deg, v = heapq.heappop(heap)
+        if eliminated[v] or deg != len(adj[v]):
+            continue
+        eliminated[v] = True
+        order.append(v)
+        nbrs = list(adj[v])
+        for u in nbrs:
+            adj[u].discard(v)
+        for i, u in enumerate(nbrs):
+            for w in nbrs[i + 1 :]:
+                if w not in adj[u]:
+                    adj[u].add(w)
+                    adj[w].add(u)
+        for u in nbrs:
+            heapq.heappush(heap, (len(adj[u]), u))
+    return order
+
+
+@dataclass(frozen=True)
+class CCHStructure:
+    """Metric-independent part of a CCH for one layout."""
+
+    compiled: CompiledGraph
+    rank: np.ndarray
+    # Arcs of the chordal supergraph, each stored once as (lo, hi) with rank[lo] < rank[hi].
+    arc_lo: np.ndarray
+    arc_hi: np.ndarray
+    # Original edge index for lo -> hi / hi -> lo (-1 if the arc is a pure shortcut).
+    arc_edge_up: np.ndarray
+    arc_edge_down: np.ndarray
+    # Upward adjacency: per node, (higher neighbour, arc index).
+    upward: Tuple[Tuple[Tuple[int, int], ...], ...]
+    # Elimination-tree parent (lowest-ranked upper neighbour, -1 for roots).
+    parent: Tuple[int, ...]
+    # Lower triangles (v < u < w) as arc indices: (v,u), (v,w) and the top arc (u,w).
+    tri_low: np.ndarray
+    tri_high: np.ndarray
+    tri_top: np.ndarray
+    # Triangle batches by elimination-tree height (independent within a batch).
+    level_ptr: np.ndarray
+    # Triangles grouped by top arc (for unpacking): indices into tri_* arrays.
+    top_ptr: np.ndarray
+    top_tris: np.ndarray
+
+    @property
+    def arc_count(self) -> int:
+        return int(self.arc_lo.shape[0])
+
+    def customize(self, edge_costs: np.ndarray) -> "CCHMetric":
+        """Apply per-edge costs (aligned with the compiled graph) to all shortcut arcs."""
+
+        costs = np.asarray(edge_costs, dtype=float)
+        up = np.full(self.arc_count, np.inf)
+        down = np.full(self.arc_count, np.inf)
+        has_up = self.arc_edge_up >= 0
+        has_down = self.arc_edge_down >= 0
+        up[has_up] = costs[self.arc_edge_up[has_up]]
+        down[has_down] = costs[self.arc_edge_down[has_down]]
+
+        ptr = self.level_ptr
+        for level in range(len(ptr) - 1):
+            sl = slice(int(ptr[level]), int(ptr[level + 1]))
+            low, high, top = self.tri_low[sl], self.tri_high[sl], self.tri_top[sl]
+            # u -> v -> w and w -> v -> u, where v is the bottom node of the triangle.
+            np.minimum.at(up, top, down[low] + up[high])
+            np.minimum.at(down, top, down[high] + up[low])
+        return CCHMetric(structure=self, edge_costs=costs, up=up, down=down)
+
+
+@dataclass(frozen=True)
+class CCHMetric:
+    """A customized CCH: shortcut weights for one set of edge costs."""
+
+    structure: CCHStructure
+    edge_costs: np.ndarray
+    up: np.ndarray
+    down: np.ndarray
+
+    def _upward_search(self, source: int, weights: np.ndarray) -> Tuple[Dict[int, float], Dict[int, int]]:
+        upward = self.structure.upward
+        parent = self.structure.parent
+        w = weights.tolist() if isinstance(weights, np.ndarray) else weights
+        dist: Dict[int, float] = {source: 0.0}
+        via: Dict[int, int] = {}
+        node = source
+        while node >= 0:
+            d = dist.get(node, math.inf)
+            if d < math.inf:
+                for hi, arc in upward[node]:
+                    nd = d + w[arc]
+                    if nd < dist.get(hi, math.inf):
+                        dist[hi] = nd
+                        via[hi] = arc
+            node = parent[node]
+        return dist, via
+
+    def _unpack(self, arc: int, upward: bool, out: List[int]) -> None:
+        """Append the original edges of arc `arc` (lo -> hi if `upward`) to `out`."""
+
+        s = self.structure
+        stack = [(arc, upward)]
+        while stack:
+            a, is_up = stack.pop()
+            weight = self.up[a] if is_up else self.down[a]
+            edge = int(s.arc_edge_up[a] if is_up else s.arc_edge_down[a])
+            if edge >= 0 and math.isclose(float(self.edge_costs[edge]), float(weight), rel_tol=1e-12, abs_tol=1e-12):
+                out.append(edge)
+                continue
+            tris = s.top_tris[s.top_ptr[a] : s.top_ptr[a + 1]]
+            low, high = s.tri_low[tris], s.tri_high[tris]
+            if is_up:
+                # lo -> v (down on (v, lo)) then v -> hi (up on (v, hi)).
+                sums = self.down[low] + self.up[high]
+                best = int(np.argmin(np.abs(sums - weight)))
+                first, second = (int(low[best]), False), (int(high[best]), True)
+            else:
+                # hi -> v (down on (v, hi)) then v -> lo (up on (v, lo)).
+                sums = self.down[high] + self.up[low]
+                best = int(np.argmin(np.abs(sums - weight)))
+                first, second = (int(high[best]), False), (int(low[best]), True)
+            # Stack is LIFO: push the second half first.
+            stack.append(second)
+            stack.append(first)
+
+    def shortest_path_edges(self, source: int, target: int) -> Tuple[float, List[int]] | None:
+        """Exact shortest path between node indices as (cost, edge indices), or None."""
+
+        if source == target:
+            return 0.0, []
+        fwd, fwd_via = self._upward_search(source, self.up)
+        bwd, bwd_via = self._upward_search(target, self.down)
+
+        best = math.inf
+        meet = -1
+        for node, d in fwd.items():
+            total = d + bwd.get(node, math.inf)
+            if total < best:
+                best, meet = total, node
+        if meet < 0:
+            return None
+
+        s = self.structure
+        arcs_up: List[int] = []
+        node = meet
+        while node != source:
+            arc = fwd_via[node]
+            arcs_up.append(arc)
+            node = int(s.arc_lo[arc])
+        edges: List[int] = []
+        for arc in reversed(arcs_up):
+            self._unpack(arc, True, edges)
+        node = meet
+        while node != target:
+            arc = bwd_via[node]
+            self._unpack(arc, False, edges)
+            node = int(s.arc_lo[arc])
+        return best, edges
+
+    def shortest_path(self, source: str, target: str) -> List[str]:
+        """Exact shortest node path (raises like `nx.shortest_path`)."""
+
+        compiled = self.structure.compiled
+        index = compiled.node_index
+        for node in (source, target):
+            if str(node) not in index:
+                raise nx.NodeNotFound(f"Node {node} not in graph")
+        found = self.shortest_path_edges(index[str(source)], index[str(target)])
+        if found is None:
+            raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+        path = [str(source)]
+        path.extend(compiled.node_ids[int(compiled.edge_dst[e])] for e in found[1])
+        return path
+
+
+def build_cch(graph: nx.DiGraph) -> CCHStructure:
+    """Compute the metric-independent CCH structure for a layout graph."""
+
+    compiled = compile_graph(graph)
+    n = compiled.node_count
+    src = compiled.edge_src.tolist()
+    dst = compiled.edge_dst.tolist()
+
+    neighbours: List[set] = [set() for _ in range(n)]
+    for u, v in zip(src, dst):
+        if u != v:
+            neighbours[u].add(v)
+            neighbours[v].add(u)
+
+    order = _min_degree_order(n, neighbours)
+    rank = [0] * n
+    for r, v in enumerate(order):
+        rank[v] = r
+
+    # Chordal completion: eliminating v turns its higher neighbours into a clique.
+    upper: List[set] = [set() for _ in range(n)]
+    for v in range(n):
+        for u in neighbours[v]:
+            if rank[u] > rank[v]:
+                upper[v].add(u)
+    for v in order:
+        ups = sorted(upper[v], key=rank.__getitem__)
+        for i, u in enumerate(ups):
+            upper[u].update(ups[i + 1 :])
+
+    arc_index: Dict[Tuple[int, int], int] = {}
+    arc_lo: List[int] = []
+    arc_hi: List[int] = []
+    for v in order:
+        for u in sorted(upper[v], key=rank.__getitem__):
+            arc_index[(v, u)] = len(arc_lo)
+            arc_lo.append(v)
+            arc_hi.append(u)
+
+    edge_up = [-1] * len(arc_lo)
+    edge_down = [-1] * len(arc_lo)
+    for e, (u, v) in enumerate(zip(src, dst)):
+        if u == v:
+            continue
+        if rank[u] < rank[v]:
+            edge_up[arc_index[(u, v)]] = e
+        else:
+            edge_down[arc_index[(v, u)]] = e
+
+    parent = [-1] * n
+    for v in range(n):
+        if upper[v]:
+            parent[v] = min(upper[v], key=rank.__getitem__)
+
+    # Elimination-tree height: triangles at a node only depend on arcs finalised below it.
+    height = [0] * n
+    for v in order:
+        p = parent[v]
+        if p >= 0:
+            height[p] = max(height[p], height[v] + 1)
+
+    tri_low: List[int] = []
+    tri_high: List[int] = []
+    tri_top: List[int] = []
+    tri_level: List[int] = []
+    for v in order:
+        ups = sorted(upper[v], key=rank.__getitem__)
+        for i, u in enumerate(ups):
+            for w in ups[i + 1 :]:
+                tri_low.append(arc_index[(v, u)])
+                tri_high.append(arc_index[(v, w)])
+                tri_top.append(arc_index[(u, w)])
+                tri_level.append(height[v])
+
+    levels = np.asarray(tri_level, dtype=np.int64)
+    by_level = np.argsort(levels, kind="stable")
+    low_arr = np.asarray(tri_low, dtype=np.int64)[by_level]
+    high_arr = np.asarray(tri_high, dtype=np.int64)[by_level]
+    top_arr = np.asarray(tri_top, dtype=np.int64)[by_level]
+    level_counts = np.bincount(levels, minlength=(max(height) + 1) if n else 0) if len(levels) else np.zeros(0, dtype=np.int64)
+    level_ptr = np.zeros(len(level_counts) + 1, dtype=np.int64)
+    np.cumsum(level_counts, out=level_ptr[1:])
+
+    by_top = np.argsort(top_arr, kind="stable").astype(np.int64)
+    top_ptr = np.zeros(len(arc_lo) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(top_arr, minlength=len(arc_lo)), out=top_ptr[1:])
+
+    upward = tuple(
+        tuple((arc_hi[a], a) for a in (arc_index[(v, u)] for u in sorted(upper[v], key=rank.__getitem__)))
+        for v in range(n)
+    )
+
+    return CCHStructure(
+        compiled=compiled,
+        rank=np.asarray(rank, dtype=np.int64),
+        arc_lo=np.asarray(arc_lo, dtype=np.int64),
+        arc_hi=np.asarray(arc_hi, dtype=np.int64),
+        arc_edge_up=np.asarray(edge_up, dtype=np.int64),
+        arc_edge_down=np.asarray(edge_down, dtype=np.int64),
+        upward=upward,
+        parent=tuple(parent),
+        tri_low=low_arr,
+        tri_high=high_arr,
+        tri_top=top_arr,
+        level_ptr=level_ptr,
+        top_ptr=top_ptr,
+        top_tris=by_top,
+    )
+
+
+# CCH structures keyed by layout hash (metric independent, so one per layout).
+_CCH_CACHE: Dict[str, CCHStructure] = {}
+_CCH_CACHE_MAX = 8
+
+
+def cch_structure(graph: nx.DiGraph) -> CCHStructure:
+    """Return the (cached) CCH structure for a layout graph."""
+
+    compiled = compile_graph(graph)
+    cached = _CCH_CACHE.get(compiled.layout_hash)
+    if cached is not None:
+        return cached
+    structure = build_cch(graph)
+    if len(_CCH_CACHE) >= _CCH_CACHE_MAX:
+        _CCH_CACHE.pop(next(iter(_CCH_CACHE)))
+    _CCH_CACHE[compiled.layout_hash] = structure
+    return structure
+
+
+def customize_cch(
+    graph: nx.DiGraph,
+    *,
+    stairs_penalty: float = 0.0,
+    congestion_map: Mapping[Tuple[str, str], float] | None = None,
+    congestion_alpha: float = 0.0,
+    congestion_p: float = 1.0,
+    closed: Iterable[Tuple[str, str]] = (),
+    closed_penalty: float = 0.0,
+) -> CCHMetric:
+    """Customize the layout's CCH with the `routing._edge_weight` cost formula.
+
+    `closed` edges get `closed_penalty` added (see `routing.CLOSED_EDGE_PENALTY`).
+
+    Raises:
+        ValueError: If the resulting costs would be negative.
+    """
+
+    structure = cch_structure(graph)
+    compiled = structure.compiled
+    costs = compiled.edge_costs(
+        stairs_penalty=stairs_penalty,
+        congestion=compiled.congestion_array(congestion_map),
+        congestion_alpha=congestion_alpha,
+        congestion_p=congestion_p,
+    )
+    for key in closed:
+        i = compiled.edge_index.get(key)
+        if i is not None:
+            costs[i] += float(closed_penalty)
+    if costs.size and float(costs.min()) < 0.0:
+        raise ValueError("CCH routing requires non-negative edge costs")
+    return structure.customize(costs)
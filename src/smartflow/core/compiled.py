@@ -0,0 +1,335 @@
+"""Array-backed view of a layout graph.
+
+NetworkX is convenient for building and editing layouts, but per-edge attribute
+lookups are slow in hot loops (heuristics, path re-costing, analytics). This
+module compiles a `nx.DiGraph` into flat NumPy arrays with stable integer
+indices so those loops can be vectorised.
+
+NEA note (technique):
+    - Nodes and edges get dense integer indices (insertion order, deterministic).
+    - A content hash of the routing-relevant attributes (`layout_hash`) lets
+      expensive derived tables be cached and shared between runs on the same layout.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import math
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+
+# Key used to memoise the compiled form on the graph object itself (`graph.graph`).
+_GRAPH_ATTR = "_smartflow_compiled"
+
+
+@dataclass(frozen=True)
+class CompiledGraph:
+    """Immutable, index-based snapshot of a directed layout graph."""
+
+    layout_hash: str
+    node_ids: Tuple[str, ...]
+    node_index: Dict[str, int]
+    edge_keys: Tuple[Tuple[str, str], ...]
+    edge_index: Dict[Tuple[str, str], int]
+    edge_ids: Tuple[str, ...]
+    edge_src: np.ndarray
+    edge_dst: np.ndarray
+    length_m: np.ndarray
+    width_m: np.ndarray
+    is_stairs: np.ndarray
+    base_cost: np.ndarray
+    # CSR adjacency over outgoing edges: edges of node i are out_edges[out_ptr[i]:out_ptr[i+1]].
+    out_ptr: np.ndarray
+    out_edges: np.ndarray
+    # CSR adjacency over incoming edges (same layout, keyed by edge_dst).
+    in_ptr: np.ndarray
+    in_edges: np.ndarray
+
+    @cached_property
+    def out_adjacency(self) -> List[List[Tuple[int, int]]]:
+        """Plain-Python `(edge_index, dst_node)` lists per node, for heap-based searches."""
+
+        return _adjacency_lists(self.out_ptr, self.out_edges, self.edge_dst)
+
+    @cached_property
+    def in_adjacency(self) -> List[List[Tuple[int, int]]]:
+        """Plain-Python `(edge_index, src_node)` lists per node (reverse searches)."""
+
+        return _adjacency_lists(self.in_ptr, self.in_edges, self.edge_src)
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.edge_keys)
+
+    def edge_costs(
+        self,
+        *,
+        stairs_penalty: float = 0.0,
+        congestion: np.ndarray | None = None,
+        congestion_alpha: float = 0.0,
+        congestion_p: float = 1.0,
+    ) -> np.ndarray:
+        """Vectorised equivalent of `routing._edge_weight` for every edge.
+
+        Args:
+            stairs_penalty: Additive penalty on stairs edges.
+            congestion: Optional per-edge density ratios aligned with `edge_keys`.
+            congestion_alpha: Strength of congestion penalty. 0 disables congestion.
+            congestion_p: Exponent controlling how sharply costs rise.
+        """
+
+        costs = self.base_cost + np.where(self.is_stairs, float(stairs_penalty), 0.0)
+        alpha = max(0.0, float(congestion_alpha))
+        if congestion is not None and alpha > 0.0:
+            ratio = np.maximum(0.0, np.asarray(congestion, dtype=float))
+            p = max(0.1, float(congestion_p))
+            costs = np.where(ratio > 0.0, costs * (1.0 + alpha * ratio**p), costs)
+        return costs
+
+    def congestion_array(self, congestion_map: Mapping[Tuple[str, str], float] | None) -> np.ndarray | None:
+        """Convert a `(u, v) -> ratio` mapping into an array aligned with `edge_keys`."""
+
+        if congestion_map is None:
+            return None
+        out = np.zeros(self.edge_count, dtype=float)
+        index = self.edge_index
+        for key, ratio in congestion_map.items():
+            i = index.get(key)
+            if i is not None:
+                out[i] = float(ratio)
+        return out
+
+    def path_edge_indices(self, path: Sequence[str]) -> np.ndarray | None:
+        """Return the edge indices traversed by a node path (None if inconsistent)."""
+
+        index = self.edge_index
+        out = np.empty(max(0, len(path) - 1), dtype=np.int64)
+        for i in range(len(path) - 1):
+            e = index.get((path[i], path[i + 1]))
+            if e is None:
+                return None
+            out[i] = e
+        return out
+
+
+def graph_signature(graph: nx.DiGraph) -> str:
+    """Return a SHA-256 hash of the routing-relevant content of a graph.
+
+    Two graphs with the same nodes, edges and edge geometry produce the same
+    signature regardless of construction order.
+    """
+
+    h = hashlib.sha256()
+    for n in sorted(str(n) for n in graph.nodes):
+        h.update(n.encode("utf-8"))
+        h.update(b"\x00")
+    h.update(b"\x01")
+    rows = []
+    for u, v, data in graph.edges(data=True):
+        rows.append(
+            (
+                str(u),
+                str(v),
+                repr(float(data.get("length_m", 1.0))),
+                repr(float(data.get("width_m", 1.0))),
+                "1" if data.get("is_stairs", False) else "0",
+            )
+        )
+    for row in sorted(rows):
+        h.update("|".join(row).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def compile_graph(graph: nx.DiGraph) -> CompiledGraph:
+    """Compile (or fetch the memoised compilation of) a layout graph.
+
+    The result is memoised on `graph.graph`. Adding or removing nodes/edges is
+    detected automatically; callers that edit edge attributes in place must call
+    `invalidate_compiled` afterwards.
+    """
+
+    shape = (graph.number_of_nodes(), graph.number_of_edges())
+    cached = graph.graph.get(_GRAPH_ATTR)
+    if cached is not None and cached[0] == shape:
+        return cached[1]
+
+    node_ids = tuple(str(n) for n in graph.nodes)
+    node_index = {n: i for i, n in enumerate(node_ids)}
+
+    edge_keys = []
+    edge_ids = []
+    lengths = []
+    widths = []
+    stairs = []
+    for u, v, data in graph.edges(data=True):
+        su, sv = str(u), str(v)
+        edge_keys.append((su, sv))
+        edge_ids.append(str(data.get("id", f"{su}->{sv}")))
+        lengths.append(float(data.get("length_m", 1.0)))
+        widths.append(float(data.get("width_m", 1.0)))
+        stairs.append(bool(data.get("is_stairs", False)))
+
+    src = np.fromiter((node_index[u] for u, _ in edge_keys), dtype=np.int64, count=len(edge_keys))
+    dst = np.fromiter((node_index[v] for _, v in edge_keys), dtype=np.int64, count=len(edge_keys))
+    length_arr = np.asarray(lengths, dtype=float)
+    width_arr = np.asarray(widths, dtype=float)
+
+    out_ptr, out_edges = _csr(src, len(node_ids))
+    in_ptr, in_edges = _csr(dst, len(node_ids))
+
+    compiled = CompiledGraph(
+        layout_hash=graph_signature(graph),
+        node_ids=node_ids,
+        node_index=node_index,
+        edge_keys=tuple(edge_keys),
+        edge_index={k: i for i, k in enumerate(edge_keys)},
+        edge_ids=tuple(edge_ids),
+        edge_src=src,
+        edge_dst=dst,
+        length_m=length_arr,
+        width_m=width_arr,
+        is_stairs=np.asarray(stairs, dtype=bool),
+        base_cost=length_arr / np.maximum(width_arr, 0.1),
+        out_ptr=out_ptr,
+        out_edges=out_edges,
+        in_ptr=in_ptr,
+        in_edges=in_edges,
+    )
+    graph.graph[_GRAPH_ATTR] = (shape, compiled)
+    return compiled
+
+
+def _adjacency_lists(ptr: np.ndarray, edges: np.ndarray, other: np.ndarray) -> List[List[Tuple[int, int]]]:
+    ptr_l = ptr.tolist()
+    edges_l = edges.tolist()
+    other_l = other.tolist()
+    return [
+        [(e, other_l[e]) for e in edges_l[ptr_l[n] : ptr_l[n + 1]]]
+        for n in range(len(ptr_l) - 1)
+    ]
+
+
+def _csr(keys: np.ndarray, node_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Group edge indices by `keys` into (indptr, edge_indices) CSR arrays."""
+
+    order = np.argsort(keys, kind="stable").astype(np.int64)
+    counts = np.bincount(keys, minlength=node_count)
+    ptr = np.zeros(node_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=ptr[1:])
+    return ptr, order
+
+
+def dijkstra_distances(
+    compiled: CompiledGraph,
+    costs: np.ndarray,
+    source: int,
+    *,
+    reverse: bool = False,
+    limit: float = math.inf,
+) -> np.ndarray:
+    """Single-source shortest-path distances over the compiled graph.
+
+    Args:
+        compiled: Compiled layout graph.
+        costs: Per-edge non-negative costs aligned with `edge_keys`.
+        source: Source node index.
+        reverse: If True, follow edges backwards (distances *to* `source`).
+        limit: Stop once every node within this distance is settled. Distances
+            beyond it are ``inf`` or an upper bound greater than `limit`.
+
+    Returns:
+        Array of distances (``inf`` where unreachable).
+    """
+
+    adjacency = compiled.in_adjacency if reverse else compiled.out_adjacency
+    cost_l = costs.tolist()
+
+    dist = [math.inf] * compiled.node_count
+    dist[source] = 0.0
+    heap = [(0.0, int(source))]
+    while heap:
+        d, n = heapq.heappop(heap)
+        if d > limit:
+            break
+        if d > dist[n]:
+            continue
+        for e, m in adjacency[n]:
+            nd = d + cost_l[e]
+            if nd < dist[m]:
+                dist[m] = nd
+                heapq.heappush(heap, (nd, m))
+    return np.asarray(dist, dtype=float)
+
+
+def shortest_path_edges(
+    compiled: CompiledGraph,
+    costs: np.ndarray,
+    source: int,
+    target: int,
+) -> List[int] | None:
+    """Point-to-point Dijkstra returning the edge indices of a shortest path.
+
+    Stops as soon as `target` is settled. Returns None if `target` is unreachable.
+    """
+
+    adjacency = compiled.out_adjacency
+    cost_l = costs.tolist() if isinstance(costs, np.ndarray) else list(costs)
+
+    dist = {source: 0.0}
+    via: Dict[int, int] = {}
+    done = set()
+    heap = [(0.0, int(source))]
+    while heap:
+        d, n = heapq.heappop(heap)
+        if n in done:
+            continue
+        done.add(n)
+        if n == target:
+            break
+        for e, m in adjacency[n]:
+            nd = d + cost_l[e]
+            if nd < dist.get(m, math.inf):
+                dist[m] = nd
+                via[m] = e
+                heapq.heappush(heap, (nd, m))
+
+    if target not in done:
+        return None
+    src = compiled.edge_src
+    path: List[int] = []
+    node = target
+    while node != source:
+        e = via[node]
+        path.append(e)
+        node = int(src[e])
+    path.reverse()
+    return path
+
+
+def attach_compiled(graph: nx.DiGraph, compiled: CompiledGraph) -> None:
+    """Memoise a previously built compilation on a graph with identical content.
+
+    Used by the layout cache; the caller guarantees `graph` was built from the same
+    layout (same node/edge order) as `compiled`.
+    """
+
+    shape = (graph.number_of_nodes(), graph.number_of_edges())
+    if shape != (compiled.node_count, compiled.edge_count):
+        raise ValueError("Compiled layout does not match the graph")
+    graph.graph[_GRAPH_ATTR] = (shape, compiled)
+
+
+def invalidate_compiled(graph: nx.DiGraph) -> None:
+    """Drop any memoised compilation stored on `graph`."""
+
+    graph.graph.pop(_GRAPH_ATTR, None)
@@ -1,14 +1,34 @@
-"""Floor plan loading and validation utilities."""
+"""Floor plan loading and validation utilities.
+
+NEA note (technique):
+    Parsing, validating and compiling a large campus layout is repeated on every
+    run. `load_floorplan` therefore keeps a compiled artefact (validated node/edge
+    rows plus the `CompiledGraph` arrays, CSR adjacency and layout hash) in a binary
+    sidecar next to the JSON, and reuses it while the source's SHA-256 matches.
+    The file is only re-hashed when its size or mtime changes.
+    - The sidecar is an uncompressed NumPy ``.npz`` archive read with
+      ``allow_pickle=False``. Node/edge rows are stored column by column (string and
+      numeric arrays); only positions and metadata dicts go into a small JSON header.
+      Nothing in it can run code, so a sidecar planted next to a shared layout is at
+      worst rejected or rebuilt.
+"""
 
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+import zipfile
 from dataclasses import dataclass
 from pathlib import Path
 from functools import lru_cache
 from typing import Dict, Iterable, List, Tuple
 
 import networkx as nx
+import numpy as np
+
+from .compiled import CompiledGraph, attach_compiled, compile_graph
+from .graph_analysis import IncrementalConnectivity
 
 
 @dataclass(frozen=True)
@@ -66,11 +86,19 @@ class FloorPlan:
         except (nx.NetworkXNoPath, nx.NodeNotFound):
             return []
 
+    def _set_compiled(self, compiled: CompiledGraph) -> None:
+        """Remember a cached compilation for these exact node/edge lists (see `load_floorplan`)."""
+
+        object.__setattr__(self, "_compiled", (self.nodes, self.edges, len(self.nodes), len(self.edges), compiled))
+
     def to_networkx(self) -> nx.DiGraph:
         """Convert the plan into a directed graph with edge attributes.
         
         Automatically creates reverse edges for bi-directional movement unless
         'oneway': true is specified in edge metadata.
+
+        Plans loaded from the compiled layout cache attach the cached `CompiledGraph`
+        to the new graph (skipping `compile_graph`) while `nodes`/`edges` are unchanged.
         """
 
         graph = nx.DiGraph()
@@ -116,14 +144,267 @@ class FloorPlan:
                     is_stairs=edge.is_stairs,
                     metadata=edge.metadata or {},
                 )
-                
+
+        cached = getattr(self, "_compiled", None)
+        if cached is not None:
+            nodes, edges, n_nodes, n_edges, compiled = cached
+            if nodes is self.nodes and edges is self.edges and n_nodes == len(nodes) and n_edges == len(edges):
+                attach_compiled(graph, compiled)
+
         return graph
 
 
-def load_floorplan(path: Path) -> FloorPlan:
-    """Load a floor plan JSON file and return a parsed FloorPlan model."""
+# Bump when the artefact layout or FloorPlan/graph construction changes.
+_LAYOUT_CACHE_VERSION = 2
+_LAYOUT_CACHE_SUFFIX = ".smartflow-cache"
+# `CompiledGraph` fields stored as plain arrays in the sidecar.
+_COMPILED_ARRAYS = (
+    "edge_src",
+    "edge_dst",
+    "length_m",
+    "width_m",
+    "is_stairs",
+    "base_cost",
+    "out_ptr",
+    "out_edges",
+    "in_ptr",
+    "in_edges",
+)
+# Node/edge row columns stored as plain arrays in the sidecar.
+_ROW_COLUMNS = (
+    "node_id",
+    "node_label",
+    "node_kind",
+    "node_floor",
+    "node_capacity",
+    "edge_id",
+    "edge_source",
+    "edge_target",
+    "edge_length_m",
+    "edge_width_m",
+    "edge_capacity_pps",
+    "edge_is_stairs",
+)
+
+# Source hashes keyed by resolved path: (size, mtime_ns, sha256).
+_SOURCE_HASHES: Dict[str, Tuple[int, int, str]] = {}
+# Compiled artefacts already loaded in this process, keyed by resolved path.
+_LOADED_LAYOUTS: Dict[str, dict] = {}
+
+
+def layout_cache_path(path: Path) -> Path:
+    """Sidecar path of the compiled layout artefact for a layout JSON file."""
+
+    path = Path(path)
+    return path.with_name(path.name + _LAYOUT_CACHE_SUFFIX)
 
-    data = json.loads(Path(path).read_text(encoding="utf-8"))
+
+def _stat_key(path: Path) -> Tuple[int, int]:
+    st = os.stat(path)
+    return (int(st.st_size), int(st.st_mtime_ns))
+
+
+def layout_source_hash(path: Path) -> str:
+    """SHA-256 of a layout file, reusing the last hash while its size and mtime are unchanged."""
+
+    path = Path(path)
+    key = str(path.resolve())
+    stat = _stat_key(path)
+    known = _SOURCE_HASHES.get(key)
+    if known is not None and known[:2] == stat:
+        return known[2]
+    artefact = _read_layout_artefact(path)
+    if artefact is not None and artefact["stat"] == stat:
+        sha = artefact["sha256"]
+    else:
+        sha = hashlib.sha256(path.read_bytes()).hexdigest()
+    _SOURCE_HASHES[key] = (*stat, sha)
+    return sha
+
+
+def _read_layout_artefact(path: Path) -> dict | None:
+    key = str(Path(path).resolve())
+    artefact = _LOADED_LAYOUTS.get(key)
+    if artefact is not None:
+        return artefact
+    try:
+        with np.load(layout_cache_path(path), allow_pickle=False) as data:
+            header = json.loads(data["header"].tobytes().decode("utf-8"))
+            if not isinstance(header, dict) or header.get("version") != _LAYOUT_CACHE_VERSION:
+                return None
+            columns = {name: data[name].tolist() for name in _ROW_COLUMNS}
+            arrays = {name: data[name] for name in _COMPILED_ARRAYS}
+            node_ids = tuple(data["compiled_node_ids"].tolist())
+            edge_ids = tuple(data["compiled_edge_ids"].tolist())
+        # Edge keys are implied by the CSR endpoints, so they are not stored.
+        edge_keys = tuple(
+            zip(
+                [node_ids[i] for i in arrays["edge_src"].tolist()],
+                [node_ids[i] for i in arrays["edge_dst"].tolist()],
+            )
+        )
+        compiled = CompiledGraph(
+            layout_hash=str(header["layout_hash"]),
+            node_ids=node_ids,
+            node_index={n: i for i, n in enumerate(node_ids)},
+            edge_keys=edge_keys,
+            edge_index={k: i for i, k in enumerate(edge_keys)},
+            edge_ids=edge_ids,
+            **arrays,
+        )
+        nodes = list(
+            zip(
+                columns["node_id"],
+                columns["node_label"],
+                columns["node_kind"],
+                columns["node_floor"],
+                header["node_position"],
+                columns["node_capacity"],
+                header["node_metadata"],
+                strict=True,
+            )
+        )
+        edges = list(
+            zip(
+                columns["edge_id"],
+                columns["edge_source"],
+                columns["edge_target"],
+                columns["edge_length_m"],
+                columns["edge_width_m"],
+                columns["edge_capacity_pps"],
+                columns["edge_is_stairs"],
+                header["edge_metadata"],
+                strict=True,
+            )
+        )
+        artefact = {
+            "version": header["version"],
+            "stat": tuple(header["stat"]),
+            "sha256": str(header["sha256"]),
+            "nodes": nodes,
+            "edges": edges,
+            "compiled": compiled,
+        }
+    except (OSError, KeyError, IndexError, TypeError, ValueError, UnicodeDecodeError, zipfile.BadZipFile):
+        return None
+    _LOADED_LAYOUTS[key] = artefact
+    return artefact
+
+
+def _plan_from_artefact(artefact: dict) -> FloorPlan:
+    specs = artefact.get("specs")
+    if specs is None:
+        specs = (
+            # Positions come back from the sidecar header as lists.
+            tuple(
+                NodeSpec(n, label, kind, floor, tuple(pos), cap, meta)
+                for n, label, kind, floor, pos, cap, meta in artefact["nodes"]
+            ),
+            tuple(EdgeSpec(*row) for row in artefact["edges"]),
+        )
+        # In-memory only (never written): later loads in this process skip the rebuild.
+        artefact["specs"] = specs
+    plan = FloorPlan(nodes=list(specs[0]), edges=list(specs[1]))
+    plan._set_compiled(artefact["compiled"])
+    return plan
+
+
+def load_floorplan(path: Path, *, use_cache: bool = True) -> FloorPlan:
+    """Load a floor plan JSON file and return a parsed FloorPlan model.
+
+    Args:
+        path: Layout JSON file.
+        use_cache: Reuse (and maintain) the compiled sidecar artefact
+            (`layout_cache_path`). The artefact is only trusted while the JSON's
+            SHA-256 matches; a cache that cannot be written is silently skipped.
+    """
+
+    path = Path(path)
+    if not use_cache:
+        return _parse_floorplan(path.read_bytes())
+
+    stat = _stat_key(path)
+    artefact = _read_layout_artefact(path)
+    if artefact is not None:
+        if artefact["stat"] == stat:
+            return _plan_from_artefact(artefact)
+        raw = path.read_bytes()
+        sha = hashlib.sha256(raw).hexdigest()
+        if artefact["sha256"] == sha:
+            # Touched but unchanged: refresh the recorded stat.
+            artefact["stat"] = stat
+            _write_layout_artefact(path, artefact)
+            return _plan_from_artefact(artefact)
+    else:
+        raw = path.read_bytes()
+        sha = hashlib.sha256(raw).hexdigest()
+
+    plan = _parse_floorplan(raw)
+    artefact = {
+        "version": _LAYOUT_CACHE_VERSION,
+        "stat": stat,
+        "sha256": sha,
+        "nodes": [(n.node_id, n.label, n.kind, n.floor, n.position, n.capacity, n.metadata) for n in plan.nodes],
+        "edges": [
+            (e.edge_id, e.source, e.target, e.length_m, e.width_m, e.capacity_pps, e.is_stairs, e.metadata)
+            for e in plan.edges
+        ],
+        "compiled": compile_graph(plan.to_networkx()),
+    }
+    _write_layout_artefact(path, artefact)
+    _SOURCE_HASHES[str(path.resolve())] = (*stat, sha)
+    return _plan_from_artefact(artefact)
+
+
+def _write_layout_artefact(path: Path, artefact: dict) -> None:
+    _LOADED_LAYOUTS[str(Path(path).resolve())] = artefact
+    target = layout_cache_path(path)
+    tmp = target.with_name(target.name + ".tmp")
+    compiled = artefact["compiled"]
+    nodes, edges = artefact["nodes"], artefact["edges"]
+    # Free-form fields (positions, metadata dicts) go into the JSON header.
+    header = {
+        "version": artefact["version"],
+        "stat": list(artefact["stat"]),
+        "sha256": artefact["sha256"],
+        "layout_hash": compiled.layout_hash,
+        "node_position": [list(row[4]) for row in nodes],
+        "node_metadata": [row[6] for row in nodes],
+        "edge_metadata": [row[7] for row in edges],
+    }
+    try:
+        columns = {
+            "node_id": np.array([row[0] for row in nodes], dtype=str),
+            "node_label": np.array([row[1] for row in nodes], dtype=str),
+            "node_kind": np.array([row[2] for row in nodes], dtype=str),
+            "node_floor": np.array([row[3] for row in nodes], dtype=np.int64),
+            "node_capacity": np.array([row[5] for row in nodes], dtype=np.int64),
+            "edge_id": np.array([row[0] for row in edges], dtype=str),
+            "edge_source": np.array([row[1] for row in edges], dtype=str),
+            "edge_target": np.array([row[2] for row in edges], dtype=str),
+            "edge_length_m": np.array([row[3] for row in edges], dtype=float),
+            "edge_width_m": np.array([row[4] for row in edges], dtype=float),
+            "edge_capacity_pps": np.array([row[5] for row in edges], dtype=float),
+            "edge_is_stairs": np.array([row[6] for row in edges], dtype=bool),
+            "compiled_node_ids": np.array(compiled.node_ids, dtype=str),
+            "compiled_edge_ids": np.array(compiled.edge_ids, dtype=str),
+            "header": np.frombuffer(json.dumps(header, separators=(",", ":")).encode("utf-8"), dtype=np.uint8),
+        }
+        with open(tmp, "wb") as fh:
+            # A file object (not a path) keeps NumPy from appending ".npz".
+            np.savez(fh, **columns, **{name: getattr(compiled, name) for name in _COMPILED_ARRAYS})
+        os.replace(tmp, target)
+    except (OSError, TypeError, ValueError):
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+def _parse_floorplan(raw: bytes) -> FloorPlan:
+    """Parse and validate layout JSON bytes."""
+
+    data = json.loads(raw.decode("utf-8"))
 
     def _default_label(node_id: str, kind: str, metadata: Dict[str, float] | None) -> str:
         # Prefer explicit labels in JSON. Otherwise pick a human-friendly default.
@@ -198,16 +479,12 @@ def validate_floorplan(plan: FloorPlan) -> None:
         if edge.capacity_pps <= 0:
             raise ValueError(f"Edge {edge.edge_id} must have positive capacity")
 
-    graph = nx.DiGraph()
-    graph.add_nodes_from(node_ids)
-    graph.add_edges_from((edge.source, edge.target) for edge in plan.edges)
-    if not nx.is_weakly_connected(graph):
-        ug = nx.Graph()
-        ug.add_nodes_from(node_ids)
-        ug.add_edges_from((edge.source, edge.target) for edge in plan.edges)
-
-        comps = list(nx.connected_components(ug))
-        comps.sort(key=len, reverse=True)
+    connectivity = IncrementalConnectivity(
+        (node.node_id for node in plan.nodes),
+        ((edge.source, edge.target) for edge in plan.edges),
+    )
+    if not connectivity.is_connected():
+        comps = connectivity.components()
         parts = []
         for idx, c in enumerate(comps[:5], start=1):
             sample = ", ".join(sorted(list(c))[:10])
@@ -5,17 +5,32 @@ This module intentionally contains a small amount of "from scratch" graph traver
 
 Features:
 - Connected components via BFS (ignoring direction)
+- Iterative reachability / cycle checks over the compiled integer adjacency
+- Union-find connectivity that updates per edit (editor, validation)
 - Edge betweenness centrality (NetworkX)
+- Demand-weighted edge betweenness over scenario OD pairs (shared trees per origin)
+- Sampled (pivot) betweenness with an error target, cached in memory and the DB
+- Max-flow / min-cut bottlenecks between source and sink groups (egress, changeovers)
 - Critical-edge ranking by combining centrality with observed congestion metrics
 """
 
 from __future__ import annotations
 
-from collections import deque
+import hashlib
+import heapq
+import json
+import math
+import random
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Dict, Iterable, List, Mapping, Sequence, Set, Tuple
 
 import networkx as nx
+import numpy as np
+
+from .compiled import CompiledGraph, compile_graph
 
 
 def reachable_nodes_dfs_recursive(graph: nx.DiGraph, start: str) -> Set[str]:
@@ -67,6 +82,173 @@ def has_cycle_dfs_recursive(graph: nx.DiGraph) -> bool:
     return False
 
 
+def reachable_nodes(graph: nx.DiGraph, start: str) -> Set[str]:
+    """Iterative equivalent of `reachable_nodes_dfs_recursive` (no recursion limit).
+
+    Walks the compiled CSR adjacency with an explicit stack of integer node indices.
+    """
+
+    compiled = compile_graph(graph)
+    source = compiled.node_index.get(str(start))
+    if source is None:
+        return set()
+
+    ptr = compiled.out_ptr.tolist()
+    out_edges = compiled.out_edges.tolist()
+    dst = compiled.edge_dst.tolist()
+    seen = [False] * compiled.node_count
+    seen[source] = True
+    stack = [source]
+    while stack:
+        n = stack.pop()
+        for i in range(ptr[n], ptr[n + 1]):
+            m = dst[out_edges[i]]
+            if not seen[m]:
+                seen[m] = True
+                stack.append(m)
+    ids = compiled.node_ids
+    return {ids[i] for i, hit in enumerate(seen) if hit}
+
+
+def has_cycle(graph: nx.DiGraph) -> bool:
+    """Iterative equivalent of `has_cycle_dfs_recursive` (no recursion limit).
+
+    NEA note (technique):
+        Kahn's algorithm: repeatedly remove nodes with no incoming edges. Every node
+        is removed exactly when the graph is acyclic.
+    """
+
+    compiled = compile_graph(graph)
+    indegree = np.bincount(compiled.edge_dst, minlength=compiled.node_count).tolist()
+    ptr = compiled.out_ptr.tolist()
+    out_edges = compiled.out_edges.tolist()
+    dst = compiled.edge_dst.tolist()
+
+    ready = [n for n, deg in enumerate(indegree) if deg == 0]
+    removed = 0
+    while ready:
+        n = ready.pop()
+        removed += 1
+        for i in range(ptr[n], ptr[n + 1]):
+            m = dst[out_edges[i]]
+            indegree[m] -= 1
+            if indegree[m] == 0:
+                ready.append(m)
+    return removed < compiled.node_count
+
+
+class IncrementalConnectivity:
+    """Weak (undirected) connectivity of a layout, maintained edit by edit.
+
+    NEA note (technique):
+        Union-find with union by size and path halving makes adding nodes/edges and
+        connectivity queries effectively O(1). Union-find cannot split sets, so
+        removals only mark the structure stale; it is rebuilt from the remaining
+        edges on the next query.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), edges: Iterable[Tuple[str, str]] = ()) -> None:
+        self.reset(nodes, edges)
+
+    def reset(self, nodes: Iterable[str] = (), edges: Iterable[Tuple[str, str]] = ()) -> None:
+        """Replace the tracked layout."""
+
+        self._parent: Dict[str, str] = {}
+        self._size: Dict[str, int] = {}
+        self._count = 0
+        self._edges: Counter[Tuple[str, str]] = Counter()
+        self._stale = False
+        for n in nodes:
+            self.add_node(n)
+        for u, v in edges:
+            self.add_edge(u, v)
+
+    def _find(self, node: str) -> str:
+        parent = self._parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def _union(self, u: str, v: str) -> None:
+        ru, rv = self._find(u), self._find(v)
+        if ru == rv:
+            return
+        if self._size[ru] < self._size[rv]:
+            ru, rv = rv, ru
+        self._parent[rv] = ru
+        self._size[ru] += self._size[rv]
+        self._count -= 1
+
+    def _refresh(self) -> None:
+        if self._stale:
+            nodes = list(self._parent)
+            edges = list(self._edges.elements())
+            self.reset(nodes, edges)
+
+    def add_node(self, node: str) -> None:
+        node = str(node)
+        if node not in self._parent:
+            self._parent[node] = node
+            self._size[node] = 1
+            self._count += 1
+
+    def add_edge(self, u: str, v: str) -> None:
+        """Record an edge (direction is ignored); unknown endpoints are added."""
+
+        u, v = str(u), str(v)
+        self.add_node(u)
+        self.add_node(v)
+        self._edges[(u, v) if u <= v else (v, u)] += 1
+        if not self._stale:
+            self._union(u, v)
+
+    def remove_edge(self, u: str, v: str) -> None:
+        key = (str(u), str(v)) if str(u) <= str(v) else (str(v), str(u))
+        if self._edges.get(key):
+            self._edges[key] -= 1
+            if not self._edges[key]:
+                del self._edges[key]
+            self._stale = True
+
+    def remove_node(self, node: str) -> None:
+        """Remove a node and all of its edges."""
+
+        node = str(node)
+        if node not in self._parent:
+            return
+        for key in [k for k in self._edges if node in k]:
+            del self._edges[key]
+        del self._parent[node]
+        self._stale = True
+
+    @property
+    def component_count(self) -> int:
+        self._refresh()
+        return self._count
+
+    def is_connected(self) -> bool:
+        """True when every node is reachable from every other ignoring direction."""
+
+        return self.component_count <= 1
+
+    def connected(self, u: str, v: str) -> bool:
+        self._refresh()
+        u, v = str(u), str(v)
+        if u not in self._parent or v not in self._parent:
+            return False
+        return self._find(u) == self._find(v)
+
+    def components(self) -> List[Set[str]]:
+        """Components as node sets, largest first."""
+
+        self._refresh()
+        groups: Dict[str, Set[str]] = {}
+        for node in self._parent:
+            groups.setdefault(self._find(node), set()).add(node)
+        return sorted(groups.values(), key=len, reverse=True)
+
+
 def weak_components_bfs(graph: nx.DiGraph) -> List[Set[str]]:
     """Return weakly-connected components using an explicit BFS traversal."""
 
@@ -100,11 +282,272 @@ def weak_components_bfs(graph: nx.DiGraph) -> List[Set[str]]:
     return components
 
 
-def edge_betweenness(graph: nx.DiGraph) -> Dict[Tuple[str, str], float]:
-    """Compute edge betweenness centrality on the directed graph."""
+def betweenness_sample_size(edge_count: int, epsilon: float, delta: float = 0.1) -> int:
+    """Pivots needed so every sampled edge betweenness is within `epsilon` w.p. >= 1 - `delta`.
+
+    NEA note (validity):
+        Normalised edge betweenness is the mean over sources ``s`` of a per-source
+        contribution in [0, 1]. Hoeffding's inequality plus a union bound over all
+        edges gives ``k >= ln(2 * edges / delta) / (2 * epsilon^2)``.
+    """
+
+    if epsilon <= 0 or not 0 < delta < 1:
+        raise ValueError("epsilon must be positive and delta in (0, 1)")
+    return int(math.ceil(math.log(2.0 * max(1, edge_count) / delta) / (2.0 * epsilon * epsilon)))
+
+
+# Betweenness keyed by (layout_hash, parameter string).
+_BETWEENNESS_CACHE: Dict[Tuple[str, str], Dict[Tuple[str, str], float]] = {}
+_BETWEENNESS_CACHE_MAX = 16
+
+
+def edge_betweenness(
+    graph: nx.DiGraph,
+    *,
+    epsilon: float | None = None,
+    delta: float = 0.1,
+    seed: int = 0,
+    workers: int = 1,
+    db_path: Path | None = None,
+) -> Dict[Tuple[str, str], float]:
+    """Compute (normalised, hop-count) edge betweenness centrality on the directed graph.
+
+    Args:
+        graph: Layout graph.
+        epsilon: If set, sample source pivots (see `betweenness_sample_size`) so each
+            score is within `epsilon` of the exact value with probability 1 - `delta`.
+            Falls back to exact when the sample would cover every node.
+        delta: Failure probability for the `epsilon` target.
+        seed: Pivot sampling seed.
+        workers: Number of processes to spread pivots over (1 = in-process).
+        db_path: Optional SQLite database; results are stored there per layout hash, so
+            re-opening results for the same layout is instant.
+    """
+
+    compiled = compile_graph(graph)
+    n = compiled.node_count
+    k = n if epsilon is None else min(n, betweenness_sample_size(compiled.edge_count, epsilon, delta))
+    params = "exact" if k >= n else f"pivots={k};seed={int(seed)}"
+    key = (compiled.layout_hash, params)
+
+    cached = _BETWEENNESS_CACHE.get(key)
+    if cached is None and db_path is not None:
+        from smartflow.io import db as dbio
+
+        payload = dbio.get_or_create_analysis(Path(db_path), layout_hash=key[0], kind="edge_betweenness", params=params)
+        if payload is not None:
+            cached = {(str(u), str(v)): float(b) for u, v, b in json.loads(payload)}
+    if cached is None:
+        if k >= n and workers <= 1:
+            scores = nx.edge_betweenness_centrality(graph, normalized=True)
+            cached = {(str(u), str(v)): float(b) for (u, v), b in scores.items()}
+        else:
+            pivots = range(n) if k >= n else sorted(random.Random(int(seed)).sample(range(n), k))
+            everyone = [(t, 1.0) for t in range(n)]
+            work = [(s, everyone) for s in pivots]
+            flows, _ = _accumulate_flows(compiled, [1.0] * compiled.edge_count, work, workers)
+            scale = 1.0 / (len(work) * (n - 1)) if n > 1 and work else 0.0
+            cached = {compiled.edge_keys[e]: float(flows[e] * scale) for e in range(compiled.edge_count)}
+        if db_path is not None:
+            from smartflow.io import db as dbio
+
+            dbio.get_or_create_analysis(
+                Path(db_path),
+                layout_hash=key[0],
+                kind="edge_betweenness",
+                params=params,
+                payload_json=json.dumps([[u, v, b] for (u, v), b in cached.items()]),
+            )
+
+    if len(_BETWEENNESS_CACHE) >= _BETWEENNESS_CACHE_MAX:
+        _BETWEENNESS_CACHE.pop(next(iter(_BETWEENNESS_CACHE)))
+    _BETWEENNESS_CACHE[key] = cached
+    return dict(cached)
+
+
+def _origin_flows(
+    compiled: CompiledGraph,
+    costs: Sequence[float],
+    origin: int,
+    targets: Sequence[Tuple[int, float]],
+) -> Tuple[Dict[int, float], float]:
+    """Trips per edge from one origin, split evenly over equal-cost shortest paths.
+
+    Returns (flow per edge index, trips that reached their destination).
+
+    NEA note (technique):
+        Brandes-style accumulation: one Dijkstra counts shortest paths (sigma) and
+        predecessor edges; a single backward pass then pushes each target's demand
+        towards the origin, so all destinations of an origin share one tree.
+    """
+
+    adjacency = compiled.out_adjacency
+    src = compiled.edge_src
+    dist: Dict[int, float] = {origin: 0.0}
+    sigma: Dict[int, float] = {origin: 1.0}
+    preds: Dict[int, List[int]] = {origin: []}
+    order: List[int] = []
+    done: Set[int] = set()
+    heap = [(0.0, origin)]
+    while heap:
+        d, n = heapq.heappop(heap)
+        if n in done:
+            continue
+        done.add(n)
+        order.append(n)
+        for e, m in adjacency[n]:
+            nd = d + costs[e]
+            old = dist.get(m, math.inf)
+            # Relative tolerance so float round-off does not hide equal-cost ties.
+            tol = 1e-9 * max(1.0, nd)
+            if nd < old - tol:
+                dist[m] = nd
+                sigma[m] = sigma[n]
+                preds[m] = [e]
+                heapq.heappush(heap, (nd, m))
+            elif m not in done and abs(nd - old) <= tol:
+                sigma[m] += sigma[n]
+                preds[m].append(e)
+
+    load: Dict[int, float] = {}
+    routed = 0.0
+    for target, trips in targets:
+        if target in done and target != origin:
+            load[target] = load.get(target, 0.0) + trips
+            routed += trips
+
+    flows: Dict[int, float] = {}
+    for n in reversed(order):
+        total = load.get(n, 0.0)
+        if not total:
+            continue
+        for e in preds[n]:
+            u = int(src[e])
+            share = total * sigma[u] / sigma[n]
+            flows[e] = flows.get(e, 0.0) + share
+            load[u] = load.get(u, 0.0) + share
+    return flows, routed
+
+
+def _flows_for_origins(
+    compiled: CompiledGraph,
+    costs: Sequence[float],
+    work: Sequence[Tuple[int, Sequence[Tuple[int, float]]]],
+) -> Tuple[np.ndarray, float]:
+    """Summed edge flows and routed trips for a batch of origins (process-pool unit)."""
+
+    out = np.zeros(compiled.edge_count, dtype=float)
+    routed = 0.0
+    for origin, targets in work:
+        flows, reached = _origin_flows(compiled, costs, origin, targets)
+        for e, f in flows.items():
+            out[e] += f
+        routed += reached
+    return out, routed
+
+
+def _accumulate_flows(
+    compiled: CompiledGraph,
+    costs: Sequence[float],
+    work: Sequence[Tuple[int, Sequence[Tuple[int, float]]]],
+    workers: int,
+) -> Tuple[np.ndarray, float]:
+    """`_flows_for_origins`, optionally split round-robin over a process pool."""
+
+    workers = max(1, int(workers))
+    if workers > 1 and len(work) > workers:
+        chunks = [work[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_flows_for_origins, [compiled] * workers, [costs] * workers, chunks))
+        return np.sum([f for f, _ in parts], axis=0), sum(r for _, r in parts)
+    return _flows_for_origins(compiled, costs, work)
+
+
+def demand_signature(demand: Mapping[Tuple[str, str], float]) -> str:
+    """Return a SHA-256 hash identifying an OD demand matrix."""
+
+    items = sorted((str(o), str(d), float(t)) for (o, d), t in demand.items() if t > 0)
+    return hashlib.sha256(repr(items).encode("utf-8")).hexdigest()
 
-    scores = nx.edge_betweenness_centrality(graph, normalized=True)
-    return {(str(u), str(v)): float(s) for (u, v), s in scores.items()}
+
+# Demand-weighted betweenness keyed by (layout_hash, demand signature, stairs penalty).
+_DEMAND_BETWEENNESS_CACHE: Dict[Tuple[str, str, float], Dict[Tuple[str, str], float]] = {}
+_DEMAND_BETWEENNESS_CACHE_MAX = 32
+
+
+def demand_betweenness(
+    graph: nx.DiGraph,
+    demand: Mapping[Tuple[str, str], float],
+    *,
+    stairs_penalty: float = 0.0,
+    workers: int = 1,
+    db_path: Path | None = None,
+) -> Dict[Tuple[str, str], float]:
+    """Share of all trips in `demand` whose shortest route uses each edge.
+
+    Unlike `edge_betweenness`, only the given OD pairs are summed (weighted by their
+    trip counts) and routes follow routing costs rather than hop counts. Results are
+    normalised to [0, 1] by the total number of routable trips and cached per
+    (layout hash, demand signature, stairs penalty).
+
+    Args:
+        graph: Layout graph.
+        demand: Trips per (origin, destination), e.g. `assignment.od_demand_from_scenario`.
+        stairs_penalty: Additive stairs cost used for routing.
+        workers: Number of processes to spread origins over (1 = in-process).
+        db_path: Optional SQLite database; results are also stored there, so re-opening
+            the results of the same run is instant.
+
+    Raises:
+        ValueError: If the stairs penalty is negative.
+    """
+
+    if stairs_penalty < 0:
+        raise ValueError("stairs_penalty cannot be negative")
+
+    compiled = compile_graph(graph)
+    key = (compiled.layout_hash, demand_signature(demand), float(stairs_penalty))
+    cached = _DEMAND_BETWEENNESS_CACHE.get(key)
+    if cached is not None:
+        return dict(cached)
+    params = f"demand={key[1]};stairs={key[2]!r}"
+    if db_path is not None:
+        from smartflow.io import db as dbio
+
+        payload = dbio.get_or_create_analysis(
+            Path(db_path), layout_hash=key[0], kind="demand_betweenness", params=params
+        )
+        if payload is not None:
+            cached = {(str(u), str(v)): float(b) for u, v, b in json.loads(payload)}
+
+    if cached is None:
+        index = compiled.node_index
+        by_origin: Dict[int, List[Tuple[int, float]]] = {}
+        for (origin, destination), trips in demand.items():
+            o, d = index.get(str(origin)), index.get(str(destination))
+            if o is not None and d is not None and o != d and trips > 0:
+                by_origin.setdefault(o, []).append((d, float(trips)))
+        costs = compiled.edge_costs(stairs_penalty=stairs_penalty).tolist()
+        flows, routed = _accumulate_flows(compiled, costs, sorted(by_origin.items()), workers)
+
+        # Normalise by trips that actually reached their destination.
+        scale = 1.0 / routed if routed > 0 else 0.0
+        cached = {compiled.edge_keys[e]: float(flows[e] * scale) for e in range(compiled.edge_count)}
+        if db_path is not None:
+            from smartflow.io import db as dbio
+
+            dbio.get_or_create_analysis(
+                Path(db_path),
+                layout_hash=key[0],
+                kind="demand_betweenness",
+                params=params,
+                payload_json=json.dumps([[u, v, b] for (u, v), b in cached.items()]),
+            )
+
+    if len(_DEMAND_BETWEENNESS_CACHE) >= _DEMAND_BETWEENNESS_CACHE_MAX:
+        _DEMAND_BETWEENNESS_CACHE.pop(next(iter(_DEMAND_BETWEENNESS_CACHE)))
+    _DEMAND_BETWEENNESS_CACHE[key] = cached
+    return dict(cached)
 
 
 def articulation_points(graph: nx.DiGraph) -> List[str]:
@@ -116,6 +559,157 @@ def articulation_points(graph: nx.DiGraph) -> List[str]:
     return [str(n) for n in nx.articulation_points(ug)]
 
 
+# Specific flow of a corridor (people per second per metre of clear width), used when an
+# edge has no `capacity_pps`. 1.3 p/s/m is the usual design value for level corridors.
+SPECIFIC_FLOW_PPS_PER_M = 1.3
+
+
+@dataclass(frozen=True)
+class BottleneckCut:
+    """Result of a group-to-group max-flow / min-cut computation."""
+
+    # Maximum sustainable flow from sources to sinks (people per second).
+    max_flow_pps: float
+    # Saturated edges separating sources from sinks (the limiting bottleneck).
+    cut_edges: Tuple[Tuple[str, str], ...]
+    # people / max_flow: no schedule can clear `people` faster (None if people unknown).
+    clearance_lower_bound_s: float | None
+
+
+def edge_flow_capacity(data: Mapping[str, object], *, capacity: str = "capacity_pps") -> float:
+    """Flow capacity (people/s) of an edge from `capacity_pps` or from `width_m`.
+
+    Args:
+        data: Edge attribute mapping.
+        capacity: ``"capacity_pps"`` (use the attribute, falling back to width) or
+            ``"width"`` (always ``width_m * SPECIFIC_FLOW_PPS_PER_M``).
+    """
+
+    if capacity not in ("capacity_pps", "width"):
+        raise ValueError(f"Unknown capacity source: {capacity!r}")
+    if capacity == "capacity_pps":
+        try:
+            pps = float(data.get("capacity_pps") or 0.0)
+        except (TypeError, ValueError):
+            pps = 0.0
+        if pps > 0:
+            return pps
+    try:
+        width = float(data.get("width_m") or 0.0)
+    except (TypeError, ValueError):
+        width = 0.0
+    return max(0.0, width) * SPECIFIC_FLOW_PPS_PER_M
+
+
+def bottleneck_cut(
+    graph: nx.DiGraph,
+    sources: Iterable[str],
+    sinks: Iterable[str],
+    *,
+    people: float | None = None,
+    capacity: str = "capacity_pps",
+) -> BottleneckCut:
+    """Max-flow / min-cut from a group of source nodes to a group of sink nodes.
+
+    NEA note (technique):
+        A super-source feeds every source and every sink drains into a super-sink
+        (both with unbounded capacity), so one max-flow run covers the whole group.
+        Pairing between particular origins and destinations is ignored, which can
+        only raise the flow, so `people / max_flow` is a valid lower bound on the
+        time to move `people` (closed edges get zero capacity).
+
+    Raises:
+        ValueError: If sources or sinks are empty, overlap, or reference unknown nodes.
+    """
+
+    src = {str(n) for n in sources}
+    dst = {str(n) for n in sinks}
+    if not src or not dst:
+        raise ValueError("bottleneck_cut needs at least one source and one sink")
+    if src & dst:
+        raise ValueError("sources and sinks must be disjoint")
+    missing = sorted(n for n in src | dst if n not in graph)
+    if missing:
+        raise ValueError(f"Unknown nodes: {', '.join(missing[:5])}")
+
+    super_source, super_sink = ("__bottleneck_source__",), ("__bottleneck_sink__",)
+    flow_graph = nx.DiGraph()
+    for u, v, data in graph.edges(data=True):
+        cap = 0.0 if data.get("closed") else edge_flow_capacity(data, capacity=capacity)
+        flow_graph.add_edge(str(u), str(v), capacity=cap)
+    for n in src:
+        flow_graph.add_edge(super_source, n)
+    for n in dst:
+        flow_graph.add_edge(n, super_sink)
+
+    flow, (reachable, _) = nx.minimum_cut(flow_graph, super_source, super_sink)
+    cut = tuple(
+        sorted(
+            (u, v)
+            for u, v in graph.edges
+            if str(u) in reachable and str(v) not in reachable
+        )
+    )
+    flow = float(flow)
+    if people is None:
+        bound = None
+    elif people <= 0:
+        bound = 0.0
+    else:
+        bound = people / flow if flow > 0 else math.inf
+    return BottleneckCut(max_flow_pps=flow, cut_edges=cut, clearance_lower_bound_s=bound)
+
+
+def egress_bottleneck(
+    graph: nx.DiGraph,
+    *,
+    people: float | None = None,
+    capacity: str = "capacity_pps",
+) -> BottleneckCut:
+    """Bottleneck from every room to every entrance (evacuation-style egress)."""
+
+    rooms = [n for n, d in graph.nodes(data=True) if d.get("kind") == "room"]
+    exits = [
+        n
+        for n, d in graph.nodes(data=True)
+        if d.get("kind") == "entry" or (d.get("metadata") or {}).get("is_entrance", False)
+    ]
+    return bottleneck_cut(graph, rooms, exits, people=people, capacity=capacity)
+
+
+def period_bottlenecks(
+    graph: nx.DiGraph,
+    scenario_data: Mapping[str, object],
+    *,
+    scale: float = 1.0,
+    capacity: str = "capacity_pps",
+) -> Dict[str, BottleneckCut]:
+    """Bottleneck from each period's origin set to its destination set.
+
+    Nodes that are both an origin and a destination in a period are left out of both
+    groups (their trips cannot be told apart), and so are the people of movements
+    starting or ending at them; periods with no usable groups are skipped.
+    """
+
+    out: Dict[str, BottleneckCut] = {}
+    for i, period in enumerate(scenario_data.get("periods", []) or []):
+        moves: List[Tuple[str, str, float]] = []
+        for move in period.get("movements", []):
+            o, d = str(move.get("origin")), str(move.get("destination"))
+            if o not in graph or d not in graph or o == d:
+                continue
+            moves.append((o, d, 1 if move.get("chain_id") else int(move.get("count", 1) * scale)))
+        both = {o for o, _, _ in moves} & {d for _, d, _ in moves}
+        moves = [(o, d, n) for o, d, n in moves if o not in both and d not in both]
+        origins: Set[str] = {o for o, _, _ in moves}
+        destinations: Set[str] = {d for _, d, _ in moves}
+        people = float(sum(n for _, _, n in moves))
+        if origins and destinations:
+            period_id = str(period.get("id", i))
+            out[period_id] = bottleneck_cut(graph, origins, destinations, people=people, capacity=capacity)
+    return out
+
+
 @dataclass(frozen=True)
 class EdgeCriticality:
     edge: Tuple[str, str]
@@ -130,6 +724,10 @@ def rank_critical_edges(
     *,
     edge_metrics: Mapping[str, object] | None = None,
     edge_id_for_uv: Mapping[Tuple[str, str], str] | None = None,
+    demand: Mapping[Tuple[str, str], float] | None = None,
+    betweenness_epsilon: float | None = None,
+    workers: int = 1,
+    db_path: Path | None = None,
     top_k: int = 10,
 ) -> List[EdgeCriticality]:
     """Rank edges by a combined structural + observed congestion score.
@@ -138,13 +736,21 @@ def rank_critical_edges(
         graph: Layout graph.
         edge_metrics: MetricsCollector.edge_metrics mapping (edge_id -> EdgeMetrics).
         edge_id_for_uv: Optional mapping from (u,v) to edge_id used in metrics.
+        demand: Optional trips per (origin, destination). When given, the structural
+            score is `demand_betweenness` instead of all-pairs betweenness.
+        betweenness_epsilon: Error target for sampled all-pairs betweenness (None = exact).
+        workers: Processes used for betweenness accumulation.
+        db_path: Optional SQLite database caching the betweenness scores per layout.
         top_k: How many to return.
 
     Returns:
         Sorted list of edges with a computed score.
     """
 
-    between = edge_betweenness(graph)
+    if demand:
+        between = demand_betweenness(graph, demand, workers=workers, db_path=db_path)
+    else:
+        between = edge_betweenness(graph, epsilon=betweenness_epsilon, workers=workers, db_path=db_path)
 
     def get_metric(edge_id: str, name: str, default):
         if not edge_metrics:
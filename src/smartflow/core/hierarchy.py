@@ -0,0 +1,329 @@
+"""Hierarchical (floor/building) routing over a portal overlay.
+
+Campus layouts are made of dense per-floor corridor networks joined by a few
+stairs, entrances and outdoor links. A flat Dijkstra explores every floor of
+every building; this module splits the graph into *cells* (one per building and
+floor) and precomputes a small overlay over the *portal* nodes — nodes touching
+an edge that leaves their cell (stair landings, entrances, link paths).
+
+A query then searches only the origin and destination cells and joins them
+through precomputed all-pairs portal distances.
+
+NEA note (technique):
+    - Overlay edges are (a) the inter-cell edges themselves and (b) shortcuts
+      between portals of the same cell, weighted by the cell-restricted distance.
+      Any path decomposes into in-cell segments between portals plus inter-cell
+      edges, so overlay distances equal full-graph distances (exact for static
+      weights).
+    - Overlays depend on the stairs penalty, so they are cached per
+      (layout hash, cell partition, stairs penalty). The model only builds them for
+      a few distinct penalties per run (see `SimulationConfig.use_hierarchy`).
+    - Congestion changes weights every tick; callers fall back to a flat search
+      in that case (see `routing.compute_hierarchical_path`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+
+from .compiled import CompiledGraph, compile_graph
+
+
+def cell_key(node_data: dict) -> Tuple[str, int]:
+    """Return the (building, floor) cell of a node.
+
+    The building comes from a ``building`` node attribute or metadata entry; layouts
+    without one get a single cell per floor.
+    """
+
+    metadata = node_data.get("metadata") or {}
+    building = node_data.get("building", metadata.get("building", ""))
+    try:
+        floor = int(node_data.get("floor", 0))
+    except (TypeError, ValueError):
+        floor = 0
+    return (str(building) if building is not None else "", floor)
+
+
+def _cell_search(
+    compiled: CompiledGraph,
+    costs: Sequence[float],
+    cell_of: Sequence[int],
+    source: int,
+    *,
+    reverse: bool = False,
+) -> Tuple[Dict[int, float], Dict[int, int]]:
+    """Dijkstra restricted to the cell of `source`.
+
+    Returns (distances, via-edge per reached node). With `reverse`, distances are *to*
+    `source` and the via-edge of a node is its first edge towards `source`.
+    """
+
+    adjacency = compiled.in_adjacency if reverse else compiled.out_adjacency
+    cell = cell_of[source]
+    dist: Dict[int, float] = {source: 0.0}
+    via: Dict[int, int] = {}
+    done = set()
+    heap = [(0.0, source)]
+    while heap:
+        d, n = heapq.heappop(heap)
+        if n in done:
+            continue
+        done.add(n)
+        for e, m in adjacency[n]:
+            if cell_of[m] != cell:
+                continue
+            nd = d + costs[e]
+            if nd < dist.get(m, math.inf):
+                dist[m] = nd
+                via[m] = e
+                heapq.heappush(heap, (nd, m))
+    return dist, via
+
+
+def _walk_back(compiled: CompiledGraph, via: Dict[int, int], source: int, node: int) -> List[int]:
+    """Edge indices from `source` to `node` using forward via-edges."""
+
+    edges: List[int] = []
+    src = compiled.edge_src
+    while node != source:
+        e = via[node]
+        edges.append(e)
+        node = int(src[e])
+    edges.reverse()
+    return edges
+
+
+def _walk_forward(compiled: CompiledGraph, via: Dict[int, int], target: int, node: int) -> List[int]:
+    """Edge indices from `node` to `target` using reverse via-edges."""
+
+    edges: List[int] = []
+    dst = compiled.edge_dst
+    while node != target:
+        e = via[node]
+        edges.append(e)
+        node = int(dst[e])
+    return edges
+
+
+@dataclass(frozen=True)
+class PortalOverlay:
+    """Cell partition plus all-pairs portal distances for one layout and stairs penalty."""
+
+    compiled: CompiledGraph
+    stairs_penalty: float
+    cells: Tuple[Tuple[str, int], ...]
+    # Cell id of every node (aligned with compiled.node_ids).
+    cell_of: Tuple[int, ...]
+    # Portal node indices per cell id.
+    cell_portals: Tuple[Tuple[int, ...], ...]
+    portal_row: Dict[int, int]
+    # portal_dist[i, j]: exact distance between portal rows i and j (inf if unreachable).
+    portal_dist: np.ndarray
+    # portal_via[i][j]: last overlay edge on the best i -> j overlay path.
+    portal_via: Tuple[Dict[int, int], ...]
+    # Overlay edges as (from_row, to_row, expanded graph edge indices).
+    overlay_edges: Tuple[Tuple[int, int, Tuple[int, ...]], ...]
+    edge_costs: Tuple[float, ...]
+
+    @property
+    def portal_count(self) -> int:
+        return len(self.portal_row)
+
+    def _overlay_edges(self, i: int, j: int) -> List[int]:
+        rows: List[int] = []
+        via = self.portal_via[i]
+        node = j
+        while node != i:
+            oe = via[node]
+            rows.append(oe)
+            node = self.overlay_edges[oe][0]
+        out: List[int] = []
+        for oe in reversed(rows):
+            out.extend(self.overlay_edges[oe][2])
+        return out
+
+    def shortest_path_edges(self, source: int, target: int) -> Tuple[float, List[int]] | None:
+        """Exact shortest path between node indices as (cost, edge indices), or None."""
+
+        if source == target:
+            return 0.0, []
+
+        costs = self.edge_costs
+        fwd_dist, fwd_via = _cell_search(self.compiled, costs, self.cell_of, source)
+        rev_dist, rev_via = _cell_search(self.compiled, costs, self.cell_of, target, reverse=True)
+
+        best = fwd_dist.get(target, math.inf) if self.cell_of[source] == self.cell_of[target] else math.inf
+        plan: Tuple[int, int] | None = None
+
+        exits = [p for p in self.cell_portals[self.cell_of[source]] if p in fwd_dist]
+        entries = [q for q in self.cell_portals[self.cell_of[target]] if q in rev_dist]
+        if exits and entries:
+            a = np.asarray([fwd_dist[p] for p in exits])
+            b = np.asarray([rev_dist[q] for q in entries])
+            mid = self.portal_dist[np.ix_([self.portal_row[p] for p in exits], [self.portal_row[q] for q in entries])]
+            total = a[:, None] + mid + b[None, :]
+            i, j = np.unravel_index(int(np.argmin(total)), total.shape)
+            if total[i, j] < best:
+                best = float(total[i, j])
+                plan = (exits[i], entries[j])
+
+        if not math.isfinite(best):
+            return None
+        if plan is None:
+            return best, _walk_back(self.compiled, fwd_via, source, target)
+
+        p, q = plan
+        edges = _walk_back(self.compiled, fwd_via, source, p)
+        edges.extend(self._overlay_edges(self.portal_row[p], self.portal_row[q]))
+        edges.extend(_walk_forward(self.compiled, rev_via, target, q))
+        return best, edges
+
+    def shortest_path(self, source: str, target: str) -> List[str]:
+        """Exact shortest node path (raises like `nx.shortest_path`)."""
+
+        index = self.compiled.node_index
+        for node in (source, target):
+            if str(node) not in index:
+                raise nx.NodeNotFound(f"Node {node} not in graph")
+        found = self.shortest_path_edges(index[str(source)], index[str(target)])
+        if found is None:
+            raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+        _, edges = found
+        ids = self.compiled.node_ids
+        path = [str(source)]
+        path.extend(ids[int(self.compiled.edge_dst[e])] for e in edges)
+        return path
+
+
+# Key used to memoise the cell partition on the graph object (`graph.graph`).
+_CELLS_ATTR = "_smartflow_cells"
+
+
+def _partition(graph: nx.DiGraph, compiled: CompiledGraph) -> Tuple[Tuple[Tuple[str, int], ...], Tuple[int, ...], str]:
+    """Return (cells, cell id per node, partition signature), memoised per compilation."""
+
+    cached = graph.graph.get(_CELLS_ATTR)
+    if cached is not None and cached[0] is compiled:
+        return cached[1]
+
+    cells: Dict[Tuple[str, int], int] = {}
+    cell_of = []
+    for n in compiled.node_ids:
+        key = cell_key(graph.nodes[n])
+        cell_of.append(cells.setdefault(key, len(cells)))
+    signature = hashlib.sha256(repr((compiled.node_ids, tuple(cells), cell_of)).encode("utf-8")).hexdigest()
+    result = (tuple(cells), tuple(cell_of), signature)
+    graph.graph[_CELLS_ATTR] = (compiled, result)
+    return result
+
+
+def build_portal_overlay(graph: nx.DiGraph, *, stairs_penalty: float = 0.0) -> PortalOverlay:
+    """Partition `graph` into cells and precompute the portal overlay.
+
+    Raises:
+        ValueError: If the stairs penalty is negative (costs must be non-negative).
+    """
+
+    if stairs_penalty < 0:
+        raise ValueError("stairs_penalty must be non-negative for hierarchical routing")
+
+    compiled = compile_graph(graph)
+    cells, cell_of, _ = _partition(graph, compiled)
+    costs = compiled.edge_costs(stairs_penalty=stairs_penalty).tolist()
+    src = compiled.edge_src.tolist()
+    dst = compiled.edge_dst.tolist()
+
+    crossing = [e for e in range(compiled.edge_count) if cell_of[src[e]] != cell_of[dst[e]]]
+    portal_nodes = sorted({src[e] for e in crossing} | {dst[e] for e in crossing})
+    portal_row = {n: i for i, n in enumerate(portal_nodes)}
+    by_cell: List[List[int]] = [[] for _ in cells]
+    for n in portal_nodes:
+        by_cell[cell_of[n]].append(n)
+
+    overlay: List[Tuple[int, int, Tuple[int, ...]]] = []
+    weights: List[float] = []
+    for e in crossing:
+        overlay.append((portal_row[src[e]], portal_row[dst[e]], (e,)))
+        weights.append(costs[e])
+    for portals in by_cell:
+        for p in portals:
+            dist, via = _cell_search(compiled, costs, cell_of, p)
+            for q in portals:
+                if q != p and q in dist:
+                    overlay.append((portal_row[p], portal_row[q], tuple(_walk_back(compiled, via, p, q))))
+                    weights.append(dist[q])
+
+    count = len(portal_nodes)
+    out: List[List[int]] = [[] for _ in range(count)]
+    for i, (a, _, _) in enumerate(overlay):
+        out[a].append(i)
+
+    dist_rows = np.full((count, count), np.inf)
+    vias: List[Dict[int, int]] = []
+    for r in range(count):
+        dist = {r: 0.0}
+        via: Dict[int, int] = {}
+        heap = [(0.0, r)]
+        done = set()
+        while heap:
+            d, n = heapq.heappop(heap)
+            if n in done:
+                continue
+            done.add(n)
+            for oe in out[n]:
+                m = overlay[oe][1]
+                nd = d + weights[oe]
+                if nd < dist.get(m, math.inf):
+                    dist[m] = nd
+                    via[m] = oe
+                    heapq.heappush(heap, (nd, m))
+        for m, d in dist.items():
+            dist_rows[r, m] = d
+        vias.append(via)
+
+    return PortalOverlay(
+        compiled=compiled,
+        stairs_penalty=float(stairs_penalty),
+        cells=cells,
+        cell_of=cell_of,
+        cell_portals=tuple(tuple(p) for p in by_cell),
+        portal_row=portal_row,
+        portal_dist=dist_rows,
+        portal_via=tuple(vias),
+        overlay_edges=tuple(overlay),
+        edge_costs=tuple(costs),
+    )
+
+
+# Overlays keyed by (layout_hash, partition signature, stairs penalty).
+_OVERLAY_CACHE: Dict[Tuple[str, str, float], PortalOverlay] = {}
+_OVERLAY_CACHE_MAX = 16
+
+
+def portal_overlay(graph: nx.DiGraph, *, stairs_penalty: float = 0.0) -> PortalOverlay:
+    """Return the (cached) portal overlay for a layout and stairs penalty.
+
+    Overlays are shared between graphs with the same layout hash and cell partition,
+    so repeated runs on one layout only build them once.
+    """
+
+    compiled = compile_graph(graph)
+    _, _, signature = _partition(graph, compiled)
+    key = (compiled.layout_hash, signature, float(stairs_penalty))
+    cached = _OVERLAY_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    overlay = build_portal_overlay(graph, stairs_penalty=stairs_penalty)
+    if key not in _OVERLAY_CACHE and len(_OVERLAY_CACHE) >= _OVERLAY_CACHE_MAX:
+        _OVERLAY_CACHE.pop(next(iter(_OVERLAY_CACHE)))
+    _OVERLAY_CACHE[key] = overlay
+    return overlay
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import bisect
 from dataclasses import dataclass, field
 from typing import Dict, List
 
@@ -19,6 +20,18 @@ class AgentMetrics:
     role: str = "unknown" # e.g. student:diligent
 
 
+@dataclass
+class MovementMetrics:
+    """One completed (or, with ``arrival_s=None``, unfinished) schedule entry."""
+
+    agent_id: str
+    period: str
+    depart_s: float
+    arrival_s: float | None
+    travel_time_s: float
+    is_late: bool = False
+
+
 @dataclass
 class EdgeMetrics:
     edge_id: str
@@ -42,6 +55,20 @@ class RunSummary:
     percent_late: float = 0.0
 
 
+@dataclass
+class PeriodSummary:
+    """Movement and crowding statistics for one timetable period of a multi-period run."""
+
+    period: str
+    movements: int = 0
+    start_s: float | None = None
+    end_s: float | None = None
+    mean_travel_time_s: float | None = None
+    p90_travel_time_s: float | None = None
+    percent_late: float = 0.0
+    max_edge_density: float | None = None
+
+
 class MetricsCollector:
     """Aggregator that stores per-agent and per-edge metrics."""
 
@@ -49,6 +76,10 @@ class MetricsCollector:
         self.agent_metrics: Dict[str, AgentMetrics] = {}
         self.edge_metrics: Dict[str, EdgeMetrics] = {}
         self.summary = RunSummary()
+        # Simulated time of every recorded edge step (runs may skip idle gaps).
+        self.step_times_s: List[float] = []
+        self.movements: List[MovementMetrics] = []
+        self.period_summaries: Dict[str, PeriodSummary] = {}
 
     def record_agent(self, agent_id: str, metrics: AgentMetrics) -> None:
         self.agent_metrics[agent_id] = metrics
@@ -64,6 +95,12 @@ class MetricsCollector:
         if occupancy >= 1.0:
             metrics.peak_duration_ticks += 1
 
+    def record_step_time(self, time_s: float) -> None:
+        self.step_times_s.append(float(time_s))
+
+    def record_movement(self, movement: MovementMetrics) -> None:
+        self.movements.append(movement)
+
     def record_edge_entry(self, edge_id: str) -> None:
         self.edge_metrics.setdefault(edge_id, EdgeMetrics(edge_id)).throughput_count += 1
 
@@ -103,5 +140,33 @@ class MetricsCollector:
             self.summary.max_edge_density = max_density
             self.summary.congestion_events = congestion_events
             self.summary.total_throughput = total_throughput
-            
+
+        self.period_summaries = self._summarise_periods()
         return self.summary
+
+    def _summarise_periods(self) -> Dict[str, PeriodSummary]:
+        """Segment movement records (and edge peaks over each period's time span) by period."""
+
+        by_period: Dict[str, List[MovementMetrics]] = {}
+        for movement in self.movements:
+            by_period.setdefault(movement.period, []).append(movement)
+
+        summaries: Dict[str, PeriodSummary] = {}
+        for period, movements in by_period.items():
+            summary = PeriodSummary(period=period, movements=len(movements))
+            summary.start_s = min(m.depart_s for m in movements)
+            arrivals = [m.arrival_s for m in movements if m.arrival_s is not None]
+            summary.end_s = max(arrivals) if arrivals else None
+            travel = mergesort([m.travel_time_s for m in movements if m.arrival_s is not None])
+            if travel:
+                summary.mean_travel_time_s = sum(travel) / len(travel)
+                summary.p90_travel_time_s = travel[min(int(0.9 * (len(travel) - 1)), len(travel) - 1)]
+            summary.percent_late = 100.0 * sum(1 for m in movements if m.is_late) / len(movements)
+
+            if self.step_times_s and summary.end_s is not None:
+                lo = bisect.bisect_left(self.step_times_s, summary.start_s)
+                hi = bisect.bisect_right(self.step_times_s, summary.end_s)
+                peaks = [max(m.occupancy_over_time[lo:hi], default=0.0) for m in self.edge_metrics.values()]
+                summary.max_edge_density = max(peaks, default=0.0)
+            summaries[period] = summary
+        return summaries
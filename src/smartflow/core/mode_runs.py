@@ -0,0 +1,380 @@
+"""Headless runs of the RunView simulation modes, optionally in parallel processes.
+
+`prepare_mode_run` builds exactly the population and `SimulationConfig` RunView uses
+for a mode, `SmartFlowModel.finish` applies the end-of-run bookkeeping, and
+`run_modes_parallel` runs several independent modes at once on a process pool.
+
+NEA note (technique):
+    - Modes share nothing while running, so they are embarrassingly parallel; each
+      worker process returns its (pickled) `MetricsCollector`.
+    - Progress is reported through a shared-memory array of doubles (one slot per
+      mode, fraction complete) handed to the workers at start-up, so the UI polls it
+      without any message passing. Workers are spawned, not forked, so they start
+      clean even when the parent is the Tk application.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from .floorplan import FloorPlan
+from .metrics import MetricsCollector
+from .model import SimulationConfig, SmartFlowModel
+from .population import compile_population
+from .timetable import build_day_model
+
+# Modes `prepare_mode_run` knows how to build.
+MODE_NAMES = ("start_of_day", "lesson_changeover", "break_time", "full_day")
+
+# Single-period modes use a fine tick; a full day holds many changeovers.
+SINGLE_RUN_TICK_S = 0.05
+FULL_DAY_TICK_S = 0.1
+
+
+@dataclass
+class ModeRunRequest:
+    """Everything needed to set up one mode run (picklable for worker processes)."""
+
+    mode: str
+    floorplan: FloorPlan
+    duration_s: float = 300.0
+    seed: int = 42
+    scale: float = 1.0
+    disabled_edges: List[str] = field(default_factory=list)
+    # Timetable scenario; required by "full_day".
+    scenario: Dict[str, Any] | None = None
+    # SQLite file for the population cache (agent tables).
+    population_db_path: Path | None = None
+    route_cache_db_path: str | None = None
+    route_cache_layout_hash: str | None = None
+
+
+def prepare_mode_run(request: ModeRunRequest) -> Tuple[SmartFlowModel, int] | None:
+    """Build the model for one mode and the number of ticks to run it for.
+
+    Returns None if the mode produces no agents (e.g. an empty layout, or "full_day"
+    without timetable periods).
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+
+    if request.mode not in MODE_NAMES:
+        raise ValueError(f"Unknown simulation mode '{request.mode}'. Must be one of {list(MODE_NAMES)}")
+    common_config = {
+        "route_cache_db_path": request.route_cache_db_path,
+        "route_cache_layout_hash": request.route_cache_layout_hash,
+        # RunView reports queueing time as delay, so congestion shows even on time.
+        "delay_metric": "waiting",
+    }
+
+    if request.mode == "full_day":
+        if not request.scenario or not request.scenario.get("periods"):
+            return None
+        model = build_day_model(
+            request.floorplan,
+            request.scenario,
+            scale=request.scale,
+            seed=request.seed,
+            tick_seconds=FULL_DAY_TICK_S,
+            db_path=request.population_db_path,
+            disabled_edges=list(request.disabled_edges),
+            k_paths=3,
+            **common_config,
+        )
+        return model, int(model.config.transition_window_s / FULL_DAY_TICK_S)
+
+    # Lesson changeover is procedural too (all students start in rooms, ~20 per
+    # room), for consistency with "Start of Day" and "Break Time".
+    duration = float(request.duration_s)
+    table = compile_population(
+        request.floorplan,
+        mode=request.mode,
+        scale=request.scale,
+        seed=request.seed,
+        params={"duration_s": duration} if request.mode == "break_time" else None,
+        db_path=request.population_db_path,
+    )
+    agents = table.profiles()
+    if not agents:
+        return None
+
+    config = SimulationConfig(
+        tick_seconds=SINGLE_RUN_TICK_S,
+        transition_window_s=duration,
+        random_seed=request.seed,
+        disabled_edges=list(request.disabled_edges),
+        lesson_changeover_s=duration,
+        k_paths=3,  # Enable alternative routes (second fastest) for stochastic agents
+        **common_config,
+    )
+    model = SmartFlowModel(request.floorplan, agents, config)
+    # Let stragglers finish: the run continues past the changeover window.
+    max_sim_s = max(duration * 2.0, duration + 60.0)
+    return model, int(max_sim_s / SINGLE_RUN_TICK_S)
+
+
+# Ticks between progress reports / control checks of a headless run.
+_REPORT_EVERY_TICKS = 50
+
+
+def _drive(
+    model: SmartFlowModel,
+    total_ticks: int,
+    progress: Callable[[SmartFlowModel, int], None] | None,
+    keep_going: Callable[[], bool] | None,
+) -> bool:
+    """Step `model` for up to `total_ticks`; False if `keep_going` aborted the run."""
+
+    tick_s = model.config.tick_seconds
+    tick = 0
+    next_report = _REPORT_EVERY_TICKS
+    while tick < total_ticks and not model.is_complete:
+        model.step()
+        # Follows simulated time, since a full-day model may skip idle gaps.
+        tick = int(round(model.time_s / tick_s)) if model.config.skip_idle_gaps else tick + 1
+        if tick >= next_report:
+            next_report = tick + _REPORT_EVERY_TICKS
+            if progress is not None:
+                progress(model, min(tick, total_ticks))
+            if keep_going is not None and not keep_going():
+                return False
+    if progress is not None:
+        progress(model, total_ticks)
+    return True
+
+
+def run_mode(
+    request: ModeRunRequest,
+    progress: Callable[[float], None] | None = None,
+) -> MetricsCollector | None:
+    """Run one mode to completion without a UI.
+
+    Args:
+        request: Mode and inputs.
+        progress: Optional callback receiving the fraction of ticks done (0-1).
+
+    Returns:
+        The finalised collector, or None if the mode produced no agents.
+    """
+
+    prepared = prepare_mode_run(request)
+    if prepared is None:
+        return None
+    model, total_ticks = prepared
+    report = None if progress is None else (lambda _model, tick: progress(tick / max(1, total_ticks)))
+    _drive(model, total_ticks, report, None)
+    return model.finish()
+
+
+# Shared progress slots of the current worker process (set by `_init_worker`).
+_WORKER_PROGRESS: Any = None
+
+
+def _init_worker(progress: Any) -> None:
+    global _WORKER_PROGRESS
+    _WORKER_PROGRESS = progress
+
+
+def _run_mode_in_worker(slot: int, request: ModeRunRequest) -> MetricsCollector | None:
+    def report(fraction: float) -> None:
+        _WORKER_PROGRESS[slot] = fraction
+
+    return run_mode(request, report if _WORKER_PROGRESS is not None else None)
+
+
+class ParallelModeRuns:
+    """Run several modes on a process pool; poll `progress()` / `completed()` from a UI loop."""
+
+    def __init__(self, requests: Sequence[ModeRunRequest], *, workers: int | None = None) -> None:
+        self.modes = [request.mode for request in requests]
+        if len(set(self.modes)) != len(self.modes):
+            raise ValueError("Each mode may only be run once per batch")
+        # "spawn" so workers never inherit the parent's threads or Tk interpreter state.
+        context = multiprocessing.get_context("spawn")
+        self._progress = context.Array("d", len(requests), lock=False)
+        workers = max(1, min(len(requests), int(workers or multiprocessing.cpu_count() or 1)))
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(self._progress,)
+        )
+        self._pending = {
+            self._pool.submit(_run_mode_in_worker, slot, request): request.mode
+            for slot, request in enumerate(requests)
+        }
+
+    def progress(self) -> Dict[str, float]:
+        """Fraction complete per mode."""
+
+        return {mode: float(self._progress[slot]) for slot, mode in enumerate(self.modes)}
+
+    @property
+    def done(self) -> bool:
+        return not self._pending
+
+    def completed(self, timeout: float | None = 0.0) -> List[Tuple[str, MetricsCollector | None]]:
+        """Results of modes finished since the last call, in completion order.
+
+        Raises:
+            Exception: Re-raises the first error from a failed worker.
+        """
+
+        if not self._pending:
+            return []
+        finished, _ = wait(list(self._pending), timeout=timeout, return_when=FIRST_COMPLETED)
+        results = []
+        for future in finished:
+            mode = self._pending.pop(future)
+            results.append((mode, future.result()))
+        return results
+
+    def cancel(self) -> None:
+        """Drop queued modes; modes already running finish in the background."""
+
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+# Slots of `ModeRunProcess.status`.
+STATUS_TICK, STATUS_TOTAL_TICKS, STATUS_TIME_S, STATUS_ACTIVE_AGENTS = range(4)
+
+
+def _mode_run_main(request: ModeRunRequest, status: Any, running: Any, cancelled: Any, conn: Any) -> None:
+    """Child-process entry point of `ModeRunProcess`."""
+
+    def publish(model: SmartFlowModel, tick: int) -> None:
+        status[STATUS_TICK] = tick
+        status[STATUS_TIME_S] = model.time_s
+        status[STATUS_ACTIVE_AGENTS] = sum(1 for agent in model.agents if agent.active)
+
+    def keep_going() -> bool:
+        running.wait()  # blocks while paused
+        return not cancelled.is_set()
+
+    try:
+        prepared = prepare_mode_run(request)
+        if prepared is None:
+            conn.send(("done", None))
+            return
+        model, total_ticks = prepared
+        status[STATUS_TOTAL_TICKS] = total_ticks
+        if _drive(model, total_ticks, publish, keep_going):
+            conn.send(("done", model.finish()))
+        else:
+            conn.send(("cancelled", None))
+    except Exception as exc:  # reported to the parent instead of dying silently
+        conn.send(("error", f"{type(exc).__name__}: {exc}"))
+    finally:
+        conn.close()
+
+
+class ModeRunProcess:
+    """One mode run in a child process, with pause, resume and cancel.
+
+    The child writes its progress (`STATUS_*` slots: tick, total ticks, simulated
+    time, walking agents) into a shared-memory array that `status()` reads without
+    locking; the finished `MetricsCollector` comes back once over a pipe.
+    """
+
+    def __init__(self, request: ModeRunRequest) -> None:
+        self.mode = request.mode
+        # "spawn" so the child never inherits the parent's threads or Tk interpreter state.
+        context = multiprocessing.get_context("spawn")
+        self._status = context.Array("d", 4, lock=False)
+        self._running = context.Event()
+        self._running.set()
+        self._cancelled = context.Event()
+        self._conn, child_conn = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_mode_run_main,
+            args=(request, self._status, self._running, self._cancelled, child_conn),
+            daemon=True,
+        )
+        self._process.start()
+        child_conn.close()
+        self._outcome: Tuple[str, Any] | None = None
+
+    def status(self) -> Dict[str, float]:
+        """Latest progress published by the child."""
+
+        return {
+            "tick": self._status[STATUS_TICK],
+            "total_ticks": self._status[STATUS_TOTAL_TICKS],
+            "time_s": self._status[STATUS_TIME_S],
+            "active_agents": self._status[STATUS_ACTIVE_AGENTS],
+        }
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def pause(self) -> None:
+        self._running.clear()
+
+    def resume(self) -> None:
+        self._running.set()
+
+    def cancel(self, timeout: float = 2.0) -> None:
+        """Stop the run; the child is terminated if it does not stop within `timeout`."""
+
+        self._cancelled.set()
+        self._running.set()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+        if self._outcome is None:
+            self._outcome = ("cancelled", None)
+
+    def poll(self) -> bool:
+        """True once the run has finished (successfully, with an error, or cancelled)."""
+
+        if self._outcome is None and self._conn.poll():
+            try:
+                self._outcome = self._conn.recv()
+            except EOFError:
+                self._outcome = ("error", "worker process exited unexpectedly")
+            self._process.join()
+        elif self._outcome is None and not self._process.is_alive() and not self._conn.poll():
+            self._outcome = ("error", f"worker process exited with code {self._process.exitcode}")
+        return self._outcome is not None
+
+    def result(self, timeout: float | None = None) -> MetricsCollector | None:
+        """The run's collector (None if the mode produced no agents).
+
+        Raises:
+            TimeoutError: If the run has not finished within `timeout` seconds.
+            RuntimeError: If the run failed or was cancelled.
+        """
+
+        if self._outcome is None and self._conn.poll(timeout):
+            self.poll()
+        if self._outcome is None:
+            raise TimeoutError(f"Mode '{self.mode}' is still running")
+        kind, value = self._outcome
+        if kind == "error":
+            raise RuntimeError(f"Mode '{self.mode}' failed: {value}")
+        if kind == "cancelled":
+            raise RuntimeError(f"Mode '{self.mode}' was cancelled")
+        return value
+
+
+def run_modes_parallel(requests: Sequence[ModeRunRequest], *, workers: int | None = None) -> Dict[str, MetricsCollector | None]:
+    """Run `requests` on a process pool and return the collectors keyed by mode (request order)."""
+
+    runs = ParallelModeRuns(requests, workers=workers)
+    results: Dict[str, MetricsCollector | None] = {}
+    try:
+        while not runs.done:
+            results.update(runs.completed(timeout=None))
+    finally:
+        runs.close()
+    return {mode: results.get(mode) for mode in runs.modes}
@@ -2,26 +2,60 @@
 
 from __future__ import annotations
 
+import bisect
+import hashlib
 import math
 import random
 import json
 from pathlib import Path
 from dataclasses import dataclass, field
-from typing import Dict, Iterable, List, Mapping, Tuple
+from typing import Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple
 import networkx as nx
+import numpy as np
 
 from .agents import AgentProfile, AgentScheduleEntry
 from .dynamics import can_enter_edge, density_speed_factor
 from .floorplan import FloorPlan
-from .metrics import AgentMetrics, MetricsCollector
+from .metrics import AgentMetrics, MetricsCollector, MovementMetrics
+from .cch import CCHMetric, customize_cch
+from .compiled import compile_graph, dijkstra_distances, shortest_path_edges
+from .route_sets import RouteSetCache
+from .snapshots import RenderBuffer
 from .routing import (
+    CLOSED_EDGE_PENALTY,
+    closed_edges,
+    set_edges_closed,
+    stairs_penalty_classes,
     compute_a_star_path,
+    compute_cch_path,
+    compute_hierarchical_path,
     compute_k_shortest_paths,
     compute_path_cost,
     compute_shortest_path,
-    choose_route,
+    choose_route_from_costs,
+    choose_route_indices,
+    landmark_table,
 )
 
+# Distinct stairs penalties per run that get their own portal overlay (`use_hierarchy`).
+_HIERARCHY_MAX_PENALTIES = 8
+
+
+@dataclass(frozen=True)
+class EdgeClosure:
+    """A corridor or stair edge that is shut for part of a run.
+
+    The closure applies to the edge with this ID and to its auto-generated reverse
+    (``<edge_id>_rev``), i.e. the corridor is closed in both directions.
+    """
+
+    edge_id: str
+    start_s: float
+    end_s: float = math.inf
+
+    def is_active(self, time_s: float) -> bool:
+        return self.start_s <= time_s < self.end_s
+
 
 @dataclass
 class SimulationConfig:
@@ -33,6 +67,8 @@ class SimulationConfig:
     k_paths: int = 3
     beta: float = 1.0
     disabled_edges: List[str] = field(default_factory=list)
+    # Time-dependent closures applied during the run (see EdgeClosure).
+    closures: List[EdgeClosure] = field(default_factory=list)
 
     # --- Congestion-aware routing (NEA enhancement) ---
     # These defaults are intentionally conservative. Setting alpha=0 disables the feature.
@@ -40,6 +76,9 @@ class SimulationConfig:
     congestion_p: float = 2.0
     # Approximate maximum comfortable density (people per m^2) used to derive per-edge capacity.
     congestion_jam_density_ppm2: float = 2.5
+    # Optional starting congestion map (e.g. `AssignmentResult.ratios` from a static
+    # assignment) so the first departures already spread over alternative routes.
+    initial_congestion: Dict[Tuple[str, str], float] = field(default_factory=dict)
 
     # --- Rerouting stability controls (anti-oscillation) ---
     # Minimum additional spacing between reroutes (on top of per-agent reroute_interval_ticks).
@@ -76,7 +115,9 @@ class SimulationConfig:
 
     # --- Route caching (SQLite) ---
     # If configured, the model will cache deterministic shortest/k-shortest path sets
-    # (only when congestion-aware routing is disabled).
+    # (only when congestion-aware routing is disabled). `route_cache_layout_hash` is the
+    # cache namespace; with `db.compute_layout_namespace` entries survive layout edits and
+    # only those depending on changed edges are invalidated.
     route_cache_enabled: bool = True
     route_cache_db_path: str | None = None
     route_cache_layout_hash: str | None = None
@@ -85,7 +126,50 @@ class SimulationConfig:
     # If True, use A* with a spatial heuristic instead of Dijkstra for shortest paths.
     # A* can be faster on large graphs with good heuristics.
     use_astar: bool = False
-    astar_heuristic: str = "auto"  # "auto", "euclidean", "haversine", or "zero"
+    astar_heuristic: str = "auto"  # "auto", "euclidean", "haversine", "alt", or "zero"
+    # Number of landmarks for the "alt" heuristic (precomputed once per layout).
+    astar_landmarks: int = 8
+    # If True, shortest paths search only the origin/destination floor (or building)
+    # plus a precomputed overlay of stairs/entrance portals. Exact for static weights;
+    # congestion-weighted searches fall back to Dijkstra. Overlays are built per stairs
+    # penalty, so only a few distinct penalties per run use them: enable
+    # `stairs_penalty_classes` when agents have continuous per-agent penalties.
+    use_hierarchy: bool = False
+    # If True, shortest paths use a customizable contraction hierarchy. The hierarchy is
+    # built once per layout and re-customized (cheaply) whenever the congestion map changes.
+    use_cch: bool = False
+
+    # --- Route choice sets ---
+    # If True (and k_paths > 1), diverse candidate routes are precomputed once per OD pair
+    # and re-costed with array operations, instead of running Yen's algorithm per agent.
+    route_choice_sets: bool = False
+    route_set_size: int = 6
+    # Maximum fraction of a route's length it may share with another route in the set.
+    route_set_max_overlap: float = 0.8
+    # Quantise agents' stairs penalties into at most this many classes for routing, so
+    # searches and route-cache entries are shared (0 = exact per-agent penalties).
+    # The resulting error bound is exposed as `SmartFlowModel.penalty_class_error`.
+    stairs_penalty_classes: int = 0
+    # If True, agents departing (or rerouting at a node) in the same tick towards the same
+    # destination share one candidate search and draw their choices in one vectorised call.
+    batch_route_choice: bool = False
+
+    # --- Streaming populations ---
+    # When agents are passed as an iterator ordered by first departure (see
+    # `scenario_loader.iter_agents_from_scenario`), each agent is admitted this many
+    # seconds before it departs and retired into its metrics record once finished.
+    agent_lookahead_s: float = 60.0
+    # If True, whenever nobody is walking the clock jumps (on the tick grid) straight to
+    # the next departure instead of stepping through idle time, e.g. between the
+    # periods of a full-day timetable. Edge time series then only cover simulated
+    # ticks; `MetricsCollector.step_times_s` gives the time of each.
+    skip_idle_gaps: bool = False
+
+    # --- Metrics ---
+    # What `AgentMetrics.delay_s` measures: "lateness" (seconds past the scheduled
+    # arrival) or "waiting" (seconds spent queueing, so congestion shows even when
+    # agents arrive on time; used by the GUI run and comparison views).
+    delay_metric: str = "lateness"
 
     def __post_init__(self) -> None:
         """Validate configuration integrity on creation."""
@@ -98,7 +182,20 @@ class SimulationConfig:
         if self.congestion_alpha < 0:
             raise ValueError("congestion_alpha cannot be negative")
 
-        valid_heuristics = {"auto", "euclidean", "haversine", "zero"}
+        if self.stairs_penalty_classes < 0:
+            raise ValueError("stairs_penalty_classes cannot be negative")
+
+        if self.agent_lookahead_s < 0:
+            raise ValueError("agent_lookahead_s cannot be negative")
+
+        for closure in self.closures:
+            if not closure.end_s > closure.start_s:
+                raise ValueError(f"Closure of '{closure.edge_id}' must end after it starts")
+
+        if self.delay_metric not in {"lateness", "waiting"}:
+            raise ValueError(f"Invalid delay_metric '{self.delay_metric}'. Must be 'lateness' or 'waiting'")
+
+        valid_heuristics = {"auto", "euclidean", "haversine", "alt", "zero"}
         if self.astar_heuristic not in valid_heuristics:
             raise ValueError(f"Invalid heuristic '{self.astar_heuristic}'. Must be one of {valid_heuristics}")
 
@@ -119,6 +216,8 @@ class AgentRuntimeState:
     lane_index: int = 0 # For multi-lane logic and visualisation
     lateral_offset: float = 0.0 # Visual offset (-1.0 to 1.0) for rendering lanes
     blocked_until_s: float = 0.0 # Agent cannot start next movement until this time
+    movement_start_s: float = 0.0 # When the current movement actually started
+    node: str | None = None # Node whose `node_occupancy` counts this agent (None while walking)
 
     # Scheduling / lateness tracking
     scheduled_arrival_s: float | None = None
@@ -136,11 +235,27 @@ class SmartFlowModel:
         config: SimulationConfig,
         *,
         rng: random.Random | None = None,
+        stairs_penalties: Iterable[float] | None = None,
     ) -> None:
+        """Set up a run.
+
+        Args:
+            floorplan: Layout the agents move on.
+            agents: Agent profiles; an iterator ordered by first departure is streamed.
+            config: Simulation settings.
+            rng: Optional random generator (defaults to one seeded by the config).
+            stairs_penalties: Stairs penalties of the whole population (e.g.
+                `AgentTable.stairs_penalty`). With `stairs_penalty_classes`, a streamed
+                population is then classified once up front instead of from the
+                penalties of its first arrivals.
+        """
         self.floorplan = floorplan
         self.graph: nx.DiGraph = floorplan.to_networkx()
         self.config = config
         
+        self._route_cache_ok = True
+        self._sync_route_cache_layout()
+
         # Apply edge disablements
         if config.disabled_edges:
             # Find edges by ID and remove them
@@ -150,23 +265,303 @@ class SmartFlowModel:
                     edges_to_remove.append((u, v))
             self.graph.remove_edges_from(edges_to_remove)
 
-        self.agents: List[AgentRuntimeState] = [AgentRuntimeState(profile=a) for a in agents]
+        # An iterator of profiles is consumed lazily (streaming); anything else is
+        # materialised up front as before.
+        self._agent_stream: Iterator[AgentProfile] | None = None
+        self._next_profile: AgentProfile | None = None
+        self._last_admitted_s = -math.inf
+        # Streamed agents already retired into `collector.agent_metrics`.
+        self.retired_agents = 0
+        # Set by `finish` once the remaining agents are recorded.
+        self._finished = False
+        # Retired agents still counted in `node_occupancy`, per node. A later streamed
+        # agent departing from that node is the same person, so it takes their place.
+        self._retired_residents: Dict[str, int] = {}
+        if isinstance(agents, Iterator):
+            self._agent_stream = agents
+            self._next_profile = next(agents, None)
+            self.agents: List[AgentRuntimeState] = []
+        else:
+            self.agents = [AgentRuntimeState(profile=a) for a in agents]
         self.collector = MetricsCollector()
         self.rng = rng or random.Random(config.random_seed)
         self.edge_occupancy: Dict[tuple[str, str], float] = {}
         # Latest per-edge congestion ratios (density_ratio). Keyed by (u, v).
         # This is updated once per tick and can be used for debugging, exports, or tests.
-        self.congestion_map: Dict[Tuple[str, str], float] = {}
+        self.congestion_map: Dict[Tuple[str, str], float] = dict(config.initial_congestion)
         self.node_occupancy: Dict[str, int] = {} # Track people in nodes
         self.time_s = 0.0
+        # Simulated seconds jumped over by `skip_idle_gaps`.
+        self.skipped_s = 0.0
+        # If set (e.g. by RunView), every step publishes a render snapshot into it.
+        self.render_buffer: RenderBuffer | None = None
         
         # Initialise node occupancy from starting positions
         for agent in self.agents:
             if agent.profile.schedule:
-                start_node = agent.profile.schedule[0].origin_room
-                self.node_occupancy[start_node] = self.node_occupancy.get(start_node, 0) + 1
+                agent.node = agent.profile.schedule[0].origin_room
+                self.node_occupancy[agent.node] = self.node_occupancy.get(agent.node, 0) + 1
+
+        # Stairs-penalty classes: agents with similar penalties share routing work.
+        self._penalty_classes: Dict[float, float] = {}
+        self._class_values: List[float] = []
+        # Largest |exact - class| stairs penalty (0 when routing is exact per agent).
+        self.penalty_class_error = 0.0
+        if config.stairs_penalty_classes > 0:
+            if stairs_penalties is None and self._agent_stream is None:
+                stairs_penalties = [agent.profile.stairs_penalty for agent in self.agents]
+            if stairs_penalties is not None:
+                self._classify_penalties(np.asarray(stairs_penalties, dtype=float).tolist())
+
+        # Route choice sets: precompute candidates for every scheduled OD pair up front.
+        self.route_sets: RouteSetCache | None = None
+        if config.route_choice_sets and config.k_paths > 1:
+            self.route_sets = RouteSetCache(
+                self.graph,
+                size=max(int(config.route_set_size), int(config.k_paths)),
+                max_overlap=config.route_set_max_overlap,
+            )
+            self.route_sets.precompute(
+                (entry.origin_room, entry.destination_room)
+                for agent in self.agents
+                for entry in agent.profile.schedule
+            )
+        # Per-edge cost arrays for the current congestion map, keyed by stairs penalty.
+        self._edge_cost_source: Mapping[Tuple[str, str], float] | None = None
+        self._edge_cost_cache: Dict[float, np.ndarray] = {}
+        self._candidate_cache: Dict[Tuple[str, str, float], Tuple[List[List[str]], List[float]]] = {}
+        self._cch_metrics: Dict[float, CCHMetric] = {}
+        # Stairs penalties routed over a portal overlay (`use_hierarchy`).
+        self._overlay_penalties: set[float] = set()
+        # Vectorised draws (batched route choice) use their own seeded generator.
+        self.np_rng = np.random.default_rng(config.random_seed)
+
+        # Scheduled closures: graph edges per closure, plus the closed set each cached
+        # candidate entry was computed under (for incremental repair).
+        self._closure_edges: List[List[Tuple[str, str]]] = []
+        for closure in config.closures:
+            ids = {closure.edge_id, f"{closure.edge_id}_rev"}
+            self._closure_edges.append([(u, v) for u, v, data in self.graph.edges(data=True) if data.get("id") in ids])
+        self._candidate_closed: Dict[Tuple[str, str, float], frozenset] = {}
+
+        self._admit_agents()
+
+    def _admit_agents(self) -> None:
+        """Pull streamed agents that depart within the lookahead window into the run.
+
+        NEA note (performance): runtime state exists only for agents about to move or
+        moving, so memory follows concurrency rather than the day's population.
+
+        Raises:
+            ValueError: If the stream is not ordered by first departure time.
+        """
+
+        if self._agent_stream is None:
+            return
+        horizon = self.time_s + float(self.config.agent_lookahead_s)
+        admitted: List[AgentRuntimeState] = []
+        while self._next_profile is not None:
+            profile = self._next_profile
+            depart_s = float(profile.schedule[0].depart_time_s) if profile.schedule else self.time_s
+            if depart_s > horizon:
+                break
+            if depart_s < self._last_admitted_s:
+                raise ValueError(
+                    f"Streamed agents must be ordered by departure time ('{profile.agent_id}' departs at "
+                    f"{depart_s:.1f}s, after an agent departing at {self._last_admitted_s:.1f}s)"
+                )
+            self._last_admitted_s = depart_s
+            admitted.append(AgentRuntimeState(profile=profile))
+            self._next_profile = next(self._agent_stream, None)
+        if not admitted:
+            return
+
+        residents = self._retired_residents
+        for agent in admitted:
+            if agent.profile.schedule:
+                agent.node = start_node = agent.profile.schedule[0].origin_room
+                if residents.get(start_node, 0) > 0:
+                    # Someone who arrived earlier leaves again: already counted.
+                    residents[start_node] -= 1
+                else:
+                    self.node_occupancy[start_node] = self.node_occupancy.get(start_node, 0) + 1
+        if self.config.stairs_penalty_classes > 0:
+            self._classify_penalties([agent.profile.stairs_penalty for agent in admitted])
+        if self.route_sets is not None:
+            self.route_sets.precompute(
+                (entry.origin_room, entry.destination_room)
+                for agent in admitted
+                for entry in agent.profile.schedule
+            )
+        self.agents.extend(admitted)
+
+    def _classify_penalties(self, penalties: Sequence[float]) -> None:
+        """Classify stairs penalties, extending the classes to penalties not seen before.
+
+        The first call classifies exactly (`stairs_penalty_classes`); normally that is
+        the whole population. Only a stream built without `stairs_penalties` starts
+        from its first admitted batch, which fits the classes to early arrivals. Later
+        unseen penalties open a new class while fewer than the configured number
+        exist, and otherwise join the nearest class; `penalty_class_error` tracks the
+        result.
+        """
+
+        if not self._penalty_classes:
+            self._penalty_classes, self.penalty_class_error = stairs_penalty_classes(
+                penalties, self.config.stairs_penalty_classes
+            )
+            self._class_values = sorted(set(self._penalty_classes.values()))
+            return
+        for penalty in map(float, penalties):
+            if penalty in self._penalty_classes:
+                continue
+            values = self._class_values
+            if len(values) < self.config.stairs_penalty_classes:
+                bisect.insort(values, penalty)
+                self._penalty_classes[penalty] = penalty
+                continue
+            i = bisect.bisect_left(values, penalty)
+            nearest = min(values[max(0, i - 1) : i + 1], key=lambda v: abs(v - penalty))
+            self._penalty_classes[penalty] = nearest
+            self.penalty_class_error = max(self.penalty_class_error, abs(nearest - penalty))
+
+    def _retire_agents(self) -> None:
+        """Replace finished streamed agents by their metrics records.
+
+        A retired agent stays in `node_occupancy` where it stopped until a later agent
+        departs from that node (see `_admit_agents`), so occupancy is carried over
+        between periods without counting the same person twice.
+        """
+
+        if self._agent_stream is None or not any(agent.completed for agent in self.agents):
+            return
+        remaining: List[AgentRuntimeState] = []
+        for agent in self.agents:
+            if agent.completed:
+                self.collector.record_agent(agent.profile.agent_id, self._agent_metrics(agent))
+                self.retired_agents += 1
+                if agent.node is not None:
+                    self._retired_residents[agent.node] = self._retired_residents.get(agent.node, 0) + 1
+            else:
+                remaining.append(agent)
+        self.agents = remaining
+
+    def _sync_route_cache_layout(self) -> None:
+        """Let the persistent route cache drop entries invalidated by layout edits.
+
+        Uses the full layout (before `disabled_edges`, which are part of the cache key).
+        """
+
+        if not (
+            self.config.route_cache_enabled
+            and self.config.route_cache_db_path
+            and self.config.route_cache_layout_hash
+        ):
+            return
+        edges = {
+            str(data.get("id", f"{u}->{v}")): (
+                str(u),
+                str(v),
+                float(data.get("length_m", 1.0)),
+                float(data.get("width_m", 1.0)),
+                bool(data.get("is_stairs", False)),
+            )
+            for u, v, data in self.graph.edges(data=True)
+        }
+        try:
+            from smartflow.io import db as dbio
+
+            dbio.sync_route_cache_layout(
+                Path(str(self.config.route_cache_db_path)),
+                str(self.config.route_cache_layout_hash),
+                edges,
+            )
+        except Exception:
+            # Cache must never break routing; a failed sync just disables caching.
+            self._route_cache_ok = False
+
+    def _update_closures(self) -> None:
+        """Open/close scheduled edges for the current time and repair affected routes.
+
+        NEA note (technique):
+            - Only cached candidates that use a newly closed edge, or that were computed
+              while a reopened edge was closed, are dropped; the rest stay valid.
+            - Only agents whose *remaining* path crosses a newly closed edge are rerouted.
+        """
+
+        if not self._closure_edges:
+            return
+        wanted = set()
+        for closure, edges in zip(self.config.closures, self._closure_edges):
+            if closure.is_active(self.time_s):
+                wanted.update(edges)
+        current = closed_edges(self.graph)
+        if wanted == current:
+            return
+
+        opened = set_edges_closed(self.graph, current - wanted, False)
+        closed = set_edges_closed(self.graph, wanted - current, True)
+
+        # Edge costs and CCH metrics depend on every closure; rebuild lazily.
+        self._edge_cost_cache = {}
+        self._cch_metrics = {}
+        for key in list(self._candidate_cache):
+            paths = self._candidate_cache[key][0]
+            touched = any(edge in self._candidate_closed.get(key, frozenset()) for edge in opened) or any(
+                edge in closed for path in paths for edge in zip(path, path[1:])
+            )
+            if touched:
+                del self._candidate_cache[key]
+                self._candidate_closed.pop(key, None)
+
+        if closed:
+            blocked = set(closed)
+            for agent in self.agents:
+                if agent.active and not agent.completed and agent.current_edge is not None:
+                    self._reroute_around_closure(agent, blocked)
+
+    def _reroute_around_closure(self, agent: AgentRuntimeState, blocked: set) -> bool:
+        """Replan the remaining path of an agent whose route crosses a closed edge.
+
+        Agents already inside a closed corridor finish it; the replan starts at the next
+        node. Cooldown and hysteresis do not apply (closures are hard constraints).
+        """
+
+        at_node = agent.position_along_edge <= 0.0
+        start_node = agent.current_edge[0] if at_node else agent.current_edge[1]
+        try:
+            start_index = agent.route.index(start_node)
+        except ValueError:
+            return False
+        remaining = agent.route[start_index:]
+        if not any(edge in blocked for edge in zip(remaining, remaining[1:])):
+            return False
+
+        target_node = agent.profile.schedule[agent.schedule_index].destination_room
+        if start_node == target_node:
+            return False
+        temp_movement = AgentScheduleEntry(
+            period="closure",
+            origin_room=start_node,
+            destination_room=target_node,
+            depart_time_s=self.time_s,
+        )
+        try:
+            candidate = self._select_route(agent.profile, temp_movement)
+        except ValueError:
+            return False
+        if len(candidate) < 2 or candidate == remaining:
+            return False
+
+        agent.route = agent.route[:start_index] + list(candidate)
+        agent.path_nodes = list(agent.route)
+        if at_node:
+            agent.current_edge = (candidate[0], candidate[1])
+            agent.position_along_edge = 0.0
+        return True
 
     def _activate_agents(self) -> None:
+        departing: List[Tuple[AgentRuntimeState, AgentScheduleEntry]] = []
         for agent in self.agents:
             if agent.active or agent.completed:
                 continue
@@ -181,37 +576,76 @@ class SmartFlowModel:
 
             schedule_entry = agent.profile.schedule[agent.schedule_index]
             if schedule_entry.depart_time_s <= self.time_s:
+                departing.append((agent, schedule_entry))
+
+        if not departing:
+            return
+
+        if not self.config.batch_route_choice:
+            for agent, schedule_entry in departing:
                 try:
-                    agent.route = self._select_route(agent.profile, schedule_entry)
-                    agent.active = True
-                    agent.path_nodes = list(agent.route)
-
-                    # Set scheduled arrival for this movement (lesson changeover window).
-                    try:
-                        changeover = float(self.config.lesson_changeover_s)
-                    except Exception:
-                        changeover = 300.0
-                    agent.scheduled_arrival_s = float(schedule_entry.depart_time_s) + max(0.0, changeover)
-                    agent.actual_arrival_s = None
-                    
-                    # Agent leaves the origin node
-                    origin = schedule_entry.origin_room
-                    if self.node_occupancy.get(origin, 0) > 0:
-                        self.node_occupancy[origin] -= 1
-                        
-                    if len(agent.route) < 2:
-                        # Already at destination or invalid path
-                        agent.active = False
-                        agent.schedule_index += 1
-                        # Re-enter destination node immediately
-                        dest = schedule_entry.destination_room
-                        self.node_occupancy[dest] = self.node_occupancy.get(dest, 0) + 1
-                    else:
-                        agent.current_edge = (agent.route[0], agent.route[1])
-                        agent.position_along_edge = 0.0
+                    route = self._select_route(agent.profile, schedule_entry)
                 except ValueError:
                     # Pathfinding failed, skip this movement
                     agent.schedule_index += 1
+                    continue
+                self._start_movement(agent, schedule_entry, route)
+            return
+
+        # NEA note (performance): agents sharing an OD pair are routed as one group.
+        groups: Dict[Tuple[str, str], List[Tuple[AgentRuntimeState, AgentScheduleEntry]]] = {}
+        for agent, schedule_entry in departing:
+            key = (schedule_entry.origin_room, schedule_entry.destination_room)
+            groups.setdefault(key, []).append((agent, schedule_entry))
+
+        for (origin, destination), members in groups.items():
+            try:
+                routes = self._select_routes_batch([a.profile for a, _ in members], origin, destination)
+            except ValueError:
+                for agent, _ in members:
+                    agent.schedule_index += 1
+                continue
+            for (agent, schedule_entry), route in zip(members, routes):
+                self._start_movement(agent, schedule_entry, route)
+
+    def _start_movement(
+        self,
+        agent: AgentRuntimeState,
+        schedule_entry: AgentScheduleEntry,
+        route: List[str],
+    ) -> None:
+        """Put an agent on its chosen route for the given schedule entry."""
+
+        agent.route = route
+        agent.active = True
+        agent.path_nodes = list(agent.route)
+        agent.movement_start_s = self.time_s
+
+        # Set scheduled arrival for this movement (lesson changeover window).
+        try:
+            changeover = float(self.config.lesson_changeover_s)
+        except Exception:
+            changeover = 300.0
+        agent.scheduled_arrival_s = float(schedule_entry.depart_time_s) + max(0.0, changeover)
+        agent.actual_arrival_s = None
+        
+        # Agent leaves the origin node
+        origin = schedule_entry.origin_room
+        if self.node_occupancy.get(origin, 0) > 0:
+            self.node_occupancy[origin] -= 1
+        agent.node = None
+            
+        if len(agent.route) < 2:
+            # Already at destination or invalid path
+            agent.active = False
+            agent.schedule_index += 1
+            # Re-enter destination node immediately
+            dest = schedule_entry.destination_room
+            self.node_occupancy[dest] = self.node_occupancy.get(dest, 0) + 1
+            agent.node = dest
+        else:
+            agent.current_edge = (agent.route[0], agent.route[1])
+            agent.position_along_edge = 0.0
 
     def _is_stairs_edge(self, u: str, v: str, edge_data: dict) -> bool:
         if bool(edge_data.get("is_stairs", False)):
@@ -280,15 +714,38 @@ class SmartFlowModel:
         """Compute primary shortest path using either Dijkstra or A*.
         
         When config.use_astar is True, uses A* with the configured heuristic.
+        When config.use_hierarchy is True, uses the portal overlay (compute_hierarchical_path).
+        When config.use_cch is True, uses the customized contraction hierarchy (compute_cch_path).
         Otherwise falls back to Dijkstra (compute_shortest_path).
         """
+        if self.config.use_cch and stairs_penalty >= 0:
+            return list(compute_cch_path(
+                self.graph,
+                origin,
+                destination,
+                metric=self._cch_metric(stairs_penalty),
+            ))
+        if self.config.use_hierarchy and self._overlay_admits(stairs_penalty):
+            return list(compute_hierarchical_path(
+                self.graph,
+                origin,
+                destination,
+                stairs_penalty=stairs_penalty,
+                congestion_map=self.congestion_map,
+                congestion_alpha=self.config.congestion_alpha,
+                congestion_p=self.config.congestion_p,
+            ))
         if self.config.use_astar:
+            landmarks = None
+            if self.config.astar_heuristic == "alt":
+                landmarks = landmark_table(self.graph, count=self.config.astar_landmarks)
             return list(compute_a_star_path(
                 self.graph,
                 origin,
                 destination,
                 stairs_penalty=stairs_penalty,
                 heuristic=self.config.astar_heuristic,
+                landmarks=landmarks,
                 congestion_map=self.congestion_map,
                 congestion_alpha=self.config.congestion_alpha,
                 congestion_p=self.config.congestion_p,
@@ -303,24 +760,249 @@ class SmartFlowModel:
                 congestion_alpha=self.config.congestion_alpha,
                 congestion_p=self.config.congestion_p,
             ))
-    def _select_route(self, profile: AgentProfile, movement: AgentScheduleEntry) -> List[str]:
-        """Select a route for an agent.
 
-        NEA note (validity):
-            - `optimality_beta` controls how strongly agents prefer lower-cost routes.
-              Higher beta => more deterministic “shortest path” behaviour.
-            - `detour_probability` injects occasional exploration, preventing all agents
-              converging on the same corridor in unrealistic lock-step.
+    def _overlay_admits(self, stairs_penalty: float) -> bool:
+        """True if searches with this stairs penalty may use a portal overlay.
 
-        This method supports congestion-aware costs via `self.congestion_map`.
+        Each penalty needs its own overlay. The first `_HIERARCHY_MAX_PENALTIES`
+        distinct penalties of a run get one; later ones use the flat search, so
+        continuous per-agent penalties do not rebuild an overlay per agent.
         """
 
+        key = float(stairs_penalty)
+        if key in self._overlay_penalties:
+            return True
+        if len(self._overlay_penalties) >= _HIERARCHY_MAX_PENALTIES:
+            return False
+        self._overlay_penalties.add(key)
+        return True
+
+    def _cch_metric(self, stairs_penalty: float) -> CCHMetric:
+        """CCH customized for the current congestion map (memoised until it changes)."""
+
+        self._sync_congestion_caches()
+        key = float(stairs_penalty)
+        metric = self._cch_metrics.get(key)
+        if metric is None:
+            metric = customize_cch(
+                self.graph,
+                stairs_penalty=key,
+                congestion_map=self.congestion_map,
+                congestion_alpha=self.config.congestion_alpha,
+                congestion_p=self.config.congestion_p,
+                closed=closed_edges(self.graph),
+                closed_penalty=CLOSED_EDGE_PENALTY,
+            )
+            self._cch_metrics[key] = metric
+        return metric
+
+    def _sync_congestion_caches(self) -> None:
+        """Drop per-congestion-map memos when the congestion map has been replaced.
+
+        With congestion-aware routing disabled, costs never depend on the map, so the
+        memos stay valid for the whole run.
+        """
+
+        if float(self.config.congestion_alpha) <= 0.0:
+            return
+        if self._edge_cost_source is not self.congestion_map:
+            self._edge_cost_source = self.congestion_map
+            self._edge_cost_cache = {}
+            self._candidate_cache = {}
+            self._candidate_closed = {}
+            self._cch_metrics = {}
+
+    def _edge_costs(self, stairs_penalty: float) -> np.ndarray:
+        """Per-edge costs under the current congestion map (memoised until it changes)."""
+
+        self._sync_congestion_caches()
+        key = float(stairs_penalty)
+        costs = self._edge_cost_cache.get(key)
+        if costs is None:
+            compiled = compile_graph(self.graph)
+            costs = compiled.edge_costs(
+                stairs_penalty=key,
+                congestion=compiled.congestion_array(self.congestion_map),
+                congestion_alpha=self.config.congestion_alpha,
+                congestion_p=self.config.congestion_p,
+            )
+            for edge in closed_edges(self.graph):
+                costs[compiled.edge_index[edge]] += CLOSED_EDGE_PENALTY
+            self._edge_cost_cache[key] = costs
+        return costs
+
+    def _path_cost(self, path: Sequence[str], stairs_penalty: float) -> float:
+        """Cost of a path under the current congestion map."""
+
+        if self.route_sets is None:
+            return compute_path_cost(
+                self.graph,
+                path,
+                stairs_penalty=stairs_penalty,
+                congestion_map=self.congestion_map,
+                congestion_alpha=self.config.congestion_alpha,
+                congestion_p=self.config.congestion_p,
+            )
+        if len(path) < 2:
+            return 0.0
+        idx = compile_graph(self.graph).path_edge_indices(path)
+        if idx is None:
+            return float("inf")
+        return float(self._edge_costs(stairs_penalty)[idx].sum())
+
+    def _route_beta(self, profile: AgentProfile) -> float:
+        """Per-agent softmax beta, lowered for occasional exploratory detours."""
+
+        # Use per-agent beta (agent heterogeneity) but preserve config.beta as a fallback.
+        beta = self._base_beta(profile)
+        if self.config.k_paths > 1 and self.rng.random() < float(profile.detour_probability):
+            # NEA note: exploration makes behaviour more realistic and reduces oscillation.
+            beta = max(0.1, beta * 0.3)
+        return beta
+
+    def _routing_penalty(self, profile: AgentProfile) -> float:
+        """Stairs penalty used for routing (the agent's class value when classes are enabled)."""
+
+        penalty = float(profile.stairs_penalty)
+        return self._penalty_classes.get(penalty, penalty)
+
+    def _base_beta(self, profile: AgentProfile) -> float:
+        return float(profile.optimality_beta) if getattr(profile, "optimality_beta", None) is not None else float(self.config.beta)
+
+    def _route_candidates(
+        self,
+        origin: str,
+        destination: str,
+        stairs_penalty: float,
+    ) -> Tuple[List[List[str]], List[float]]:
+        """Return candidate routes (primary first) and their current costs.
+
+        Memoised per (origin, destination, stairs penalty) until the congestion map
+        changes, so agents departing together share one search.
+
+        Raises:
+            ValueError: If no path exists.
+        """
+
+        self._sync_congestion_caches()
+        key = (origin, destination, float(stairs_penalty))
+        hit = self._candidate_cache.get(key)
+        if hit is not None:
+            return hit
+
+        if self.route_sets is not None:
+            route_set = self.route_sets.get(origin, destination)
+            if not len(route_set):
+                raise ValueError(f"No path from {origin} to {destination}")
+            edge_costs = self._edge_costs(stairs_penalty)
+            paths, costs = route_set.cheapest(edge_costs, self.config.k_paths)
+            result = ([list(p) for p in paths], costs)
+            if costs[0] >= CLOSED_EDGE_PENALTY:
+                result = self._repair_blocked_candidates(origin, destination, edge_costs, result)
+        else:
+            try:
+                paths = self._search_routes(origin, destination, stairs_penalty)
+            except (nx.NetworkXNoPath, nx.NodeNotFound):
+                raise ValueError(f"No path from {origin} to {destination}") from None
+            costs = [
+                compute_path_cost(
+                    self.graph,
+                    path,
+                    stairs_penalty=stairs_penalty,
+                    congestion_map=self.congestion_map,
+                    congestion_alpha=self.config.congestion_alpha,
+                    congestion_p=self.config.congestion_p,
+                )
+                for path in paths
+            ]
+            result = (paths, costs)
+
+        self._candidate_cache[key] = result
+        self._candidate_closed[key] = closed_edges(self.graph)
+        return result
+
+    def _repair_blocked_candidates(
+        self,
+        origin: str,
+        destination: str,
+        edge_costs: np.ndarray,
+        candidates: Tuple[List[List[str]], List[float]],
+    ) -> Tuple[List[List[str]], List[float]]:
+        """Add a detour when every precomputed route crosses a closed edge.
+
+        The shared route set itself is left untouched (it is valid again once the
+        closure ends); the detour only lives in this model's candidate cache.
+        """
+
+        compiled = compile_graph(self.graph)
+        s, t = compiled.node_index.get(origin), compiled.node_index.get(destination)
+        if s is None or t is None:
+            return candidates
+        edges = shortest_path_edges(compiled, edge_costs, s, t)
+        if not edges:
+            return candidates
+        detour = [origin] + [compiled.node_ids[int(compiled.edge_dst[e])] for e in edges]
+        cost = float(edge_costs[edges].sum())
+        if cost >= candidates[1][0] or detour in candidates[0]:
+            return candidates
+        return [detour] + candidates[0], [cost] + candidates[1]
+
+    def _route_cache_key_parts(self, *parts: str) -> List[str]:
+        """Cache key parts: result kind plus everything besides the layout that shapes it."""
+
+        if self.config.use_cch:
+            algorithm = "cch"
+        elif self.config.use_hierarchy:
+            algorithm = "hierarchy"
+        elif self.config.use_astar:
+            algorithm = f"astar:{self.config.astar_heuristic}"
+        else:
+            algorithm = "dijkstra"
+        disabled = hashlib.sha256("|".join(sorted(self.config.disabled_edges)).encode("utf-8")).hexdigest()[:16]
+        return [*parts, algorithm, f"disabled:{disabled}"]
+
+    def _route_cache_dependencies(
+        self,
+        origin: str,
+        paths: Sequence[Sequence[str]],
+        stairs_penalty: float,
+    ) -> Tuple[List[str], List[str]]:
+        """Edge and node dependencies of a cached route set (see `db.get_or_create_cached_route`).
+
+        NEA note (technique):
+            - Making an edge *more* expensive can only change the result if a cached
+              path uses it, so those edge IDs are recorded.
+            - Making an edge *cheaper* (or adding one) can only help if its source is
+              closer to the origin than the most expensive cached path, so the nodes
+              inside that Dijkstra ball are recorded. The search stops at the ball's
+              radius instead of settling the whole graph.
+        """
+
+        compiled = compile_graph(self.graph)
+        costs = compiled.edge_costs(stairs_penalty=stairs_penalty)
+        dep_edges = set()
+        radius = 0.0
+        for path in paths:
+            idx = compiled.path_edge_indices(path)
+            if idx is None:
+                continue
+            dep_edges.update(compiled.edge_ids[int(e)] for e in idx)
+            radius = max(radius, float(costs[idx].sum()))
+        dist = dijkstra_distances(compiled, costs, compiled.node_index[str(origin)], limit=radius)
+        dep_nodes = [compiled.node_ids[int(i)] for i in np.flatnonzero(dist <= radius)]
+        return sorted(dep_edges), dep_nodes
+
+    def _search_routes(self, origin: str, destination: str, stairs_penalty: float) -> List[List[str]]:
+        """Graph search for the primary route and (if k_paths > 1) its alternatives."""
+
         # Route caching: only safe when congestion-aware routing is disabled.
         can_cache = (
-            bool(self.config.route_cache_enabled)
+            self._route_cache_ok
+            and bool(self.config.route_cache_enabled)
             and bool(self.config.route_cache_db_path)
             and bool(self.config.route_cache_layout_hash)
             and float(self.config.congestion_alpha) <= 0.0
+            and not closed_edges(self.graph)
         )
 
         if can_cache:
@@ -330,31 +1012,30 @@ class SmartFlowModel:
                 cached = dbio.get_or_create_cached_route(
                     Path(str(self.config.route_cache_db_path)),
                     layout_hash=str(self.config.route_cache_layout_hash),
-                    origin=movement.origin_room,
-                    destination=movement.destination_room,
-                    stairs_penalty=float(profile.stairs_penalty),
-                    key_parts=["shortest"],
+                    origin=origin,
+                    destination=destination,
+                    stairs_penalty=float(stairs_penalty),
+                    key_parts=self._route_cache_key_parts("shortest"),
                 )
                 if cached:
                     primary = json.loads(cached)
                 else:
-                    primary = self._compute_primary_path(
-                        movement.origin_room,
-                        movement.destination_room,
-                        stairs_penalty=profile.stairs_penalty,
-                    )
+                    primary = self._compute_primary_path(origin, destination, stairs_penalty=stairs_penalty)
+                    dep_edges, dep_nodes = self._route_cache_dependencies(origin, [primary], stairs_penalty)
                     dbio.get_or_create_cached_route(
                         Path(str(self.config.route_cache_db_path)),
                         layout_hash=str(self.config.route_cache_layout_hash),
-                        origin=movement.origin_room,
-                        destination=movement.destination_room,
-                        stairs_penalty=float(profile.stairs_penalty),
-                        key_parts=["shortest"],
+                        origin=origin,
+                        destination=destination,
+                        stairs_penalty=float(stairs_penalty),
+                        key_parts=self._route_cache_key_parts("shortest"),
                         path_json=json.dumps(list(primary)),
+                        dep_edges=dep_edges,
+                        dep_nodes=dep_nodes,
                         cost=compute_path_cost(
                             self.graph,
                             primary,
-                            stairs_penalty=profile.stairs_penalty,
+                            stairs_penalty=stairs_penalty,
                             congestion_map=self.congestion_map,
                             congestion_alpha=self.config.congestion_alpha,
                             congestion_p=self.config.congestion_p,
@@ -362,28 +1043,29 @@ class SmartFlowModel:
                     )
             except Exception:
                 # Cache must never break routing.
-                primary = self._compute_primary_path(
-                    movement.origin_room,
-                    movement.destination_room,
-                    stairs_penalty=profile.stairs_penalty,
-                )
+                primary = self._compute_primary_path(origin, destination, stairs_penalty=stairs_penalty)
         else:
-            try:
-                primary = self._compute_primary_path(
-                    movement.origin_room,
-                    movement.destination_room,
-                    stairs_penalty=profile.stairs_penalty,
-                )
-            except nx.NetworkXNoPath:
-                raise ValueError(f"No path from {movement.origin_room} to {movement.destination_room}") from None
+            primary = self._compute_primary_path(origin, destination, stairs_penalty=stairs_penalty)
 
         # Keep the original error shape for callers.
         if not primary:
-            raise ValueError(f"No path from {movement.origin_room} to {movement.destination_room}")
-        
+            raise ValueError(f"No path from {origin} to {destination}")
+
         if self.config.k_paths <= 1:
-            return list(primary)
-            
+            return [list(primary)]
+
+        def k_shortest() -> List[Sequence[str]]:
+            return compute_k_shortest_paths(
+                self.graph,
+                origin,
+                destination,
+                k=self.config.k_paths,
+                stairs_penalty=stairs_penalty,
+                congestion_map=self.congestion_map,
+                congestion_alpha=self.config.congestion_alpha,
+                congestion_p=self.config.congestion_p,
+            )
+
         if can_cache:
             try:
                 from smartflow.io import db as dbio
@@ -391,78 +1073,107 @@ class SmartFlowModel:
                 cached_k = dbio.get_or_create_cached_route(
                     Path(str(self.config.route_cache_db_path)),
                     layout_hash=str(self.config.route_cache_layout_hash),
-                    origin=movement.origin_room,
-                    destination=movement.destination_room,
-                    stairs_penalty=float(profile.stairs_penalty),
-                    key_parts=["kpaths", str(int(self.config.k_paths))],
+                    origin=origin,
+                    destination=destination,
+                    stairs_penalty=float(stairs_penalty),
+                    key_parts=self._route_cache_key_parts("kpaths", str(int(self.config.k_paths))),
                 )
                 if cached_k:
                     paths = json.loads(cached_k)
                 else:
-                    paths = compute_k_shortest_paths(
-                        self.graph,
-                        movement.origin_room,
-                        movement.destination_room,
-                        k=self.config.k_paths,
-                        stairs_penalty=profile.stairs_penalty,
-                        congestion_map=self.congestion_map,
-                        congestion_alpha=self.config.congestion_alpha,
-                        congestion_p=self.config.congestion_p,
-                    )
+                    paths = k_shortest()
+                    dep_edges, dep_nodes = self._route_cache_dependencies(origin, paths, stairs_penalty)
                     dbio.get_or_create_cached_route(
                         Path(str(self.config.route_cache_db_path)),
                         layout_hash=str(self.config.route_cache_layout_hash),
-                        origin=movement.origin_room,
-                        destination=movement.destination_room,
-                        stairs_penalty=float(profile.stairs_penalty),
-                        key_parts=["kpaths", str(int(self.config.k_paths))],
+                        origin=origin,
+                        destination=destination,
+                        stairs_penalty=float(stairs_penalty),
+                        key_parts=self._route_cache_key_parts("kpaths", str(int(self.config.k_paths))),
                         path_json=json.dumps([list(p) for p in paths]),
                         cost=None,
+                        dep_edges=dep_edges,
+                        dep_nodes=dep_nodes,
                     )
             except Exception:
-                paths = compute_k_shortest_paths(
-                    self.graph,
-                    movement.origin_room,
-                    movement.destination_room,
-                    k=self.config.k_paths,
-                    stairs_penalty=profile.stairs_penalty,
-                    congestion_map=self.congestion_map,
-                    congestion_alpha=self.config.congestion_alpha,
-                    congestion_p=self.config.congestion_p,
-                )
+                paths = k_shortest()
         else:
-            paths = compute_k_shortest_paths(
-                self.graph,
-                movement.origin_room,
-                movement.destination_room,
-                k=self.config.k_paths,
-                stairs_penalty=profile.stairs_penalty,
-                congestion_map=self.congestion_map,
-                congestion_alpha=self.config.congestion_alpha,
-                congestion_p=self.config.congestion_p,
-            )
+            paths = k_shortest()
         if not paths:
-            return list(primary)
-            
-        # Pass graph to choose_route for weighted cost calculation.
-        # Use per-agent beta (agent heterogeneity) but preserve config.beta as a fallback.
-        beta = float(profile.optimality_beta) if getattr(profile, "optimality_beta", None) is not None else float(self.config.beta)
-        if self.config.k_paths > 1 and self.rng.random() < float(profile.detour_probability):
-            # NEA note: exploration makes behaviour more realistic and reduces oscillation.
-            beta = max(0.1, beta * 0.3)
+            return [list(primary)]
+        return [list(p) for p in paths]
 
-        return list(
-            choose_route(
-                paths,
-                beta,
-                graph=self.graph,
-                rng=self.rng,
-                stairs_penalty=profile.stairs_penalty,
-                congestion_map=self.congestion_map,
-                congestion_alpha=self.config.congestion_alpha,
-                congestion_p=self.config.congestion_p,
-            )
+    def _select_route(self, profile: AgentProfile, movement: AgentScheduleEntry) -> List[str]:
+        """Select a route for an agent.
+
+        NEA note (validity):
+            - `optimality_beta` controls how strongly agents prefer lower-cost routes.
+              Higher beta => more deterministic “shortest path” behaviour.
+            - `detour_probability` injects occasional exploration, preventing all agents
+              converging on the same corridor in unrealistic lock-step.
+
+        This method supports congestion-aware costs via `self.congestion_map`.
+        """
+
+        paths, costs = self._route_candidates(
+            movement.origin_room, movement.destination_room, self._routing_penalty(profile)
         )
+        if self.config.k_paths <= 1:
+            return list(paths[0])
+
+        beta = self._route_beta(profile)
+        return list(choose_route_from_costs(paths, costs, beta, rng=self.rng))
+
+    def _select_routes_batch(
+        self,
+        profiles: Sequence[AgentProfile],
+        origin: str,
+        destination: str,
+    ) -> List[List[str]]:
+        """Select routes for several agents travelling the same OD pair in one pass.
+
+        Raises:
+            ValueError: If no path exists.
+        """
+
+        return [route for route, _ in self._choose_routes_batch(profiles, origin, destination)]
+
+    def _choose_routes_batch(
+        self,
+        profiles: Sequence[AgentProfile],
+        origin: str,
+        destination: str,
+    ) -> List[Tuple[List[str], float]]:
+        """Choose a (route, cost) pair for each agent sharing one OD pair.
+
+        Candidates and costs are computed once per stairs penalty; each agent's
+        exploration and softmax draws then happen in a single vectorised call.
+        Per agent, the choice distribution is the same as `_select_route`.
+
+        Raises:
+            ValueError: If no path exists.
+        """
+
+        chosen: List[Tuple[List[str], float]] = [([], 0.0) for _ in profiles]
+        by_penalty: Dict[float, List[int]] = {}
+        for i, profile in enumerate(profiles):
+            by_penalty.setdefault(self._routing_penalty(profile), []).append(i)
+
+        for penalty, members in by_penalty.items():
+            paths, costs = self._route_candidates(origin, destination, penalty)
+            if self.config.k_paths <= 1 or len(paths) == 1:
+                for i in members:
+                    chosen[i] = (list(paths[0]), float(costs[0]))
+                continue
+            picks = choose_route_indices(
+                costs,
+                [self._base_beta(profiles[i]) for i in members],
+                [float(profiles[i].detour_probability) for i in members],
+                self.np_rng,
+            )
+            for i, pick in zip(members, picks.tolist()):
+                chosen[i] = (list(paths[pick]), float(costs[pick]))
+        return chosen
 
     def _edge_capacity_people(self, edge_data: dict) -> float:
         """Estimate a soft capacity (people) for a corridor edge.
@@ -523,27 +1234,64 @@ class SmartFlowModel:
               mid-corridor teleports.
         """
 
-        if not agent.current_edge:
+        decision = self._reroute_decision_point(agent, current_tick=current_tick)
+        if decision is None:
             return False
+        start_node, target_node = decision
+
+        # Propose a new route from this node using congestion-weighted costs.
+        temp_movement = AgentScheduleEntry(
+            period="reroute",
+            origin_room=start_node,
+            destination_room=target_node,
+            depart_time_s=self.time_s,
+        )
+
+        try:
+            candidate = self._select_route(agent.profile, temp_movement)
+        except ValueError:
+            return False
+
+        return self._apply_reroute(agent, candidate, current_tick=current_tick)
+
+    def _reroute_decision_point(self, agent: AgentRuntimeState, *, current_tick: int) -> Tuple[str, str] | None:
+        """Return (current node, destination) if the agent may reroute this tick, else None."""
+
+        if not agent.current_edge:
+            return None
 
         # Only reroute at the start of the current edge (i.e., agent is at a node).
         if agent.position_along_edge > 0.0:
-            return False
+            return None
 
         schedule_entry = agent.profile.schedule[agent.schedule_index]
         start_node = agent.current_edge[0]
         target_node = schedule_entry.destination_room
         if start_node == target_node:
-            return False
+            return None
 
         # Enforce cooldown spacing.
         min_spacing = max(int(agent.profile.reroute_interval_ticks), int(self.config.reroute_cooldown_ticks))
         if min_spacing > 0 and (current_tick - agent.last_reroute_tick) < min_spacing:
-            return False
+            return None
 
         # Only reroute after meaningful delay (keeps behaviour stable and defensible).
         if agent.waiting_time_s < float(self.config.reroute_delay_threshold_s):
-            return False
+            return None
+
+        return start_node, target_node
+
+    def _apply_reroute(
+        self,
+        agent: AgentRuntimeState,
+        candidate: List[str],
+        *,
+        current_tick: int,
+        new_cost: float | None = None,
+    ) -> bool:
+        """Adopt `candidate` from the agent's current node if it passes hysteresis."""
+
+        start_node = agent.current_edge[0] if agent.current_edge else candidate[0]
 
         # Build the current planned suffix from start_node.
         try:
@@ -555,19 +1303,6 @@ class SmartFlowModel:
             start_index = 0
             current_suffix = [start_node]
 
-        # Propose a new route from this node using congestion-weighted costs.
-        temp_movement = AgentScheduleEntry(
-            period="reroute",
-            origin_room=start_node,
-            destination_room=target_node,
-            depart_time_s=self.time_s,
-        )
-
-        try:
-            candidate = self._select_route(agent.profile, temp_movement)
-        except ValueError:
-            return False
-
         if candidate == current_suffix or len(candidate) < 2:
             return False
 
@@ -575,24 +1310,11 @@ class SmartFlowModel:
         # If we do not have a meaningful planned suffix, treat the old cost as
         # effectively infinite so we can recover to a valid route.
         if len(current_suffix) >= 2:
-            old_cost = compute_path_cost(
-                self.graph,
-                current_suffix,
-                stairs_penalty=agent.profile.stairs_penalty,
-                congestion_map=self.congestion_map,
-                congestion_alpha=self.config.congestion_alpha,
-                congestion_p=self.config.congestion_p,
-            )
+            old_cost = self._path_cost(current_suffix, self._routing_penalty(agent.profile))
         else:
             old_cost = float("inf")
-        new_cost = compute_path_cost(
-            self.graph,
-            candidate,
-            stairs_penalty=agent.profile.stairs_penalty,
-            congestion_map=self.congestion_map,
-            congestion_alpha=self.config.congestion_alpha,
-            congestion_p=self.config.congestion_p,
-        )
+        if new_cost is None:
+            new_cost = self._path_cost(candidate, self._routing_penalty(agent.profile))
 
         margin = max(0.0, float(self.config.reroute_hysteresis_margin))
         threshold = old_cost * (1.0 - margin)
@@ -611,6 +1333,35 @@ class SmartFlowModel:
         agent.last_reroute_tick = current_tick
         return True
 
+    def _reroute_at_nodes(self, *, current_tick: int) -> int:
+        """Batched rerouting: one candidate computation per (current node, destination).
+
+        Eligibility (cooldown, delay threshold) and hysteresis are still applied per
+        agent, so individual decisions follow the same rules as `_attempt_reroute`.
+
+        Returns:
+            Number of agents whose route changed.
+        """
+
+        groups: Dict[Tuple[str, str], List[AgentRuntimeState]] = {}
+        for agent in self.agents:
+            if not agent.active or agent.completed:
+                continue
+            decision = self._reroute_decision_point(agent, current_tick=current_tick)
+            if decision is not None:
+                groups.setdefault(decision, []).append(agent)
+
+        changed = 0
+        for (start_node, target_node), members in groups.items():
+            try:
+                choices = self._choose_routes_batch([a.profile for a in members], start_node, target_node)
+            except ValueError:
+                continue
+            for agent, (candidate, cost) in zip(members, choices):
+                if self._apply_reroute(agent, candidate, current_tick=current_tick, new_cost=cost):
+                    changed += 1
+        return changed
+
     def _advance_agent(
         self,
         agent: AgentRuntimeState,
@@ -623,9 +1374,10 @@ class SmartFlowModel:
         if agent.current_edge is None or not agent.active:
             return
 
-        # Rerouting Logic (congestion-aware + stable)
-        current_tick = int(self.time_s / self.config.tick_seconds)
-        self._attempt_reroute(agent, current_tick=current_tick)
+        # Rerouting Logic (congestion-aware + stable). Batched runs reroute in `step`.
+        if not self.config.batch_route_choice:
+            current_tick = int(self.time_s / self.config.tick_seconds)
+            self._attempt_reroute(agent, current_tick=current_tick)
 
         edge_data = self.graph.get_edge_data(*agent.current_edge)
         length_m = edge_data.get("length_m", 1.0)
@@ -636,7 +1388,7 @@ class SmartFlowModel:
         
         # Check entry condition if at start of edge
         if agent.position_along_edge <= 0.0:
-            if not can_enter_edge(occupancy + entered_this_tick, length_m, width_m):
+            if edge_data.get("closed", False) or not can_enter_edge(occupancy + entered_this_tick, length_m, width_m):
                 agent.waiting_time_s += self.config.tick_seconds
                 queue_counts[agent.current_edge] = queue_counts.get(agent.current_edge, 0) + 1
                 return
@@ -724,11 +1476,24 @@ class SmartFlowModel:
             # Reached destination for this movement
             # Enter the node permanently (until next schedule)
             self.node_occupancy[target_node_id] = current_node_occ + 1
+            agent.node = target_node_id
 
             # Record actual arrival and lateness for this movement.
             agent.actual_arrival_s = float(self.time_s)
-            if agent.scheduled_arrival_s is not None and agent.actual_arrival_s > float(agent.scheduled_arrival_s):
+            movement_late = agent.scheduled_arrival_s is not None and agent.actual_arrival_s > float(agent.scheduled_arrival_s)
+            if movement_late:
                 agent.is_late = True
+            entry = agent.profile.schedule[agent.schedule_index]
+            self.collector.record_movement(
+                MovementMetrics(
+                    agent_id=agent.profile.agent_id,
+                    period=str(entry.period),
+                    depart_s=float(entry.depart_time_s),
+                    arrival_s=agent.actual_arrival_s,
+                    travel_time_s=agent.actual_arrival_s - agent.movement_start_s,
+                    is_late=movement_late,
+                )
+            )
             
             agent.active = False
             agent.current_edge = None
@@ -766,13 +1531,43 @@ class SmartFlowModel:
             if agent.position_along_edge > 0.0:
                 next_occupancy[agent.current_edge] = next_occupancy.get(agent.current_edge, 0.0) + 1.0
 
+    def _skip_idle_gap(self) -> None:
+        """Jump to the tick before the next departure when nobody is walking."""
+
+        if any(agent.active for agent in self.agents):
+            return
+        next_s = math.inf
+        for agent in self.agents:
+            if not agent.completed and agent.schedule_index < len(agent.profile.schedule):
+                depart_s = float(agent.profile.schedule[agent.schedule_index].depart_time_s)
+                next_s = min(next_s, max(depart_s, float(agent.blocked_until_s)))
+        if self._next_profile is not None and self._next_profile.schedule:
+            next_s = min(next_s, float(self._next_profile.schedule[0].depart_time_s))
+        for closure in self.config.closures:
+            for edge_s in (closure.start_s, closure.end_s):
+                if edge_s > self.time_s:
+                    next_s = min(next_s, edge_s)
+        if not math.isfinite(next_s):
+            return
+        tick = self.config.tick_seconds
+        ticks = math.floor((next_s - self.time_s) / tick)
+        if ticks > 0:
+            self.time_s += ticks * tick
+            self.skipped_s += ticks * tick
+
     def step(self) -> None:
+        if self.config.skip_idle_gaps:
+            self._skip_idle_gap()
+        self._admit_agents()
+        self._update_closures()
         self._activate_agents()
         occupancy_snapshot = self._compute_edge_occupancy()
 
         # Update per-tick congestion map *before* movement so routing decisions
         # can use the current crowding state.
         self.congestion_map = self._build_congestion_map(occupancy_snapshot)
+        if self.config.batch_route_choice:
+            self._reroute_at_nodes(current_tick=int(self.time_s / self.config.tick_seconds))
 
         next_occupancy: Dict[tuple[str, str], float] = {}
         queue_counts: Dict[tuple[str, str], int] = {}
@@ -875,6 +1670,7 @@ class SmartFlowModel:
         
         # Record metrics for ALL edges to ensure time-series alignment
         # This is slightly more expensive but ensures charts work correctly
+        self.collector.record_step_time(self.time_s)
         for u, v, data in self.graph.edges(data=True):
             occ = next_occupancy.get((u, v), 0.0)
             q = queue_counts.get((u, v), 0)
@@ -882,56 +1678,97 @@ class SmartFlowModel:
             edge_id = data.get("id", f"{u}->{v}")
             self.collector.record_edge_step(edge_id, occ, queue_length=q)
             
+        self._retire_agents()
         self.time_s += self.config.tick_seconds
+        if self.render_buffer is not None:
+            self.render_buffer.publish(self)
 
     @property
     def is_complete(self) -> bool:
         """Check if all agents have finished their schedules."""
-        return all(agent.completed for agent in self.agents)
+        return self._next_profile is None and all(agent.completed for agent in self.agents)
 
     def run(self) -> MetricsCollector:
         total_ticks = int(self.config.transition_window_s / self.config.tick_seconds)
         for _ in range(total_ticks):
+            if self.config.skip_idle_gaps and self.time_s >= self.config.transition_window_s:
+                break
             self.step()
             if self.is_complete:
                 break
-                
+        return self.finish()
+
+    def finish(self) -> MetricsCollector:
+        """Record every agent not yet retired and finalise the collector.
+
+        The single end-of-run path for `run` and for callers that step the model
+        themselves (RunView, headless mode runs): streamed agents that never departed
+        are recorded like idle agents of an eager run, and movements still under way
+        are recorded as unfinished (late) movements. Calling it again is a no-op.
+        """
+
+        if self._finished:
+            return self.collector
+        self._finished = True
+        if self._next_profile is not None:
+            self.agents.append(AgentRuntimeState(profile=self._next_profile))
+            self._next_profile = None
+        if self._agent_stream is not None:
+            self.agents.extend(AgentRuntimeState(profile=profile) for profile in self._agent_stream)
         for state in self.agents:
-            # Calculate lateness properly:
-            # 1. If agent never arrived (actual_arrival_s is None), they're late if simulation ended
-            # 2. If agent arrived, compare travel time to changeover window
-            is_late = bool(state.is_late)  # Already set during simulation
-            
-            # Also mark as late if agent didn't complete their journey
-            if not state.completed and state.active:
-                is_late = True
-            
-            # Calculate delay as actual time vs expected (changeover window)
-            # delay_s should represent how much LONGER than expected the journey took
-            if state.scheduled_arrival_s is not None and state.actual_arrival_s is not None:
-                # Agent arrived: delay = actual - scheduled (positive = late)
-                lateness_s = state.actual_arrival_s - state.scheduled_arrival_s
-                delay_s = max(0.0, lateness_s)
-            elif state.scheduled_arrival_s is not None and state.actual_arrival_s is None:
-                # Agent didn't arrive yet - delay is current time minus deadline
-                delay_s = max(0.0, self.time_s - state.scheduled_arrival_s)
-            else:
-                # Fallback to waiting time
-                delay_s = state.waiting_time_s
-            
-            metrics = AgentMetrics(
-                travel_time_s=state.travel_time_s,
-                path_nodes=state.path_nodes,
-                delay_s=delay_s,
-                scheduled_arrival_s=state.scheduled_arrival_s,
-                actual_arrival_s=state.actual_arrival_s,
-                is_late=is_late,
-                role=state.profile.role if hasattr(state.profile, "role") else "student",
-            )
-            self.collector.record_agent(state.profile.agent_id, metrics)
+            self.collector.record_agent(state.profile.agent_id, self._agent_metrics(state))
+            if state.active and not state.completed:
+                entry = state.profile.schedule[state.schedule_index]
+                self.collector.record_movement(
+                    MovementMetrics(
+                        agent_id=state.profile.agent_id,
+                        period=str(entry.period),
+                        depart_s=float(entry.depart_time_s),
+                        arrival_s=None,
+                        travel_time_s=self.time_s - state.movement_start_s,
+                        is_late=True,
+                    )
+                )
         self.collector.finalize()
         return self.collector
 
+    def _agent_metrics(self, state: AgentRuntimeState) -> AgentMetrics:
+        """Compact end-of-run record for one agent."""
+
+        # Calculate lateness properly:
+        # 1. If agent never arrived (actual_arrival_s is None), they're late if simulation ended
+        # 2. If agent arrived, compare travel time to changeover window
+        is_late = bool(state.is_late)  # Already set during simulation
+        
+        # Also mark as late if agent didn't complete their journey
+        if not state.completed and state.active:
+            is_late = True
+        
+        # Calculate delay as actual time vs expected (changeover window)
+        # delay_s should represent how much LONGER than expected the journey took
+        if self.config.delay_metric == "waiting":
+            delay_s = state.waiting_time_s
+        elif state.scheduled_arrival_s is not None and state.actual_arrival_s is not None:
+            # Agent arrived: delay = actual - scheduled (positive = late)
+            lateness_s = state.actual_arrival_s - state.scheduled_arrival_s
+            delay_s = max(0.0, lateness_s)
+        elif state.scheduled_arrival_s is not None and state.actual_arrival_s is None:
+            # Agent didn't arrive yet - delay is current time minus deadline
+            delay_s = max(0.0, self.time_s - state.scheduled_arrival_s)
+        else:
+            # Fallback to waiting time
+            delay_s = state.waiting_time_s
+        
+        return AgentMetrics(
+            travel_time_s=state.travel_time_s,
+            path_nodes=state.path_nodes,
+            delay_s=delay_s,
+            scheduled_arrival_s=state.scheduled_arrival_s,
+            actual_arrival_s=state.actual_arrival_s,
+            is_late=is_late,
+            role=state.profile.role if hasattr(state.profile, "role") else "student",
+        )
+
     def _compute_edge_occupancy(self) -> Dict[tuple[str, str], float]:
         occupancy: Dict[tuple[str, str], float] = {}
         for agent in self.agents:
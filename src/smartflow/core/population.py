@@ -0,0 +1,326 @@
+"""Cached scenario compiler shared by the run and comparison views.
+
+Every way of turning a layout (plus an optional scenario) into agents goes through
+`compile_population`, which returns a compact, immutable `AgentTable`. Tables are
+cached in memory and, optionally, in the SQLite analysis cache, so re-running or
+comparing the same scenario skips agent generation entirely.
+
+NEA note (technique):
+    - The cache key is (population layout hash, scenario hash, scale, period index,
+      seed, mode, mode parameters). The layout hash covers only what generators
+      read (node IDs, kinds, floors, metadata), so edge edits keep their populations.
+      Strategies that route agents (`scenario_loader.uses_layout_routes`) also key on
+      the compiled layout hash, which covers edge geometry.
+    - The table is columnar: numeric attributes are read-only NumPy arrays and all
+      strings (nodes, periods, roles) are stored once in a string table and referenced
+      by index; schedules use CSR offsets (`schedule_ptr`) like `CompiledGraph`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from .agents import AgentProfile, AgentScheduleEntry, generate_agents
+from .compiled import compile_graph
+from .floorplan import FloorPlan
+from .scenario_loader import (
+    generate_break_time_agents,
+    generate_lesson_changeover_agents,
+    generate_simple_test_agents,
+    generate_start_of_day_agents,
+    synthesise_population,
+    uses_layout_routes,
+)
+
+
+def _frozen(values: Sequence[float], dtype: type) -> np.ndarray:
+    array = np.asarray(values, dtype=dtype)
+    array.setflags(write=False)
+    return array
+
+
+@dataclass(frozen=True)
+class AgentTable:
+    """Columnar, immutable agent population (one row per agent)."""
+
+    agent_ids: Tuple[str, ...]
+    # Shared string table for roles, periods and node IDs.
+    strings: Tuple[str, ...]
+    role: np.ndarray
+    speed_base_mps: np.ndarray
+    stairs_penalty: np.ndarray
+    optimality_beta: np.ndarray
+    reroute_interval_ticks: np.ndarray
+    detour_probability: np.ndarray
+    # Schedule entries of agent i are rows schedule_ptr[i]:schedule_ptr[i + 1].
+    schedule_ptr: np.ndarray
+    period: np.ndarray
+    origin: np.ndarray
+    destination: np.ndarray
+    depart_time_s: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.agent_ids)
+
+    @classmethod
+    def from_profiles(cls, profiles: Sequence[AgentProfile]) -> "AgentTable":
+        index: Dict[str, int] = {}
+
+        def ref(value: str) -> int:
+            return index.setdefault(str(value), len(index))
+
+        ptr = [0]
+        period: List[int] = []
+        origin: List[int] = []
+        destination: List[int] = []
+        depart: List[float] = []
+        for profile in profiles:
+            for entry in profile.schedule:
+                period.append(ref(entry.period))
+                origin.append(ref(entry.origin_room))
+                destination.append(ref(entry.destination_room))
+                depart.append(float(entry.depart_time_s))
+            ptr.append(len(depart))
+        roles = [ref(p.role) for p in profiles]
+
+        return cls(
+            agent_ids=tuple(str(p.agent_id) for p in profiles),
+            strings=tuple(index),
+            role=_frozen(roles, np.int32),
+            speed_base_mps=_frozen([p.speed_base_mps for p in profiles], np.float64),
+            stairs_penalty=_frozen([p.stairs_penalty for p in profiles], np.float64),
+            optimality_beta=_frozen([p.optimality_beta for p in profiles], np.float64),
+            reroute_interval_ticks=_frozen([p.reroute_interval_ticks for p in profiles], np.int64),
+            detour_probability=_frozen([p.detour_probability for p in profiles], np.float64),
+            schedule_ptr=_frozen(ptr, np.int64),
+            period=_frozen(period, np.int32),
+            origin=_frozen(origin, np.int32),
+            destination=_frozen(destination, np.int32),
+            depart_time_s=_frozen(depart, np.float64),
+        )
+
+    def _materialise(self, rows: Sequence[int]) -> Iterator[AgentProfile]:
+        # Columns are converted to Python lists once; per-row NumPy access is slow.
+        s = self.strings
+        ptr = self.schedule_ptr.tolist()
+        period, origin = self.period.tolist(), self.origin.tolist()
+        destination, depart = self.destination.tolist(), self.depart_time_s.tolist()
+        role, speed = self.role.tolist(), self.speed_base_mps.tolist()
+        stairs, beta = self.stairs_penalty.tolist(), self.optimality_beta.tolist()
+        reroute, detour = self.reroute_interval_ticks.tolist(), self.detour_probability.tolist()
+        for i in rows:
+            yield AgentProfile(
+                agent_id=self.agent_ids[i],
+                role=s[role[i]],
+                speed_base_mps=speed[i],
+                stairs_penalty=stairs[i],
+                optimality_beta=beta[i],
+                reroute_interval_ticks=reroute[i],
+                detour_probability=detour[i],
+                schedule=[
+                    AgentScheduleEntry(
+                        period=s[period[k]],
+                        origin_room=s[origin[k]],
+                        destination_room=s[destination[k]],
+                        depart_time_s=depart[k],
+                    )
+                    for k in range(ptr[i], ptr[i + 1])
+                ],
+            )
+
+    def profiles(self) -> List[AgentProfile]:
+        """Fresh `AgentProfile` objects for every row (safe to hand to a model)."""
+
+        return list(self._materialise(range(len(self))))
+
+    def iter_profiles(self) -> Iterator[AgentProfile]:
+        """Profiles in order of first departure, for a streaming `SmartFlowModel`."""
+
+        # Agents without a schedule sort first (the model retires them immediately).
+        first = np.zeros(len(self))
+        has_schedule = self.schedule_ptr[1:] > self.schedule_ptr[:-1]
+        first[has_schedule] = self.depart_time_s[self.schedule_ptr[:-1][has_schedule]]
+        return self._materialise(np.argsort(first, kind="stable").tolist())
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "agent_ids": list(self.agent_ids),
+                "strings": list(self.strings),
+                **{name: getattr(self, name).tolist() for name in _ARRAY_FIELDS},
+            },
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, payload: str) -> "AgentTable":
+        data = json.loads(payload)
+        return cls(
+            agent_ids=tuple(data["agent_ids"]),
+            strings=tuple(data["strings"]),
+            **{name: _frozen(data[name], dtype) for name, dtype in _ARRAY_FIELDS.items()},
+        )
+
+
+_ARRAY_FIELDS: Dict[str, type] = {
+    "role": np.int32,
+    "speed_base_mps": np.float64,
+    "stairs_penalty": np.float64,
+    "optimality_beta": np.float64,
+    "reroute_interval_ticks": np.int64,
+    "detour_probability": np.float64,
+    "schedule_ptr": np.int64,
+    "period": np.int32,
+    "origin": np.int32,
+    "destination": np.int32,
+    "depart_time_s": np.float64,
+}
+
+
+def population_layout_hash(floorplan: FloorPlan) -> str:
+    """Hash of the node attributes population generators read (IDs, kinds, floors, metadata)."""
+
+    rows = [
+        (n.node_id, n.kind, n.floor, sorted((n.metadata or {}).items(), key=lambda kv: str(kv[0])))
+        for n in floorplan.nodes
+    ]
+    return hashlib.sha256(json.dumps(rows, default=str).encode("utf-8")).hexdigest()
+
+
+def scenario_hash(scenario: Dict[str, Any] | None) -> str:
+    """Order-independent content hash of a scenario dict ("" for no scenario)."""
+
+    if not scenario:
+        return ""
+    return hashlib.sha256(json.dumps(scenario, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _lesson_changeover_count(floorplan: FloorPlan, scale: float) -> int:
+    # ~15-25 students per class; 20 on average.
+    room_count = len([n for n in floorplan.nodes if n.kind == "room"]) or 5
+    return int(room_count * 20 * scale)
+
+
+def _build_scenario(floorplan, scenario, scale, period_index, seed, params) -> List[AgentProfile]:
+    data = dict(scenario or {})
+    data["random_seed"] = seed
+    return synthesise_population(data, floorplan, scale=scale, period_index=period_index)
+
+
+def _build_config(floorplan, scenario, scale, period_index, seed, params) -> List[AgentProfile]:
+    return generate_agents(seed, dict(scenario or {}))
+
+
+def _build_break_time(floorplan, scenario, scale, period_index, seed, params) -> List[AgentProfile]:
+    return generate_break_time_agents(floorplan, seed, scale, float(params.get("duration_s", 300.0)))
+
+
+def _build_start_of_day(floorplan, scenario, scale, period_index, seed, params) -> List[AgentProfile]:
+    return generate_start_of_day_agents(floorplan, seed, scale)
+
+
+def _build_lesson_changeover(floorplan, scenario, scale, period_index, seed, params) -> List[AgentProfile]:
+    count = int(params.get("count", _lesson_changeover_count(floorplan, scale)))
+    return generate_lesson_changeover_agents(floorplan, count, seed)
+
+
+def _build_random(floorplan, scenario, scale, period_index, seed, params) -> List[AgentProfile]:
+    return generate_simple_test_agents(floorplan, int(params.get("count", 50)), seed)
+
+
+# Population builders by mode: (floorplan, scenario, scale, period_index, seed, params) -> profiles.
+POPULATION_MODES: Dict[str, Callable[..., List[AgentProfile]]] = {
+    "scenario": _build_scenario,
+    "config": _build_config,
+    "break_time": _build_break_time,
+    "start_of_day": _build_start_of_day,
+    "lesson_changeover": _build_lesson_changeover,
+    "random": _build_random,
+}
+
+# In-memory tables keyed by the full cache key (see module docstring).
+_POPULATION_CACHE: Dict[Tuple[str, str, str], AgentTable] = {}
+_POPULATION_CACHE_MAX = 16
+
+
+def compile_population(
+    floorplan: FloorPlan,
+    scenario: Dict[str, Any] | None = None,
+    *,
+    mode: str = "scenario",
+    scale: float = 1.0,
+    period_index: int = -1,
+    seed: int | None = None,
+    params: Dict[str, Any] | None = None,
+    db_path: Path | None = None,
+) -> AgentTable:
+    """Compile (layout, scenario, mode) into a cached `AgentTable`.
+
+    Args:
+        floorplan: Layout the agents move on.
+        scenario: Scenario dict; required for the "scenario" and "config" modes.
+        mode: One of `POPULATION_MODES`.
+        scale: Population scaling factor.
+        period_index: Period to generate (-1 = all); "scenario" mode only.
+        seed: RNG seed; defaults to the scenario's ``random_seed`` (or 42).
+        params: Mode parameters (``duration_s`` for break time, ``count`` for lesson
+            changeover and random populations).
+        db_path: Optional SQLite database used as a persistent table cache.
+
+    Raises:
+        ValueError: If the mode is unknown.
+    """
+
+    if mode not in POPULATION_MODES:
+        raise ValueError(f"Unknown population mode '{mode}'. Must be one of {sorted(POPULATION_MODES)}")
+    if seed is None:
+        seed = int((scenario or {}).get("random_seed", 42))
+    params = dict(params or {})
+
+    layout_hash = population_layout_hash(floorplan)
+    key_fields: Dict[str, Any] = {
+        "scenario": scenario_hash(scenario),
+        "scale": float(scale),
+        "period_index": int(period_index),
+        "seed": int(seed),
+        "params": params,
+    }
+    if mode == "scenario" and uses_layout_routes(scenario):
+        # Departures follow routes, so edge edits (e.g. a wider staircase) matter too.
+        key_fields["routes"] = compile_graph(floorplan.to_networkx()).layout_hash
+    key_params = json.dumps(key_fields, sort_keys=True, default=str)
+    key = (layout_hash, mode, key_params)
+
+    table = _POPULATION_CACHE.get(key)
+    if table is None and db_path is not None:
+        from smartflow.io import db as dbio
+
+        payload = dbio.get_or_create_analysis(
+            Path(db_path), layout_hash=layout_hash, kind=f"agent_table:{mode}", params=key_params
+        )
+        if payload is not None:
+            table = AgentTable.from_json(payload)
+    if table is None:
+        profiles = POPULATION_MODES[mode](floorplan, scenario, float(scale), int(period_index), int(seed), params)
+        table = AgentTable.from_profiles(profiles)
+        if db_path is not None:
+            from smartflow.io import db as dbio
+
+            dbio.get_or_create_analysis(
+                Path(db_path),
+                layout_hash=layout_hash,
+                kind=f"agent_table:{mode}",
+                params=key_params,
+                payload_json=table.to_json(),
+            )
+
+    if key not in _POPULATION_CACHE and len(_POPULATION_CACHE) >= _POPULATION_CACHE_MAX:
+        _POPULATION_CACHE.pop(next(iter(_POPULATION_CACHE)))
+    _POPULATION_CACHE[key] = table
+    return table
@@ -0,0 +1,200 @@
+"""Precomputed route choice sets per origin/destination pair.
+
+`compute_k_shortest_paths` runs Yen's algorithm for every routing decision. Most
+of that work is repeated: agents leaving the same room for the same destination
+see the same candidate corridors, only the *costs* differ (stairs penalty,
+congestion). This module computes a small, diverse set of candidate routes once
+per OD pair and stores each route as an array of edge indices, so re-costing
+under a new congestion map is a single gather-and-sum.
+
+NEA note (technique):
+    - Candidates come from the *penalty method*: find the shortest route, make its
+      edges more expensive, search again. One Dijkstra per candidate is far cheaper
+      than Yen's algorithm and naturally spreads routes over different corridors.
+    - Candidates are filtered so that no two routes share more than `max_overlap`
+      of their length (diversity).
+    - A stairs-avoiding alternative is added when it differs, so agents with a
+      large stairs penalty still have a sensible option.
+    - Padded index matrices with a zero-cost sentinel column make costing all
+      routes one NumPy expression.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import networkx as nx
+import numpy as np
+
+from .compiled import CompiledGraph, compile_graph, shortest_path_edges
+
+# Stairs penalty used to find a stairs-avoiding alternative route.
+_AVOID_STAIRS_PENALTY = 1_000.0
+# Multiplier applied to the edges of each found route before searching again.
+_PENALTY_FACTOR = 1.6
+
+
+@dataclass(frozen=True)
+class RouteChoiceSet:
+    """Candidate routes for one OD pair, stored as padded edge-index rows."""
+
+    origin: str
+    destination: str
+    paths: Tuple[Tuple[str, ...], ...]
+    # Shape (routes, max_edges). Padding uses `sentinel`, which indexes a zero cost.
+    edge_matrix: np.ndarray
+    sentinel: int
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def costs(self, edge_costs: np.ndarray) -> np.ndarray:
+        """Total cost of every route under per-edge costs aligned with the compiled graph."""
+
+        if not self.paths:
+            return np.zeros(0, dtype=float)
+        padded = np.append(np.asarray(edge_costs, dtype=float), 0.0)
+        return padded[self.edge_matrix].sum(axis=1)
+
+    def cheapest(self, edge_costs: np.ndarray, k: int) -> Tuple[List[Tuple[str, ...]], List[float]]:
+        """Return the `k` cheapest routes (and their costs), cheapest first."""
+
+        costs = self.costs(edge_costs)
+        order = np.argsort(costs, kind="stable")[: max(1, int(k))]
+        return [self.paths[i] for i in order], [float(costs[i]) for i in order]
+
+
+def _overlap(a: Sequence[int], b: Sequence[int], lengths: np.ndarray) -> float:
+    """Fraction of route `a`'s length that is shared with route `b`."""
+
+    total = float(lengths[list(a)].sum()) if len(a) else 0.0
+    if total <= 0.0:
+        return 1.0
+    shared = set(a).intersection(b)
+    return float(lengths[list(shared)].sum()) / total if shared else 0.0
+
+
+def build_route_choice_set(
+    graph: nx.DiGraph,
+    origin: str,
+    destination: str,
+    *,
+    size: int = 6,
+    max_overlap: float = 0.8,
+    max_candidates: int | None = None,
+    compiled: CompiledGraph | None = None,
+) -> RouteChoiceSet:
+    """Compute a diverse choice set of up to `size` routes from `origin` to `destination`.
+
+    The first route is always the exact base-cost shortest path.
+
+    Args:
+        graph: Layout graph.
+        origin: Source node.
+        destination: Target node.
+        size: Maximum number of routes kept.
+        max_overlap: Maximum shared-length fraction between a new route and any kept route.
+        max_candidates: Cap on penalty-method searches (defaults to ``2 * size``).
+        compiled: Optional precompiled graph (avoids a lookup).
+    """
+
+    compiled = compiled or compile_graph(graph)
+    size = max(1, int(size))
+    limit = int(max_candidates) if max_candidates is not None else 2 * size
+
+    kept_edges: List[List[int]] = []
+
+    def consider(edges: List[int] | None, *, force: bool = False) -> None:
+        if not edges or edges in kept_edges:
+            return
+        if not force and any(_overlap(edges, other, compiled.length_m) > max_overlap for other in kept_edges):
+            return
+        kept_edges.append(edges)
+
+    s = compiled.node_index.get(str(origin))
+    t = compiled.node_index.get(str(destination))
+    if s is not None and t is not None and s != t:
+        costs = compiled.base_cost.copy()
+        for i in range(limit):
+            if len(kept_edges) >= size:
+                break
+            edges = shortest_path_edges(compiled, costs, s, t)
+            if edges is None:
+                break
+            consider(edges, force=(i == 0))
+            costs[edges] *= _PENALTY_FACTOR
+
+        if kept_edges and len(kept_edges) < size and bool(compiled.is_stairs.any()):
+            avoid = compiled.base_cost + np.where(compiled.is_stairs, _AVOID_STAIRS_PENALTY, 0.0)
+            consider(shortest_path_edges(compiled, avoid, s, t), force=True)
+
+    paths = []
+    for edges in kept_edges:
+        nodes = [compiled.node_ids[int(compiled.edge_src[edges[0]])]]
+        nodes.extend(compiled.node_ids[int(compiled.edge_dst[e])] for e in edges)
+        paths.append(tuple(nodes))
+
+    width = max((len(e) for e in kept_edges), default=0)
+    matrix = np.full((len(kept_edges), width), compiled.edge_count, dtype=np.int64)
+    for row, edges in enumerate(kept_edges):
+        matrix[row, : len(edges)] = edges
+
+    return RouteChoiceSet(
+        origin=str(origin),
+        destination=str(destination),
+        paths=tuple(paths),
+        edge_matrix=matrix,
+        sentinel=compiled.edge_count,
+    )
+
+
+# Shared across models: layout_hash -> {(origin, destination, size, overlap): RouteChoiceSet}
+_SHARED_SETS: Dict[str, Dict[Tuple[str, str, int, float], RouteChoiceSet]] = {}
+_SHARED_LAYOUTS_MAX = 8
+
+
+class RouteSetCache:
+    """Lazily builds and memoises route choice sets for one layout graph.
+
+    Sets are shared between caches for graphs with the same layout hash, so a
+    second run on the same layout starts warm.
+    """
+
+    def __init__(self, graph: nx.DiGraph, *, size: int = 6, max_overlap: float = 0.8) -> None:
+        self.graph = graph
+        self.compiled = compile_graph(graph)
+        self.size = max(1, int(size))
+        self.max_overlap = float(max_overlap)
+        store = _SHARED_SETS.get(self.compiled.layout_hash)
+        if store is None:
+            if len(_SHARED_SETS) >= _SHARED_LAYOUTS_MAX:
+                _SHARED_SETS.pop(next(iter(_SHARED_SETS)))
+            store = _SHARED_SETS.setdefault(self.compiled.layout_hash, {})
+        self._store = store
+
+    def get(self, origin: str, destination: str) -> RouteChoiceSet:
+        key = (str(origin), str(destination), self.size, self.max_overlap)
+        found = self._store.get(key)
+        if found is None:
+            found = build_route_choice_set(
+                self.graph,
+                origin,
+                destination,
+                size=self.size,
+                max_overlap=self.max_overlap,
+                compiled=self.compiled,
+            )
+            self._store[key] = found
+        return found
+
+    def precompute(self, pairs: Iterable[Tuple[str, str]]) -> int:
+        """Build sets for all given OD pairs; returns how many distinct pairs were processed."""
+
+        seen = set()
+        for origin, destination in pairs:
+            if origin == destination or (origin, destination) in seen:
+                continue
+            seen.add((origin, destination))
+            self.get(origin, destination)
+        return len(seen)
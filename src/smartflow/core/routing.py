@@ -12,9 +12,15 @@ from __future__ import annotations
 
 import math
 import random
+from dataclasses import dataclass
 from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
 
 import networkx as nx
+import numpy as np
+
+from .compiled import compile_graph, dijkstra_distances
+from .cch import CCHMetric, customize_cch
+from .hierarchy import portal_overlay
 
 
 def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -32,7 +38,7 @@ def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 def _node_xy(graph: nx.DiGraph, node: str) -> tuple[float, float] | None:
     """Best-effort extraction of an (x, y) coordinate for a node."""
 
-    data: Dict[str, Any] = dict(graph.nodes.get(node, {}))
+    data: Mapping[str, Any] = graph.nodes.get(node, {})
     for key in ("position", "pos"):
         val = data.get(key)
         if isinstance(val, (list, tuple)) and len(val) >= 2:
@@ -51,7 +57,7 @@ def _node_xy(graph: nx.DiGraph, node: str) -> tuple[float, float] | None:
 def _node_latlon(graph: nx.DiGraph, node: str) -> tuple[float, float] | None:
     """Best-effort extraction of (lat, lon) for a node."""
 
-    data: Dict[str, Any] = dict(graph.nodes.get(node, {}))
+    data: Mapping[str, Any] = graph.nodes.get(node, {})
     for lat_key, lon_key in (("lat", "lon"), ("latitude", "longitude")):
         if data.get(lat_key) is not None and data.get(lon_key) is not None:
             try:
@@ -61,6 +67,140 @@ def _node_latlon(graph: nx.DiGraph, node: str) -> tuple[float, float] | None:
     return None
 
 
+# Additive cost of a temporarily closed edge. Large but finite, so a closed edge is only
+# used when nothing else connects origin and destination (agents then wait at the closure).
+CLOSED_EDGE_PENALTY = 1e9
+
+# Key used to record the set of closed (u, v) edges on the graph object (`graph.graph`).
+_CLOSED_ATTR = "_smartflow_closed"
+
+
+def closed_edges(graph: nx.DiGraph) -> frozenset:
+    """Return the (u, v) keys of edges currently marked closed on `graph`."""
+
+    return graph.graph.get(_CLOSED_ATTR, frozenset())
+
+
+def set_edges_closed(graph: nx.DiGraph, edges: Iterable[Tuple[str, str]], closed: bool) -> List[Tuple[str, str]]:
+    """Mark edges as closed (or reopen them) without changing the graph topology.
+
+    Keeping closed edges in the graph preserves compiled indices and per-edge metric
+    series; routing sees them through `CLOSED_EDGE_PENALTY` instead.
+
+    Returns:
+        The edges whose state actually changed.
+    """
+
+    current = set(closed_edges(graph))
+    changed: List[Tuple[str, str]] = []
+    for u, v in edges:
+        data = graph.get_edge_data(u, v)
+        if data is None or bool(data.get("closed", False)) == bool(closed):
+            continue
+        if closed:
+            data["closed"] = True
+            current.add((u, v))
+        else:
+            data.pop("closed", None)
+            current.discard((u, v))
+        changed.append((u, v))
+    graph.graph[_CLOSED_ATTR] = frozenset(current)
+    return changed
+
+
+@dataclass(frozen=True)
+class LandmarkTable:
+    """Precomputed landmark distances for the ALT heuristic.
+
+    `dist_from[i, v]` is the base-cost distance from landmark i to node v and
+    `dist_to[i, v]` the distance from node v to landmark i (``inf`` if unreachable).
+    """
+
+    layout_hash: str
+    landmarks: Tuple[str, ...]
+    node_index: Dict[str, int]
+    dist_from: np.ndarray
+    dist_to: np.ndarray
+
+    def lower_bounds(self, target: str) -> np.ndarray | None:
+        """Return an admissible lower bound on the cost from every node to `target`.
+
+        Uses the triangle inequality in both directions for each landmark L:
+            d(v, t) >= d(L, t) - d(L, v)   and   d(v, t) >= d(v, L) - d(t, L)
+        """
+
+        t = self.node_index.get(str(target))
+        if t is None or not self.landmarks:
+            return None
+        with np.errstate(invalid="ignore"):
+            fwd = self.dist_from[:, t][:, None] - self.dist_from
+            bwd = self.dist_to - self.dist_to[:, t][:, None]
+            bounds = np.fmax(fwd, bwd)
+        # inf - inf (both unreachable) carries no information.
+        bounds = np.nan_to_num(bounds, nan=0.0, posinf=np.inf, neginf=0.0)
+        return np.maximum(bounds.max(axis=0), 0.0)
+
+
+# Landmark tables keyed by (layout_hash, landmark count). Small, since each table is O(k * nodes).
+_LANDMARK_CACHE: Dict[Tuple[str, int], LandmarkTable] = {}
+_LANDMARK_CACHE_MAX = 16
+
+
+def landmark_table(graph: nx.DiGraph, *, count: int = 8) -> LandmarkTable:
+    """Select landmarks for a layout and precompute their distance arrays.
+
+    Landmarks are chosen by farthest-point selection, which favours the extremes
+    of the layout (wing ends, top floors) where ALT bounds are tightest. Distances
+    use the base edge cost (no stairs penalty, no congestion); because those terms
+    only ever *increase* edge costs, the resulting bounds stay admissible for any
+    non-negative stairs penalty and any congestion map.
+
+    Results are cached by layout hash, so repeated runs on the same layout reuse them.
+    """
+
+    compiled = compile_graph(graph)
+    k = max(0, min(int(count), compiled.node_count))
+    key = (compiled.layout_hash, k)
+    cached = _LANDMARK_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    costs = compiled.base_cost
+    landmarks: List[int] = []
+    rows_from: List[np.ndarray] = []
+    rows_to: List[np.ndarray] = []
+    if k > 0:
+        # Seed from the node farthest from an arbitrary start, then repeatedly add the
+        # node that maximises its distance to the closest landmark chosen so far.
+        seed = dijkstra_distances(compiled, costs, 0)
+        closest = np.where(np.isfinite(seed), seed, -1.0)
+        while len(landmarks) < k:
+            candidate = int(np.argmax(closest))
+            if candidate in landmarks or closest[candidate] < 0.0:
+                break
+            landmarks.append(candidate)
+            d_from = dijkstra_distances(compiled, costs, candidate)
+            d_to = dijkstra_distances(compiled, costs, candidate, reverse=True)
+            rows_from.append(d_from)
+            rows_to.append(d_to)
+            reach = np.fmin(d_from, d_to)
+            reach = np.where(np.isfinite(reach), reach, -1.0)
+            closest = reach if len(landmarks) == 1 else np.minimum(closest, reach)
+
+    n = compiled.node_count
+    table = LandmarkTable(
+        layout_hash=compiled.layout_hash,
+        landmarks=tuple(compiled.node_ids[i] for i in landmarks),
+        node_index=compiled.node_index,
+        dist_from=np.vstack(rows_from) if rows_from else np.zeros((0, n)),
+        dist_to=np.vstack(rows_to) if rows_to else np.zeros((0, n)),
+    )
+    if len(_LANDMARK_CACHE) >= _LANDMARK_CACHE_MAX:
+        _LANDMARK_CACHE.pop(next(iter(_LANDMARK_CACHE)))
+    _LANDMARK_CACHE[key] = table
+    return table
+
+
 def compute_a_star_path(
     graph: nx.DiGraph,
     source: str,
@@ -71,6 +211,7 @@ def compute_a_star_path(
     congestion_alpha: float = 0.0,
     congestion_p: float = 1.0,
     heuristic: str = "auto",
+    landmarks: LandmarkTable | None = None,
 ) -> Sequence[str]:
     """Return an A* shortest path between two nodes.
 
@@ -78,6 +219,8 @@ def compute_a_star_path(
         - "auto": use Haversine if nodes have lat/lon; else Euclidean on x/y if present; else 0.
         - "haversine": force Haversine (falls back to 0 if lat/lon missing)
         - "euclidean": force Euclidean on x/y (falls back to 0 if x/y missing)
+        - "alt": landmark (ALT) bounds; accounts for floors and stairs. Uses `landmarks`
+          if given, otherwise the cached table for this layout.
         - "zero": equivalent to Dijkstra
     """
 
@@ -91,8 +234,25 @@ def compute_a_star_path(
             congestion_p=congestion_p,
         )
 
+    mode = str(heuristic or "auto").lower()
+    if mode == "alt":
+        # A negative stairs penalty could undercut the base-cost bounds; fall back to Dijkstra.
+        bounds = None
+        if stairs_penalty >= 0.0:
+            table = landmarks if landmarks is not None else landmark_table(graph)
+            bounds = table.lower_bounds(target)
+        if bounds is None:
+            return nx.astar_path(graph, source=source, target=target, heuristic=None, weight=w)
+        bound_list = bounds.tolist()
+        index = table.node_index
+
+        def h_alt(n1: str, _n2: str) -> float:
+            i = index.get(n1)
+            return bound_list[i] if i is not None else 0.0
+
+        return nx.astar_path(graph, source=source, target=target, heuristic=h_alt, weight=w)
+
     def h(n1: str, n2: str) -> float:
-        mode = str(heuristic or "auto").lower()
         if mode == "zero":
             return 0.0
 
@@ -153,6 +313,9 @@ def _edge_weight(
     if alpha > 0.0 and ratio > 0.0:
         base *= 1.0 + alpha * (ratio**p)
 
+    if data.get("closed", False):
+        base += CLOSED_EDGE_PENALTY
+
     return float(base)
 
 
@@ -220,6 +383,81 @@ def compute_shortest_path(
     )
 
 
+def compute_hierarchical_path(
+    graph: nx.DiGraph,
+    source: str,
+    target: str,
+    *,
+    stairs_penalty: float = 0.0,
+    congestion_map: Mapping[Tuple[str, str], float] | None = None,
+    congestion_alpha: float = 0.0,
+    congestion_p: float = 1.0,
+) -> Sequence[str]:
+    """Shortest path via the floor/building portal overlay (see `hierarchy`).
+
+    Exact for static weights. When congestion weights are active (alpha > 0 and a
+    non-empty congestion map), edges are closed, or the stairs penalty is negative,
+    the overlay does not apply and this falls back to `compute_shortest_path`.
+    """
+
+    congested = float(congestion_alpha) > 0.0 and bool(congestion_map) and any(
+        float(r) > 0.0 for r in congestion_map.values()
+    )
+    if congested or stairs_penalty < 0 or closed_edges(graph):
+        return compute_shortest_path(
+            graph,
+            source,
+            target,
+            stairs_penalty=stairs_penalty,
+            congestion_map=congestion_map,
+            congestion_alpha=congestion_alpha,
+            congestion_p=congestion_p,
+        )
+    return portal_overlay(graph, stairs_penalty=stairs_penalty).shortest_path(source, target)
+
+
+def compute_cch_path(
+    graph: nx.DiGraph,
+    source: str,
+    target: str,
+    *,
+    stairs_penalty: float = 0.0,
+    congestion_map: Mapping[Tuple[str, str], float] | None = None,
+    congestion_alpha: float = 0.0,
+    congestion_p: float = 1.0,
+    metric: CCHMetric | None = None,
+) -> Sequence[str]:
+    """Shortest path via a customizable contraction hierarchy (see `cch`).
+
+    Returns paths of the same cost as `compute_shortest_path`. Callers that run many
+    queries under one congestion map should customize once (`cch.customize_cch`) and
+    pass the result as `metric`; otherwise the hierarchy is customized per call.
+    Negative stairs penalties fall back to `compute_shortest_path`.
+    """
+
+    if metric is None:
+        if stairs_penalty < 0:
+            return compute_shortest_path(
+                graph,
+                source,
+                target,
+                stairs_penalty=stairs_penalty,
+                congestion_map=congestion_map,
+                congestion_alpha=congestion_alpha,
+                congestion_p=congestion_p,
+            )
+        metric = customize_cch(
+            graph,
+            stairs_penalty=stairs_penalty,
+            congestion_map=congestion_map,
+            congestion_alpha=congestion_alpha,
+            congestion_p=congestion_p,
+            closed=closed_edges(graph),
+            closed_penalty=CLOSED_EDGE_PENALTY,
+        )
+    return metric.shortest_path(source, target)
+
+
 def compute_k_shortest_paths(
     graph: nx.DiGraph,
     source: str,
@@ -254,6 +492,59 @@ def compute_k_shortest_paths(
     return paths
 
 
+def stairs_penalty_classes(penalties: Iterable[float], classes: int) -> Tuple[Dict[float, float], float]:
+    """Quantise stairs penalties into at most `classes` representative values.
+
+    Agents in one class share searches, candidate sets and route-cache entries.
+    Classes minimise the largest deviation ``delta = |p - class(p)|`` (contiguous
+    intervals found by bisection, represented by their midpoints).
+
+    Error bound: a route that is optimal for the class penalty costs at most
+    ``delta * |s(route) - s(best)|`` more under the agent's exact penalty, where
+    ``s`` counts stairs edges, because the penalty enters costs linearly.
+
+    Returns:
+        (mapping from each distinct penalty to its class value, largest delta).
+    """
+
+    values = sorted({float(p) for p in penalties})
+    k = max(1, int(classes))
+    if len(values) <= k:
+        return {v: v for v in values}, 0.0
+
+    def cover(width: float) -> List[Tuple[float, float]]:
+        groups: List[Tuple[float, float]] = []
+        start = values[0]
+        last = start
+        for v in values[1:]:
+            if v - start > width:
+                groups.append((start, last))
+                start = v
+            last = v
+        groups.append((start, last))
+        return groups
+
+    lo, hi = 0.0, values[-1] - values[0]
+    for _ in range(60):
+        mid = 0.5 * (lo + hi)
+        if len(cover(mid)) <= k:
+            hi = mid
+        else:
+            lo = mid
+    groups = cover(hi)
+
+    mapping: Dict[float, float] = {}
+    error = 0.0
+    g = 0
+    for v in values:
+        while v > groups[g][1]:
+            g += 1
+        rep = 0.5 * (groups[g][0] + groups[g][1])
+        mapping[v] = rep
+        error = max(error, abs(v - rep))
+    return mapping, error
+
+
 def choose_route(
     paths: Iterable[Sequence[str]], 
     beta: float, 
@@ -290,6 +581,27 @@ def choose_route(
     else:
         costs = [float(len(path) - 1) for path in path_list]
 
+    return choose_route_from_costs(path_list, costs, beta, rng)
+
+
+def choose_route_from_costs(
+    paths: Sequence[Sequence[str]],
+    costs: Sequence[float],
+    beta: float,
+    rng: random.Random | None = None,
+) -> Sequence[str]:
+    """Softmax choice over pre-costed routes.
+
+    Split out of `choose_route` so callers that cost routes in bulk (e.g. route
+    choice sets) draw from exactly the same distribution with the same RNG usage.
+    """
+
+    path_list = list(paths)
+    if not path_list:
+        raise ValueError("No paths available for selection")
+    if len(path_list) == 1 or beta >= 10_000:
+        return path_list[0]
+
     min_cost = min(costs)
     # Avoid overflow/underflow in exp
     exps = [math.exp(-(beta) * (cost - min_cost)) for cost in costs]
@@ -309,3 +621,47 @@ def choose_route(
         if pick <= cumulative:
             return path
     return path_list[-1]
+
+
+def choose_route_indices(
+    costs: Sequence[float],
+    betas: Sequence[float],
+    detour_probabilities: Sequence[float],
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """Vectorised softmax choice for many agents over one shared candidate list.
+
+    Each agent explores with its own detour probability (beta lowered as in
+    `SmartFlowModel._route_beta`) and then draws from the same softmax as
+    `choose_route_from_costs`.
+
+    Args:
+        costs: Cost of each candidate route (shared by all agents).
+        betas: Per-agent softmax beta.
+        detour_probabilities: Per-agent probability of an exploratory choice.
+        rng: NumPy generator used for all draws.
+
+    Returns:
+        Array with the chosen candidate index for each agent.
+    """
+
+    cost_arr = np.asarray(costs, dtype=float)
+    beta_arr = np.asarray(betas, dtype=float)
+    n = beta_arr.shape[0]
+    if cost_arr.size == 0:
+        raise ValueError("No paths available for selection")
+    if cost_arr.size == 1 or n == 0:
+        return np.zeros(n, dtype=np.int64)
+
+    explore = rng.random(n) < np.asarray(detour_probabilities, dtype=float)
+    beta_eff = np.where(explore, np.maximum(0.1, beta_arr * 0.3), beta_arr)
+
+    rel = cost_arr - cost_arr.min()
+    with np.errstate(over="ignore", under="ignore", invalid="ignore"):
+        weights = np.exp(-beta_eff[:, None] * rel[None, :])
+    cumulative = np.cumsum(weights, axis=1)
+    total = cumulative[:, -1]
+    pick = rng.random(n) * total
+    choice = np.minimum((cumulative < pick[:, None]).sum(axis=1), cost_arr.size - 1)
+    deterministic = (beta_eff >= 10_000) | ~(total > 0)
+    return np.where(deterministic, 0, choice).astype(np.int64)
@@ -0,0 +1,161 @@
+"""Compact per-tick render snapshots published by the model for the UI.
+
+Rendering used to walk `model.agents` under `RunView.model_lock`, stalling the
+simulation thread for the whole frame. Instead the model publishes, after every
+tick, a few flat arrays describing the walking agents into a `RenderBuffer`; the UI
+copies the latest complete snapshot without taking any lock and renders from that.
+
+NEA note (technique):
+    - Double buffering: the model fills the back buffer, then makes it the front
+      buffer with one reference assignment, so readers only ever see complete ticks.
+    - Each buffer carries a sequence number (odd while being written, a "seqlock").
+      `RenderBuffer.latest()` copies the front buffer and retries if the number
+      changed during the copy, i.e. if the writer lapped the reader.
+    - Agents are identified by small dense integer keys, so the renderer can keep
+      per-agent state (smoothing, canvas items) in arrays instead of string dicts.
+    - Rows are bucketed by floor (sorted by the floor of the edge's source node), so
+      `latest(floor=...)` copies one contiguous slice: a frame only pays for the
+      floor on screen.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Tuple
+
+import numpy as np
+
+from .compiled import compile_graph
+
+if TYPE_CHECKING:
+    from .model import SmartFlowModel
+
+# Waiting-time thresholds (seconds) of the render colour classes 0 / 1 / 2.
+WAIT_CLASS_THRESHOLDS_S = (10.0, 30.0)
+
+
+@dataclass(frozen=True)
+class RenderSnapshot:
+    """Walking agents at one tick (row i = one agent)."""
+
+    tick: int
+    time_s: float
+    agent_key: np.ndarray  # int64, dense per-run agent key (see `RenderBuffer.agent_keys`)
+    edge: np.ndarray  # int32, compiled edge index (see `RenderBuffer.edge_keys`)
+    fraction: np.ndarray  # float32, position along the edge in [0, 1]
+    offset: np.ndarray  # float32, lateral lane offset in [-1, 1]
+    wait_class: np.ndarray  # uint8, 0 / 1 / 2 by `WAIT_CLASS_THRESHOLDS_S`
+    # Floor the rows were selected for (None = all floors).
+    floor: int | None = None
+
+    def __len__(self) -> int:
+        return len(self.agent_key)
+
+
+class _Slot:
+    """One preallocated half of the double buffer."""
+
+    def __init__(self, capacity: int) -> None:
+        self.seq = 0
+        self.count = 0
+        self.tick = 0
+        self.time_s = 0.0
+        self.agent_key = np.zeros(capacity, dtype=np.int64)
+        self.edge = np.zeros(capacity, dtype=np.int32)
+        self.fraction = np.zeros(capacity, dtype=np.float32)
+        self.offset = np.zeros(capacity, dtype=np.float32)
+        self.wait_class = np.zeros(capacity, dtype=np.uint8)
+        # Floor of each row; rows are sorted by it.
+        self.floor = np.zeros(capacity, dtype=np.int64)
+
+
+class RenderBuffer:
+    """Double-buffered `RenderSnapshot`s: one writer (the model), lock-free readers."""
+
+    def __init__(self, model: "SmartFlowModel", capacity: int = 256) -> None:
+        compiled = compile_graph(model.graph)
+        # Static per-run tables the snapshots index into.
+        self.edge_keys: Tuple[Tuple[str, str], ...] = compiled.edge_keys
+        self.edge_length_m = compiled.length_m
+        self.edge_width_m = compiled.width_m
+        self._edge_index = compiled.edge_index
+        # Floor of each edge's source node; rows whose edge is unknown sort last.
+        self.edge_floor = np.array(
+            [int(model.graph.nodes[u].get("floor", 0)) for u, _ in compiled.edge_keys], dtype=np.int64
+        )
+        self._no_floor = int(self.edge_floor.max()) + 1 if len(self.edge_floor) else 1
+        self.agent_keys: Dict[str, int] = {}
+        self._slots = [_Slot(capacity), _Slot(capacity)]
+        self._front = self._slots[0]
+        self._tick = 0
+
+    def publish(self, model: "SmartFlowModel") -> None:
+        """Write the model's walking agents into the back buffer and swap it to the front."""
+
+        walking = [a for a in model.agents if a.active and not a.completed and a.current_edge is not None]
+        back = self._slots[1] if self._front is self._slots[0] else self._slots[0]
+        back.seq += 1  # odd: being written
+        if len(walking) > len(back.agent_key):
+            capacity = max(len(walking), 2 * len(back.agent_key))
+            fresh = _Slot(capacity)
+            fresh.seq = back.seq
+            self._slots[self._slots.index(back)] = back = fresh
+
+        keys = self.agent_keys
+        edge_index = self._edge_index
+        n = len(walking)
+        back.agent_key[:n] = [keys.setdefault(str(a.profile.agent_id), len(keys)) for a in walking]
+        back.edge[:n] = [edge_index.get(a.current_edge, -1) for a in walking]
+        back.fraction[:n] = [a.position_along_edge for a in walking]
+        back.offset[:n] = [a.lateral_offset for a in walking]
+        back.wait_class[:n] = np.searchsorted(
+            WAIT_CLASS_THRESHOLDS_S, [a.waiting_time_s for a in walking], side="right"
+        )
+        if n:
+            # Positions are published in metres; normalise by edge length.
+            edges = back.edge[:n]
+            lengths = np.where(edges >= 0, self.edge_length_m[np.maximum(edges, 0)], 1.0)
+            back.fraction[:n] = np.clip(back.fraction[:n] / np.where(lengths > 0, lengths, 1.0), 0.0, 1.0)
+            # Bucket by floor: a stable sort keeps rows in model order within a floor.
+            floors = np.where(edges >= 0, self.edge_floor[np.maximum(edges, 0)], self._no_floor)
+            order = np.argsort(floors, kind="stable")
+            back.floor[:n] = floors[order]
+            for column in (back.agent_key, back.edge, back.fraction, back.offset, back.wait_class):
+                column[:n] = column[:n][order]
+        back.count = n
+        self._tick += 1
+        back.tick = self._tick
+        back.time_s = float(model.time_s)
+        back.seq += 1  # even: complete
+        self._front = back
+
+    def latest(self, floor: int | None = None) -> RenderSnapshot | None:
+        """Copy of the most recently completed snapshot (None before the first publish).
+
+        Args:
+            floor: Only copy the agents on edges leaving nodes of this floor.
+        """
+
+        while True:
+            slot = self._front
+            seq = slot.seq
+            if seq == 0:
+                return None
+            if seq % 2:
+                continue
+            lo, hi = 0, slot.count
+            if floor is not None:
+                lo = int(np.searchsorted(slot.floor[:hi], floor, side="left"))
+                hi = int(np.searchsorted(slot.floor[:hi], floor, side="right"))
+            snapshot = RenderSnapshot(
+                tick=slot.tick,
+                time_s=slot.time_s,
+                agent_key=slot.agent_key[lo:hi].copy(),
+                edge=slot.edge[lo:hi].copy(),
+                fraction=slot.fraction[lo:hi].copy(),
+                offset=slot.offset[lo:hi].copy(),
+                wait_class=slot.wait_class[lo:hi].copy(),
+                floor=floor,
+            )
+            if slot.seq == seq:
+                return snapshot
@@ -109,6 +109,27 @@ def initialise_database(path: Path) -> None:
             )
         """)
 
+        # Last-seen edge geometry per route cache namespace (used to diff layout edits).
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS route_cache_layouts (
+                namespace TEXT PRIMARY KEY,
+                edges_json TEXT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Derived layout analytics (e.g. edge betweenness), keyed by layout hash + parameters.
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                key_hash TEXT PRIMARY KEY,
+                layout_hash TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                params TEXT,
+                payload_json TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
         # Lightweight migrations for existing DBs (NEA-friendly: avoids destructive changes).
         _ensure_column(conn, "runs", "p50_travel_s", "REAL")
         _ensure_column(conn, "runs", "p95_travel_s", "REAL")
@@ -116,6 +137,8 @@ def initialise_database(path: Path) -> None:
         _ensure_column(conn, "run_edges", "mean_occupancy", "REAL")
         _ensure_column(conn, "run_edges", "peak_queue_length", "INTEGER")
         _ensure_column(conn, "scenarios", "config_hash", "TEXT")
+        _ensure_column(conn, "route_cache", "dep_edges", "TEXT")
+        _ensure_column(conn, "route_cache", "dep_nodes", "TEXT")
         
         conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_scenario ON runs(scenario_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_run_edges_run ON run_edges(run_id)")
@@ -138,10 +161,26 @@ def _ensure_column(conn: sqlite3.Connection, table: str, column: str, column_typ
 
 
 def compute_layout_hash(layout_path: Path) -> str:
-    """Compute a stable content hash for a layout file."""
+    """Compute a stable content hash for a layout file.
+
+    Reuses the hash recorded by the compiled layout cache while the file's size and
+    mtime are unchanged, so repeated runs do not re-read large layouts.
+    """
+
+    from smartflow.core.floorplan import layout_source_hash
+
+    return layout_source_hash(Path(layout_path))
+
+
+def compute_layout_namespace(layout_path: Path) -> str:
+    """Return a stable route-cache namespace for a layout file.
+
+    Unlike `compute_layout_hash`, this does not change when the file is edited, so
+    cached routes survive edits; `sync_route_cache_layout` then drops only the
+    entries an edit can affect.
+    """
 
-    data = layout_path.read_bytes()
-    return hashlib.sha256(data).hexdigest()
+    return hashlib.sha256(str(Path(layout_path).resolve()).encode("utf-8")).hexdigest()
 
 
 def compute_config_hash(config: Dict[str, Any]) -> str:
@@ -408,9 +447,17 @@ def get_or_create_cached_route(
     key_parts: Sequence[str],
     path_json: str | None = None,
     cost: float | None = None,
+    dep_edges: Iterable[str] | None = None,
+    dep_nodes: Iterable[str] | None = None,
 ) -> Optional[str]:
     """Get a cached route by key; if `path_json` is provided, insert it.
 
+    Args:
+        dep_edges: Edge IDs whose removal or cost increase can change the result
+            (the cached path and its alternatives).
+        dep_nodes: Node IDs whose new or cheaper outgoing edges can change the result
+            (nodes closer to the origin than the cached routes' cost).
+
     Returns:
         Cached `path_json` if found (or after insert), otherwise None.
     """
@@ -433,14 +480,172 @@ def get_or_create_cached_route(
         conn.execute(
             """
             INSERT OR REPLACE INTO route_cache (
-                key_hash, layout_hash, origin, destination, stairs_penalty, path_json, cost
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                key_hash, layout_hash, origin, destination, stairs_penalty, path_json, cost, dep_edges, dep_nodes
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (key_hash, layout_hash, origin, destination, float(stairs_penalty), path_json, cost),
+            (
+                key_hash,
+                layout_hash,
+                origin,
+                destination,
+                float(stairs_penalty),
+                path_json,
+                cost,
+                json.dumps(sorted(set(dep_edges))) if dep_edges is not None else None,
+                json.dumps(sorted(set(dep_nodes))) if dep_nodes is not None else None,
+            ),
         )
         return path_json
 
 
+def get_or_create_analysis(
+    path: Path,
+    *,
+    layout_hash: str,
+    kind: str,
+    params: str,
+    payload_json: str | None = None,
+) -> Optional[str]:
+    """Get a cached layout analysis result; if `payload_json` is provided, insert it.
+
+    Returns:
+        Cached `payload_json` if found (or after insert), otherwise None.
+    """
+
+    key_hash = hashlib.sha256("|".join([layout_hash, kind, params]).encode("utf-8")).hexdigest()
+
+    # Idempotent; also migrates databases created before `analysis_cache` existed.
+    initialise_database(path)
+
+    with sqlite3.connect(path) as conn:
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT payload_json FROM analysis_cache WHERE key_hash = ?", (key_hash,)).fetchone()
+        if row is not None and row["payload_json"]:
+            return str(row["payload_json"])
+
+        if payload_json is None:
+            return None
+
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO analysis_cache (key_hash, layout_hash, kind, params, payload_json)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (key_hash, layout_hash, kind, params, payload_json),
+        )
+        return payload_json
+
+
+def diff_layout_edges(
+    old: Dict[str, Sequence[Any]],
+    new: Dict[str, Sequence[Any]],
+) -> tuple[set, set]:
+    """Classify edge changes between two layout snapshots.
+
+    Snapshots map edge ID to ``(source, target, length_m, width_m, is_stairs)``.
+
+    Returns:
+        ``(worsened_edges, improved_tails)``: IDs of edges that were removed or became
+        more expensive, and source nodes of edges that were added or became cheaper.
+    """
+
+    worsened: set = set()
+    improved: set = set()
+    for edge_id in old.keys() | new.keys():
+        before, after = old.get(edge_id), new.get(edge_id)
+        if before is not None and after is not None and list(before) == list(after):
+            continue
+        if before is None:
+            improved.add(str(after[0]))
+            continue
+        if after is None or tuple(before[:2]) != tuple(after[:2]):
+            worsened.add(edge_id)
+            if after is not None:
+                improved.add(str(after[0]))
+            continue
+        old_cost = float(before[2]) / max(float(before[3]), 0.1)
+        new_cost = float(after[2]) / max(float(after[3]), 0.1)
+        if new_cost > old_cost or (bool(after[4]) and not bool(before[4])):
+            worsened.add(edge_id)
+        if new_cost < old_cost or (bool(before[4]) and not bool(after[4])):
+            improved.add(str(after[0]))
+    return worsened, improved
+
+
+def invalidate_cached_routes(
+    path: Path,
+    namespace: str,
+    *,
+    worsened_edges: Iterable[str] = (),
+    improved_tails: Iterable[str] = (),
+) -> int:
+    """Delete cached routes whose dependency sets intersect a layout change.
+
+    Entries without recorded dependencies are always dropped.
+
+    Returns:
+        Number of entries removed.
+    """
+
+    worsened = set(worsened_edges)
+    improved = set(improved_tails)
+    if not worsened and not improved:
+        return 0
+
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute(
+            "SELECT key_hash, dep_edges, dep_nodes FROM route_cache WHERE layout_hash = ?",
+            (namespace,),
+        ).fetchall()
+        stale = []
+        for key_hash, dep_edges, dep_nodes in rows:
+            if dep_edges is None or dep_nodes is None:
+                stale.append((key_hash,))
+            elif worsened.intersection(json.loads(dep_edges)) or improved.intersection(json.loads(dep_nodes)):
+                stale.append((key_hash,))
+        conn.executemany("DELETE FROM route_cache WHERE key_hash = ?", stale)
+    return len(stale)
+
+
+def sync_route_cache_layout(path: Path, namespace: str, edges: Dict[str, Sequence[Any]]) -> int:
+    """Record the current layout for a cache namespace, invalidating what an edit affects.
+
+    Args:
+        path: Database path.
+        namespace: Route cache namespace (see `compute_layout_namespace`).
+        edges: Current snapshot, edge ID -> ``(source, target, length_m, width_m, is_stairs)``.
+
+    Returns:
+        Number of cached routes removed.
+    """
+
+    initialise_database(path)
+    snapshot = json.dumps(edges, sort_keys=True)
+    with sqlite3.connect(path) as conn:
+        row = conn.execute("SELECT edges_json FROM route_cache_layouts WHERE namespace = ?", (namespace,)).fetchone()
+    if row is not None and row[0] == snapshot:
+        return 0
+
+    removed = 0
+    if row is not None:
+        worsened, improved = diff_layout_edges(json.loads(row[0]), json.loads(snapshot))
+        removed = invalidate_cached_routes(path, namespace, worsened_edges=worsened, improved_tails=improved)
+    else:
+        # Unknown previous layout: nothing in this namespace can be trusted.
+        with sqlite3.connect(path) as conn:
+            removed = conn.execute("DELETE FROM route_cache WHERE layout_hash = ?", (namespace,)).rowcount
+
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO route_cache_layouts (namespace, edges_json, updated_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+            """,
+            (namespace, snapshot),
+        )
+    return removed
+
+
 def list_scenarios(path: Path) -> List[ScenarioRecord]:
     """List all saved scenarios."""
     if not path.exists():
@@ -438,7 +438,8 @@ class SmartFlowApp(tk.Tk):
         if run_view and hasattr(run_view, "is_running"):
             if run_view.is_running:
                 run_view._stop_simulation()
-            elif run_view.model is not None:
+            elif run_view.model is not None or getattr(run_view, "mode_process", None) is not None:
+                # A paused child-process run has no in-process model.
                 run_view._resume_simulation()
 
     def _build_layout(self) -> None:
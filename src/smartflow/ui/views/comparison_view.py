@@ -3,17 +3,14 @@
 from __future__ import annotations
 
 import tkinter as tk
-import random
 from pathlib import Path
 from tkinter import ttk, filedialog, messagebox
-from typing import TYPE_CHECKING, Any, Dict, Optional, List
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
 from smartflow.io.importers import load_scenario
-from smartflow.core.floorplan import load_floorplan, FloorPlan
+from smartflow.core.floorplan import load_floorplan
 from smartflow.core.model import SmartFlowModel, SimulationConfig
-from smartflow.core.scenario_loader import create_agents_from_scenario
-from smartflow.core.agents import AgentProfile, AgentScheduleEntry
-from smartflow.core.metrics import AgentMetrics
+from smartflow.core.population import compile_population
 
 if TYPE_CHECKING:
     from ..app import SmartFlowApp
@@ -422,10 +419,11 @@ class ComparisonView(ttk.Frame):
             sim_config = SimulationConfig(
                 tick_seconds=0.1,
                 transition_window_s=duration,
-                random_seed=seed
+                random_seed=seed,
+                delay_metric="waiting",
             )
             
-            agents = create_agents_from_scenario(scenario_data, floorplan)
+            agents = compile_population(floorplan, scenario_data, db_path=self._population_db_path()).profiles()
             
         except ValueError:
             # 2. Not a scenario (missing keys), try to load as Layout
@@ -439,11 +437,14 @@ class ComparisonView(ttk.Frame):
                 sim_config = SimulationConfig(
                     tick_seconds=0.1,
                     transition_window_s=duration,
-                    random_seed=seed
+                    random_seed=seed,
+                    delay_metric="waiting",
                 )
                 
                 # Generate random agents
-                agents = self._generate_random_agents(floorplan, count=50, seed=seed)
+                agents = compile_population(
+                    floorplan, mode="random", seed=seed, params={"count": 50}, db_path=self._population_db_path()
+                ).profiles()
                 
             except Exception as e:
                 raise ValueError(f"File is neither a valid scenario nor a layout: {e}")
@@ -459,25 +460,7 @@ class ComparisonView(ttk.Frame):
                 break
             
         # 5. Collect Metrics
-        for state in model.agents:
-             # Identify role (e.g. diligent/relaxed) if we can map it back from profile
-             # For now, just pass the profile role
-             role = state.profile.role if hasattr(state.profile, "role") else "student"
-             
-             model.collector.record_agent(
-                state.profile.agent_id,
-                AgentMetrics(
-                    travel_time_s=state.travel_time_s,
-                    path_nodes=state.path_nodes,
-                    delay_s=state.waiting_time_s,
-                    scheduled_arrival_s=state.profile.schedule[-1].depart_time_s if state.profile.schedule else 0.0,
-                    actual_arrival_s=(state.profile.schedule[0].depart_time_s if state.profile.schedule else 0.0) + state.travel_time_s,
-                    is_late=state.is_late,
-                    role=role
-                )
-            )
-            
-        summary = model.collector.finalize()
+        summary = model.finish().summary
         
         return {
             "mean_travel_s": summary.mean_travel_time_s or 0.0,
@@ -488,40 +471,13 @@ class ComparisonView(ttk.Frame):
             "time_to_clear_s": summary.time_to_clear_s or 0.0
         }
 
-    def _generate_random_agents(self, floorplan: FloorPlan, count: int, seed: int) -> List[AgentProfile]:
-        """Generate random agents for a layout."""
-        rng = random.Random(seed)
-        nodes = list(floorplan.node_ids())
-        
-        if not nodes:
-            return []
-            
-        agents = []
-        for i in range(count):
-            origin = rng.choice(nodes)
-            dest = rng.choice(nodes)
-            while dest == origin and len(nodes) > 1:
-                dest = rng.choice(nodes)
-                
-            entry = AgentScheduleEntry(
-                period="Random",
-                origin_room=origin,
-                destination_room=dest,
-                depart_time_s=rng.uniform(0, 60)
-            )
-            
-            profile = AgentProfile(
-                agent_id=f"student_{i}",
-                role="student",
-                speed_base_mps=rng.normalvariate(1.4, 0.2),
-                stairs_penalty=0.5,
-                optimality_beta=rng.normalvariate(1.0, 0.2), # Variable beta!
-                reroute_interval_ticks=10,
-                detour_probability=0.1,
-                schedule=[entry]
-            )
-            agents.append(profile)
-        return agents
+    def _population_db_path(self) -> Optional[Path]:
+        """SQLite file used to cache compiled populations across sessions (None if unavailable)."""
+        try:
+            from smartflow.io.persistence import DEFAULT_DB_PATH
+        except Exception:
+            return None
+        return DEFAULT_DB_PATH
 
     def _display_results(self, data_a: Dict[str, float], data_b: Dict[str, float]) -> None:
         self.tree.delete(*self.tree.get_children())
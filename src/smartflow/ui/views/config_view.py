@@ -8,6 +8,7 @@ from typing import TYPE_CHECKING
 from pathlib import Path
 
 from ...io.importers import load_scenario
+from ...core.assignment import assign_scenario
 from ...core.floorplan import EdgeSpec
 
 if TYPE_CHECKING:
@@ -126,12 +127,23 @@ class ConfigView(ttk.Frame):
 
         form_frame.columnconfigure(1, weight=1)
         
+        # Congestion preview (static assignment of the scenario's movements)
+        preview_frame = ttk.LabelFrame(left_col, text="Congestion Preview", padding=16)
+        preview_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        preview_btn = ttk.Button(preview_frame, text="Estimate Hotspots", command=self._preview_congestion)
+        preview_btn.pack(anchor="w")
+        self.preview_text = tk.Text(preview_frame, height=12, wrap="none", state="disabled")
+        self.preview_text.pack(fill=tk.BOTH, expand=True, pady=(8, 0))
+
         # Add tooltips to explain parameters
         try:
             from ..app import create_tooltip
             create_tooltip(dur_label, "How long the simulation runs (lesson changeover time)")
             create_tooltip(seed_label, "Random seed for reproducible results. Same seed = same simulation")
             create_tooltip(scale_label, "Multiply agent count (0.5 = half, 2.0 = double population)")
+            create_tooltip(
+                preview_btn, "Quick equilibrium estimate of corridor load per scenario period (no simulation)"
+            )
         except Exception:
             pass
 
@@ -177,6 +189,48 @@ class ConfigView(ttk.Frame):
                 self.scenario_data = None
                 self.file_path_var.set("")
 
+    def _preview_congestion(self) -> None:
+        """Show the most loaded corridors of each period from a static assignment.
+
+        Periods are assigned one at a time: their movements happen in separate
+        windows, so summing them into one window would overstate congestion.
+        """
+        floorplan = self.controller.state.get("floorplan")
+        if floorplan is None or not self.scenario_data:
+            messagebox.showinfo("Congestion Preview", "Load a layout and a scenario file first.")
+            return
+        periods = list(self.scenario_data.get("periods", []))
+        try:
+            scale = self.scale_var.get()
+            graph = floorplan.to_networkx()
+            results = [
+                (str(period.get("id", i + 1)), assign_scenario(graph, self.scenario_data, period_index=i, scale=scale))
+                for i, period in enumerate(periods)
+            ]
+        except (ValueError, tk.TclError) as e:
+            messagebox.showerror("Congestion Preview", f"Could not estimate congestion: {e}")
+            return
+
+        lines = []
+        for period_id, result in results:
+            if not any(result.volumes.values()) and not result.unassigned:
+                continue
+            lines.append(
+                f"Period {period_id}: equilibrium gap {result.relative_gap:.2%} after {result.iterations} iterations"
+            )
+            for (u, v), ratio in [hot for hot in result.overloaded(threshold=0.0) if hot[1] > 0.0][:3]:
+                flag = "  OVERLOADED" if ratio >= 1.0 else ""
+                lines.append(f"  {u} -> {v}: {ratio:.2f} x capacity ({result.volumes[(u, v)]:.0f} people){flag}")
+            if result.unassigned:
+                lines.append(f"  {len(result.unassigned)} trip pair(s) could not be routed")
+        if not lines:
+            lines.append("The scenario has no movements to assign.")
+
+        self.preview_text.configure(state="normal")
+        self.preview_text.delete("1.0", tk.END)
+        self.preview_text.insert(tk.END, "\n".join(lines))
+        self.preview_text.configure(state="disabled")
+
     def _go_next(self) -> None:
         """Validate and save config, then navigate."""
         try:
@@ -14,6 +14,8 @@ from tkinter import messagebox, simpledialog, ttk
 from tkinter import filedialog
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
+from ...core.graph_analysis import IncrementalConnectivity
+
 if TYPE_CHECKING:
     from ..app import SmartFlowApp
 
@@ -61,6 +63,9 @@ class EditorView(ttk.Frame):
         self.nodes: List[Dict[str, Any]] = []
         self.edges: List[Dict[str, Any]] = []
         self.next_id = 1
+        # Weak connectivity of the drawing, updated per edit (shown in the toolbar).
+        self.connectivity = IncrementalConnectivity()
+        self.connectivity_var = tk.StringVar(value="")
         
         # State
         self.current_tool = TOOL_SELECT
@@ -137,6 +142,7 @@ class EditorView(ttk.Frame):
 
         # Display options
         ttk.Checkbutton(floor_frame, text="Grid (5m)", variable=self.show_grid, command=self._redraw).pack(anchor=tk.W)
+        ttk.Label(floor_frame, textvariable=self.connectivity_var).pack(anchor=tk.W, pady=(5, 0))
 
         # Actions
         actions_frame = ttk.LabelFrame(toolbar, text="Actions", padding=5)
@@ -231,6 +237,7 @@ class EditorView(ttk.Frame):
         self.nodes = prev_state["nodes"]
         self.edges = prev_state["edges"]
         self.next_id = prev_state["next_id"]
+        self._rebuild_connectivity()
         
         self.selected_item = None
         self._redraw()
@@ -253,6 +260,7 @@ class EditorView(ttk.Frame):
         self.nodes = next_state["nodes"]
         self.edges = next_state["edges"]
         self.next_id = next_state["next_id"]
+        self._rebuild_connectivity()
         
         self.selected_item = None
         self._redraw()
@@ -529,8 +537,16 @@ class EditorView(ttk.Frame):
         self.next_id = 1
         self.undo_stack.clear()
         self.redo_stack.clear()
+        self._rebuild_connectivity()
         self._redraw()
 
+    def _rebuild_connectivity(self) -> None:
+        """Re-seed the connectivity tracker after bulk changes (load, undo, clear)."""
+        self.connectivity.reset(
+            (n["id"] for n in self.nodes),
+            ((e["from"], e["to"]) for e in self.edges),
+        )
+
     def load_from_floorplan(self, plan: Any) -> None:
         """Load an existing FloorPlan object into the editor."""
         self.nodes = []
@@ -582,6 +598,7 @@ class EditorView(ttk.Frame):
             self.edges.append(e_dict)
             
         self.next_id = max_id_num + 1
+        self._rebuild_connectivity()
         self._redraw()
 
     # --- Logic ---
@@ -665,6 +682,7 @@ class EditorView(ttk.Frame):
             "subject": ("canteen" if kind == "canteen" else ("other" if kind == "room" else "other")),
         }
         self.nodes.append(node)
+        self.connectivity.add_node(node_id)
         self.next_id += 1
         self._redraw()
 
@@ -685,6 +703,7 @@ class EditorView(ttk.Frame):
                     "is_entrance": False
                 }
                 self.nodes.append(other_node)
+                self.connectivity.add_node(other_node_id)
                 self.next_id += 1
                 
                 # Create 2-way connection
@@ -730,6 +749,7 @@ class EditorView(ttk.Frame):
         }
         
         self.edges.append(edge)
+        self.connectivity.add_edge(u, v)
         self.next_id += 1
         self._redraw()
 
@@ -814,9 +834,13 @@ class EditorView(ttk.Frame):
     def _delete_node(self, node_id: str) -> None:
         self.nodes = [n for n in self.nodes if n["id"] != node_id]
         self.edges = [e for e in self.edges if e["from"] != node_id and e["to"] != node_id]
+        self.connectivity.remove_node(node_id)
         self._redraw()
 
     def _delete_edge(self, edge_id: str) -> None:
+        for e in self.edges:
+            if e["id"] == edge_id:
+                self.connectivity.remove_edge(e["from"], e["to"])
         self.edges = [e for e in self.edges if e["id"] != edge_id]
         self._redraw()
 
@@ -825,6 +849,7 @@ class EditorView(ttk.Frame):
             self.nodes = []
             self.edges = []
             self.next_id = 1
+            self._rebuild_connectivity()
             self._redraw()
 
     # --- Drawing ---
@@ -889,6 +914,9 @@ class EditorView(ttk.Frame):
     def _redraw(self) -> None:
         self.canvas.delete("all")
 
+        parts = self.connectivity.component_count
+        self.connectivity_var.set("" if parts <= 1 else f"{parts} disconnected parts")
+
         # --- Grid (draw first so it sits behind everything) ---
         if bool(self.show_grid.get()):
             cw = self.canvas.winfo_width() or 800
@@ -1081,6 +1109,13 @@ class EditorView(ttk.Frame):
         if not self.nodes:
             messagebox.showwarning("Empty", "Nothing to save!")
             return
+        if not self.connectivity.is_connected():
+            parts = self.connectivity.component_count
+            if not messagebox.askyesno(
+                "Disconnected Layout",
+                f"The layout has {parts} disconnected parts and will fail validation when loaded.\nSave anyway?",
+            ):
+                return
             
         # 1. Save Floorplan
         fp_data = {
@@ -5,7 +5,7 @@ from __future__ import annotations
 import tkinter as tk
 from pathlib import Path
 from tkinter import filedialog, messagebox, ttk
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Dict, Tuple
 
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
@@ -421,7 +421,23 @@ class ResultsView(ttk.Frame):
             if arts:
                 ttk.Label(analytics_frame, text=", ".join(arts[:12]) + ("..." if len(arts) > 12 else "")).pack(anchor="w")
 
-            ranked = rank_critical_edges(g, edge_metrics=results.edge_metrics, top_k=8)
+            # Weight structure by the trips actually made in this run (origin -> destination).
+            demand: Dict[Tuple[str, str], float] = {}
+            for agent in results.agent_metrics.values():
+                if len(agent.path_nodes) >= 2:
+                    od = (str(agent.path_nodes[0]), str(agent.path_nodes[-1]))
+                    demand[od] = demand.get(od, 0.0) + 1.0
+
+            # Scores are cached per layout and demand in the results DB; without demand,
+            # large campuses use sampled all-pairs betweenness.
+            ranked = rank_critical_edges(
+                g,
+                edge_metrics=results.edge_metrics,
+                demand=demand or None,
+                betweenness_epsilon=0.1 if g.number_of_nodes() > 1000 else None,
+                db_path=DEFAULT_DB_PATH,
+                top_k=8,
+            )
             if ranked:
                 ttk.Label(analytics_frame, text="Critical edges (centrality + congestion):").pack(anchor="w", pady=(8, 2))
                 items = [(f"{it.edge[0]}→{it.edge[1]}", float(it.peak_occupancy)) for it in ranked]
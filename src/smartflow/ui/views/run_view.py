@@ -2,29 +2,33 @@
 
 from __future__ import annotations
 
-import random
 import math
 import threading
 import time
 import tkinter as tk
 from pathlib import Path
 from tkinter import messagebox, ttk
-from typing import TYPE_CHECKING, List, Dict, Any, Tuple
-
-from smartflow.core.agents import AgentProfile, AgentScheduleEntry
-from smartflow.core.metrics import AgentMetrics
-from smartflow.core.model import SimulationConfig, SmartFlowModel
-from smartflow.core.scenario_loader import (
-    create_agents_from_scenario,
-    generate_simple_test_agents,
-    generate_break_time_agents,
-    generate_start_of_day_agents,
-    generate_lesson_changeover_agents
+from typing import TYPE_CHECKING, Dict, Tuple
+
+import numpy as np
+
+from smartflow.core.mode_runs import (
+    ModeRunProcess,
+    ModeRunRequest,
+    ParallelModeRuns,
+    prepare_mode_run,
 )
+from smartflow.core.model import SmartFlowModel
+from smartflow.core.snapshots import RenderBuffer
+from smartflow.viz.agent_raster import rasterise_agents, raster_available, to_photo_image
+from smartflow.viz.viewport import EdgeGrid
 
 if TYPE_CHECKING:
     from ..app import SmartFlowApp
 
+# Above this many visible agents the raster agent layer is used even if unticked.
+RASTER_AUTO_AGENTS = 1500
+
 
 class RunView(ttk.Frame):
     """Frame providing controls to run or stop simulations."""
@@ -40,9 +44,19 @@ class RunView(ttk.Frame):
         self.offset_x = 0.0
         self.offset_y = 0.0
         self.node_coords: Dict[str, Tuple[float, float]] = {}
-        self.agent_offsets: Dict[str, float] = {} # Store lateral offset for each agent
-        self.agent_visual_pos: Dict[str, Tuple[float, float]] = {}  # Smoothed on-screen position
+        # Smoothed on-screen position per render agent key (NaN = not drawn yet)
+        self.agent_visual_xy = np.full((0, 2), np.nan)
         self.agent_canvas_ids: Dict[int, int] = {}  # Persistent canvas IDs for agents to avoid create/delete churn
+        # Screen geometry of the render buffer's edges on the current floor
+        self._edge_geometry: Dict[str, np.ndarray] | None = None
+        self._edge_geometry_buffer: RenderBuffer | None = None
+        # Raster agent layer: one canvas image instead of an oval per agent
+        self.raster_agents_var = tk.BooleanVar(value=False)
+        self._agent_photo = None
+        self._agent_layer_id: int | None = None
+        self._agent_items_visible = True
+        # Agent keys whose ovals were shown in the last frame
+        self._shown_agent_ids: set = set()
 
         # Playback + lesson changeover configuration
         self.playback_mult_var = tk.DoubleVar(value=1.0)
@@ -66,6 +80,12 @@ class RunView(ttk.Frame):
         # for "Run next period" when sequencing scenario periods.
         self._start_button_default_text = "Start Simulation"
         self._stop_event = threading.Event()
+
+        # Fast mode with several modes selected: runs on a process pool.
+        self.parallel_runs: ParallelModeRuns | None = None
+        # Fast mode with one run at a time: the run's child process.
+        self.mode_process: ModeRunProcess | None = None
+        self.mode_progress_vars: Dict[str, tk.DoubleVar] = {}
         
         self._init_ui()
 
@@ -98,6 +118,10 @@ class RunView(ttk.Frame):
         self.progress_bar = ttk.Progressbar(status_frame, variable=self.progress_var, maximum=100)
         self.progress_bar.pack(fill=tk.X, pady=(10, 0))
 
+        # Per-mode progress bars (parallel fast-mode runs only)
+        self.mode_progress_frame = ttk.Frame(status_frame)
+        self.mode_progress_frame.pack(fill=tk.X)
+
         # Simulation Mode Selection (Checkboxes for multi-mode)
         mode_frame = ttk.LabelFrame(left_panel, text="Simulation Mode(s)", padding=10)
         mode_frame.pack(fill=tk.X, pady=10)
@@ -106,16 +130,18 @@ class RunView(ttk.Frame):
             "start_of_day": tk.BooleanVar(value=False),
             "lesson_changeover": tk.BooleanVar(value=True),
             "break_time": tk.BooleanVar(value=False),
+            "full_day": tk.BooleanVar(value=False),
         }
         
         self.mode_labels = {
             "start_of_day": "Start of Day",
             "lesson_changeover": "Lesson Changeover",
             "break_time": "Break Time",
+            "full_day": "Full Day (timetable)",
         }
         
         # Order matters for the checklist
-        for key in ["start_of_day", "lesson_changeover", "break_time"]:
+        for key in ["start_of_day", "lesson_changeover", "break_time", "full_day"]:
             ttk.Checkbutton(
                 mode_frame,
                 text=self.mode_labels[key],
@@ -271,6 +297,14 @@ class RunView(ttk.Frame):
             variable=self.skip_animation_var,
         ).pack(side=tk.LEFT)
 
+        # Raster layer: always on above RASTER_AUTO_AGENTS agents (needs Pillow)
+        ttk.Checkbutton(
+            playback_frame,
+            text="Raster agents",
+            variable=self.raster_agents_var,
+            state="normal" if raster_available() else "disabled",
+        ).pack(side=tk.LEFT, padx=(8, 0))
+
         # Loading indicator (hidden by default)
         self.loading_label = ttk.Label(playback_frame, text="⏳ Computing...", foreground="#2980B9")
         # Will be shown/hidden during fast-run
@@ -326,6 +360,10 @@ class RunView(ttk.Frame):
         self.canvas.delete("all")
         self.node_coords.clear()
         self.agent_canvas_ids.clear()
+        self._edge_geometry = None
+        self._agent_layer_id = None
+        self._agent_items_visible = True
+        self._shown_agent_ids = set()
         
         # Calculate bounds
         xs = [n.position[0] for n in floorplan.nodes]
@@ -503,134 +541,170 @@ class RunView(ttk.Frame):
         except Exception:
             pass
 
+    def _edge_screen_geometry(self, buffer: RenderBuffer) -> Dict[str, np.ndarray]:
+        """Per-edge screen geometry for the current floor, indexed like `buffer.edge_keys`.
+
+        Rebuilt only when the floor/scale changes (`_setup_visualization` clears it).
+        """
+        if self._edge_geometry is not None and self._edge_geometry_buffer is buffer:
+            return self._edge_geometry
+        n = len(buffer.edge_keys)
+        x1 = np.full(n, np.nan)
+        y1 = np.full(n, np.nan)
+        x2 = np.full(n, np.nan)
+        y2 = np.full(n, np.nan)
+        for i, (u, v) in enumerate(buffer.edge_keys):
+            if u in self.node_coords:
+                x1[i], y1[i] = self.node_coords[u]
+            if v in self.node_coords:
+                x2[i], y2[i] = self.node_coords[v]
+        dx, dy = x2 - x1, y2 - y1
+        dist = np.hypot(dx, dy)
+        safe = np.where(dist > 0, dist, 1.0)
+        has_dir = np.isfinite(dist) & (dist > 0)
+        width_px = np.asarray(buffer.edge_width_m, dtype=float) * self.scale
+        self._edge_geometry = {
+            # Viewport culling: lane offsets reach one corridor width, plus the dot.
+            "grid": EdgeGrid(x1, y1, x2, y2, width_px + 4.0),
+            # Target on this floor too: interpolate (otherwise e.g. stairs: stay at source).
+            "has_target": np.isfinite(x2) & np.isfinite(x1),
+            "x1": x1,
+            "y1": y1,
+            "dx": np.nan_to_num(dx),
+            "dy": np.nan_to_num(dy),
+            # Unit perpendicular (-dy, dx) scaled by the corridor width in pixels.
+            "px": np.where(has_dir, -dy / safe, 0.0) * buffer.edge_width_m * self.scale,
+            "py": np.where(has_dir, dx / safe, 0.0) * buffer.edge_width_m * self.scale,
+            "length_m": np.asarray(buffer.edge_length_m, dtype=float),
+        }
+        self._edge_geometry_buffer = buffer
+        return self._edge_geometry
+
     def _update_visualization(self) -> None:
-        """Draw agents at current positions using persistent canvas items."""
-        if not self.model:
+        """Draw agents from the latest render snapshot using persistent canvas items.
+
+        Reads `model.render_buffer` without taking `model_lock`, so the simulation
+        thread keeps stepping while a frame is drawn.
+        """
+        buffer = self.model.render_buffer if self.model else None
+        # Only this floor's bucket is copied out of the buffer.
+        snapshot = buffer.latest(floor=self.floor_var.get()) if buffer is not None else None
+        if snapshot is None:
             return
-            
+
         self.canvas.delete("timer")
-        
-        floorplan = self.controller.state.get("floorplan")
-        current_floor = self.floor_var.get()
-        
-        # Track which agents were updated this frame so we can hide others
-        updated_agent_ids = set()
-        
-        for agent in self.model.agents:
-            if agent.active and not agent.completed and agent.current_edge:
-                u, v = agent.current_edge
-                
-                # Only draw if the source node is on the current floor
-                if u in self.node_coords:
-                    x1, y1 = self.node_coords[u]
-                    
-                    # Logic for position calculation
-                    ax, ay = x1, y1 # Default to source
-
-                    if v in self.node_coords:
-                        x2, y2 = self.node_coords[v]
-                        
-                        # Interpolate
-                        edge_data = self.model.graph.get_edge_data(u, v)
-                        length = edge_data.get("length_m", 1.0)
-                        width_m = edge_data.get("width_m", 2.0)
-                        
-                        ratio = agent.position_along_edge / length if length > 0 else 0
-                        ratio = max(0.0, min(1.0, ratio))
-                        
-                        ax = x1 + (x2 - x1) * ratio
-                        ay = y1 + (y2 - y1) * ratio
-                        
-                        # --- Visual Smoothing & Lane Logic ---
-                        # NEA Improvement: Taper lateral offset near nodes to prevent corner skipping/looping.
-                        # Agents move towards the center of the junction before turning, mirroring natural movement.
-                        raw_offset = getattr(agent, "lateral_offset", 0.0)
-                        
-                        # Calculate distance from ends of the edge
-                        dist_from_start = ratio * length
-                        dist_from_end = (1.0 - ratio) * length
-                        taper_zone_m = 1.5 # Distance over which agent merges to center
-                        
-                        taper_factor = 1.0
-                        if dist_from_start < taper_zone_m:
-                            taper_factor = dist_from_start / taper_zone_m
-                        elif dist_from_end < taper_zone_m:
-                            taper_factor = dist_from_end / taper_zone_m
-                            
-                        # Apply easing (SmoothStep) to the taper for less robotic movement
-                        taper_factor = taper_factor * taper_factor * (3 - 2 * taper_factor)
-                        
-                        current_offset = raw_offset * taper_factor
-                        
-                        dx = x2 - x1
-                        dy = y2 - y1
-                        dist = math.sqrt(dx*dx + dy*dy)
-                        
-                        if dist > 0:
-                            # Perpendicular vector (-dy, dx)
-                            px = -dy / dist
-                            py = dx / dist
-                            
-                            # Scale by physical width (converted to pixels)
-                            width_px = width_m * self.scale
-                            
-                            # Apply offset directly
-                            ax += px * width_px * current_offset
-                            ay += py * width_px * current_offset
-
-                        # 3. Screen-space smoothing to reduce sharp corner snaps.
-                        # Lower alpha simulates inertia for turns.
-                        agent_id_str = str(agent.profile.agent_id)
-                        prev = self.agent_visual_pos.get(agent_id_str)
-                        if prev is None:
-                            smooth_x, smooth_y = ax, ay
-                        else:
-                            # Exponential smoothing
-                            # Alpha 0.4 provides a good balance between responsiveness and curve smoothing
-                            alpha = 0.4
-                            smooth_x = prev[0] + (ax - prev[0]) * alpha
-                            smooth_y = prev[1] + (ay - prev[1]) * alpha
-
-                        self.agent_visual_pos[agent_id_str] = (smooth_x, smooth_y)
-                        ax, ay = smooth_x, smooth_y
-                        
-                    else:
-                        # v is NOT on this floor (e.g. stairs)
-                        agent_id_str = str(agent.profile.agent_id)
-                        self.agent_visual_pos[agent_id_str] = (ax, ay)
-
-                    # --- Color Logic ---
-                    # 0-10s: Blue (#3498DB), 10-30s: Orange (#F39C12), >30s: Red (#E74C3C)
-                    wait_time = agent.waiting_time_s
-                    if wait_time < 10:
-                        color = "#3498DB"
-                    elif wait_time < 30:
-                        color = "#F39C12"
-                    else:
-                        color = "#E74C3C"
-                            
-                    # --- Draw/Update Agent ---
-                    aid = agent.profile.agent_id
-                    canvas_id = self.agent_canvas_ids.get(aid)
-                    r = 2
-                    
-                    if canvas_id is None:
-                        # Create new persistent item
-                        canvas_id = self.canvas.create_oval(ax-r, ay-r, ax+r, ay+r, fill=color, outline="", tags="agent")
-                        self.agent_canvas_ids[aid] = canvas_id
-                    else:
-                        # Update existing item
-                        self.canvas.coords(canvas_id, ax-r, ay-r, ax+r, ay+r)
-                        self.canvas.itemconfigure(canvas_id, fill=color, state="normal")
-                    
-                    updated_agent_ids.add(aid)
-
-        # Hide any agents that are not visible this frame
-        for aid, cid in self.agent_canvas_ids.items():
-            if aid not in updated_agent_ids:
-                self.canvas.itemconfigure(cid, state="hidden")
+        geo = self._edge_screen_geometry(buffer)
+
+        # Cull to agents on edges that overlap the visible scroll region.
+        viewport = (
+            self.canvas.canvasx(0),
+            self.canvas.canvasy(0),
+            self.canvas.winfo_width() or 800,
+            self.canvas.winfo_height() or 600,
+        )
+        keep = snapshot.edge >= 0
+        keep[keep] = geo["grid"].visible(*viewport)[snapshot.edge[keep]]
+        keys = snapshot.agent_key[keep]
+        edge = snapshot.edge[keep]
+        ratio = snapshot.fraction[keep].astype(float)
+        has_target = geo["has_target"][edge]
+
+        ax = geo["x1"][edge] + np.where(has_target, geo["dx"][edge] * ratio, 0.0)
+        ay = geo["y1"][edge] + np.where(has_target, geo["dy"][edge] * ratio, 0.0)
+
+        # --- Visual Smoothing & Lane Logic ---
+        # NEA Improvement: Taper lateral offset near nodes to prevent corner skipping/looping.
+        # Agents move towards the center of the junction before turning, mirroring natural movement.
+        taper_zone_m = 1.5  # Distance over which agent merges to center
+        length = geo["length_m"][edge]
+        dist_from_start = ratio * length
+        dist_from_end = (1.0 - ratio) * length
+        taper = np.where(
+            dist_from_start < taper_zone_m,
+            dist_from_start / taper_zone_m,
+            np.where(dist_from_end < taper_zone_m, dist_from_end / taper_zone_m, 1.0),
+        )
+        # Apply easing (SmoothStep) to the taper for less robotic movement
+        taper = taper * taper * (3 - 2 * taper)
+        lane = np.where(has_target, snapshot.offset[keep] * taper, 0.0)
+        ax += geo["px"][edge] * lane
+        ay += geo["py"][edge] * lane
+
+        # Screen-space exponential smoothing (alpha 0.4) reduces sharp corner snaps;
+        # agents first seen this frame, or on an edge leaving the floor, snap.
+        if len(keys) and keys.max() >= len(self.agent_visual_xy):
+            grown = np.full((max(int(keys.max()) + 1, 2 * len(self.agent_visual_xy)), 2), np.nan)
+            grown[: len(self.agent_visual_xy)] = self.agent_visual_xy
+            self.agent_visual_xy = grown
+        prev = self.agent_visual_xy[keys]
+        smooth = has_target & np.isfinite(prev[:, 0])
+        alpha = 0.4
+        ax = np.where(smooth, prev[:, 0] + (ax - prev[:, 0]) * alpha, ax)
+        ay = np.where(smooth, prev[:, 1] + (ay - prev[:, 1]) * alpha, ay)
+        self.agent_visual_xy[keys, 0] = ax
+        self.agent_visual_xy[keys, 1] = ay
+
+        # --- Color Logic ---
+        # 0-10s: Blue (#3498DB), 10-30s: Orange (#F39C12), >30s: Red (#E74C3C)
+        palette = ("#3498DB", "#F39C12", "#E74C3C")
+        wait_classes = snapshot.wait_class[keep]
+
+        use_raster = raster_available() and (
+            bool(self.raster_agents_var.get()) or len(keys) > RASTER_AUTO_AGENTS
+        )
+        if use_raster:
+            self._draw_agents_raster(ax, ay, wait_classes, palette, viewport)
+        else:
+            self._draw_agents_items(keys, ax, ay, wait_classes, palette)
+        self._draw_changeover_timer(snapshot.time_s)
+
+    def _draw_agents_raster(
+        self,
+        ax: np.ndarray,
+        ay: np.ndarray,
+        wait_classes: np.ndarray,
+        palette: Tuple[str, ...],
+        viewport: Tuple[float, float, float, float],
+    ) -> None:
+        """Draw all agents as one image of the visible viewport (see `viz.agent_raster`)."""
+        if self._agent_items_visible:
+            self.canvas.itemconfigure("agent", state="hidden")
+            self._agent_items_visible = False
+            self._shown_agent_ids = set()
+        x0, y0 = viewport[0], viewport[1]
+        rgba = rasterise_agents(ax, ay, wait_classes, viewport=viewport, palette=palette, radius=2)
+        self._agent_photo = to_photo_image(rgba, self._agent_photo)
+        if self._agent_layer_id is None:
+            self._agent_layer_id = self.canvas.create_image(x0, y0, anchor="nw", image=self._agent_photo, tags="agent_layer")
+        else:
+            self.canvas.coords(self._agent_layer_id, x0, y0)
+            self.canvas.itemconfigure(self._agent_layer_id, image=self._agent_photo, state="normal")
+
+    def _draw_agents_items(
+        self, keys: np.ndarray, ax: np.ndarray, ay: np.ndarray, wait_classes: np.ndarray, palette: Tuple[str, ...]
+    ) -> None:
+        """Draw agents as persistent canvas ovals (one item per agent)."""
+        if self._agent_layer_id is not None:
+            self.canvas.itemconfigure(self._agent_layer_id, state="hidden")
+        self._agent_items_visible = True
+        r = 2
+        updated_agent_ids: set = set()
+        for aid, x, y, wait_class in zip(keys.tolist(), ax.tolist(), ay.tolist(), wait_classes.tolist()):
+            canvas_id = self.agent_canvas_ids.get(aid)
+            if canvas_id is None:
+                # Create new persistent item
+                canvas_id = self.canvas.create_oval(x-r, y-r, x+r, y+r, fill=palette[wait_class], outline="", tags="agent")
+                self.agent_canvas_ids[aid] = canvas_id
+            else:
+                # Update existing item
+                self.canvas.coords(canvas_id, x-r, y-r, x+r, y+r)
+                self.canvas.itemconfigure(canvas_id, fill=palette[wait_class], state="normal")
+            updated_agent_ids.add(aid)
 
-        self._draw_changeover_timer()
+        # Hide agents shown last frame but culled (or finished) this frame
+        for aid in self._shown_agent_ids - updated_agent_ids:
+            self.canvas.itemconfigure(self.agent_canvas_ids[aid], state="hidden")
+        self._shown_agent_ids = updated_agent_ids
 
 
     def _update_room_key(self) -> None:
@@ -707,13 +781,13 @@ class RunView(ttk.Frame):
         legend_row(self.legend_items_frame, "Delay > 30s", "#E74C3C")
 
 
-    def _draw_changeover_timer(self) -> None:
+    def _draw_changeover_timer(self, time_s: float | None = None) -> None:
         if not self.model:
             return
 
         minutes = int(self.changeover_minutes_var.get() or 5)
         changeover_s = max(60, minutes * 60)
-        t = float(self.model.time_s)
+        t = float(self.model.time_s if time_s is None else time_s)
         remaining = changeover_s - t
 
         def fmt(secs: float) -> str:
@@ -756,198 +830,6 @@ class RunView(ttk.Frame):
             tags=("timer",),
         )
 
-    def _create_agents_from_scenario(self, scenario_data: Dict[str, Any], scale: float, period_index: int = -1) -> List[AgentProfile]:
-        """Generate agents based on loaded scenario configuration.
-        
-        Args:
-            scenario_data: The full scenario configuration.
-            scale: Population scaling factor.
-            period_index: If >= 0, only generate agents for this specific period index.
-                          If -1, generate for all periods (legacy behavior).
-        """
-        agents = []
-        seed = scenario_data.get("random_seed", 42)
-        rng = random.Random(seed)
-        
-        behaviour = scenario_data.get("behaviour", {})
-        
-        # Helper for sampling distributions
-        def sample(spec: Any, default: float = 0.0) -> float:
-            if spec is None: return default
-            if isinstance(spec, (int, float)): return float(spec)
-            if isinstance(spec, dict):
-                if "value" in spec: return float(spec["value"])
-                if "uniform" in spec: return rng.uniform(spec["uniform"][0], spec["uniform"][1])
-                if "lognormal" in spec: return rng.lognormvariate(spec["mean"], spec["sigma"])
-                if "normal" in spec: return rng.normalvariate(spec["mean"], spec["sigma"])
-            return default
-
-        agent_id_counter = 0
-        
-        # Helper to parse time
-        def parse_time(t_str: str) -> float:
-            try:
-                h, m = map(int, t_str.split(":"))
-                return h * 3600.0 + m * 60.0
-            except:
-                return 0.0
-
-        # Find earliest start time to normalise
-        start_times = []
-        all_periods = scenario_data.get("periods", [])
-        
-        # Filter periods if index specified
-        target_periods = []
-        if period_index >= 0:
-            if period_index < len(all_periods):
-                target_periods = [all_periods[period_index]]
-            else:
-                return [] # Invalid index
-        else:
-            target_periods = all_periods
-
-        for p in all_periods:
-            if "start_time" in p:
-                start_times.append(parse_time(p["start_time"]))
-        
-        min_time = min(start_times) if start_times else 0.0
-
-        # 1. Group movements
-        movements_by_chain: Dict[str, List[Dict]] = {}
-        standalone_movements: List[Dict] = []
-        
-        for period in target_periods:
-            period_id = period["id"]
-            period_start = period.get("start_time", "00:00")
-            
-            for move in period.get("movements", []):
-                count = int(move.get("count", 1) * scale)
-                chain_id = move.get("chain_id")
-                
-                if chain_id:
-                    if chain_id not in movements_by_chain:
-                        movements_by_chain[chain_id] = []
-                    movements_by_chain[chain_id].append({
-                        **move, 
-                        "period_id": period_id,
-                        "period_start_time": period_start
-                    })
-                else:
-                    for _ in range(count):
-                        standalone_movements.append({
-                            **move, 
-                            "period_id": period_id,
-                            "period_start_time": period_start
-                        })
-
-        # 2. Create Agents from Chains
-        for chain_id, moves in movements_by_chain.items():
-            agent_id_counter += 1
-            
-            schedule = []
-            
-            # Use first move to determine agent properties
-            first_move = moves[0]
-            
-            # Calculate base start time from the first period in the chain
-            # If we are running a specific period, we treat its start time as T=0 for the simulation run?
-            # OR we keep absolute time?
-            # If we run periods sequentially, the simulation resets to T=0 each time.
-            # So we should normalise relative to the PERIOD start time, not the global min time.
-            
-            if period_index >= 0:
-                # Relative to THIS period's start
-                ref_time = parse_time(first_move.get("period_start_time", "00:00"))
-            else:
-                # Relative to global start
-                ref_time = min_time
-
-            chain_start_time = parse_time(first_move.get("period_start_time", "00:00")) - ref_time
-            
-            # Jitter departure for the whole chain
-            jitter = sample(behaviour.get("depart_jitter_s"), 0.0)
-            current_time = chain_start_time + max(0.0, jitter)
-            
-            for move in moves:
-                origin = move["origin"]
-                dest = move["destination"]
-                delay = move.get("delay_s", 0.0)
-                
-                # Add delay before scheduling this leg
-                current_time += delay
-                
-                # Validate
-                floorplan = self.controller.state["floorplan"]
-                if origin not in list(floorplan.node_ids()) or dest not in list(floorplan.node_ids()):
-                    continue
-
-                entry = AgentScheduleEntry(
-                    period=move["period_id"],
-                    origin_room=origin,
-                    destination_room=dest,
-                    depart_time_s=current_time
-                )
-                schedule.append(entry)
-            
-            if not schedule:
-                continue
-            
-            profile = AgentProfile(
-                agent_id=f"student_chain_{chain_id}",
-                role="student",
-                speed_base_mps=sample(behaviour.get("speed_base_mps"), 1.4),
-                stairs_penalty=sample(behaviour.get("stairs_penalty", {}).get("student"), 0.5),
-                optimality_beta=sample(behaviour.get("optimality_beta"), 1.0),
-                reroute_interval_ticks=int(sample(behaviour.get("reroute_interval_ticks"), 10)),
-                detour_probability=sample(behaviour.get("detour_probability"), 0.0),
-                schedule=schedule
-            )
-            agents.append(profile)
-
-        # 3. Create Agents from Standalone
-        for move in standalone_movements:
-            agent_id_counter += 1
-            origin = move["origin"]
-            dest = move["destination"]
-            
-            floorplan = self.controller.state["floorplan"]
-            if origin not in list(floorplan.node_ids()) or dest not in list(floorplan.node_ids()):
-                continue
-            
-            # Calculate departure time based on period start
-            period_start_s = parse_time(move.get("period_start_time", "00:00"))
-            
-            if period_index >= 0:
-                ref_time = period_start_s # Relative to itself (starts at 0)
-            else:
-                ref_time = min_time
-
-            relative_start = period_start_s - ref_time
-            
-            jitter = sample(behaviour.get("depart_jitter_s"), 0.0)
-            depart_time = relative_start + max(0.0, jitter)
-            
-            entry = AgentScheduleEntry(
-                period=move["period_id"],
-                origin_room=origin,
-                destination_room=dest,
-                depart_time_s=depart_time
-            )
-            
-            profile = AgentProfile(
-                agent_id=f"student_{agent_id_counter}",
-                role="student",
-                speed_base_mps=sample(behaviour.get("speed_base_mps"), 1.4),
-                stairs_penalty=sample(behaviour.get("stairs_penalty", {}).get("student"), 0.5),
-                optimality_beta=sample(behaviour.get("optimality_beta"), 1.0),
-                reroute_interval_ticks=int(sample(behaviour.get("reroute_interval_ticks"), 10)),
-                detour_probability=sample(behaviour.get("detour_probability"), 0.0),
-                schedule=[entry]
-            )
-            agents.append(profile)
-                    
-        return agents
-
     def _start_sequence(self) -> None:
         """Begin execution of selected simulation modes in sequence."""
         # 1. Identify selected modes
@@ -956,6 +838,7 @@ class RunView(ttk.Frame):
         if self.mode_vars["start_of_day"].get(): selected_modes.append("start_of_day")
         if self.mode_vars["lesson_changeover"].get(): selected_modes.append("lesson_changeover")
         if self.mode_vars["break_time"].get(): selected_modes.append("break_time")
+        if self.mode_vars["full_day"].get(): selected_modes.append("full_day")
         
         if not selected_modes:
             messagebox.showwarning("Select Mode", "Please select at least one simulation type to run.")
@@ -985,8 +868,106 @@ class RunView(ttk.Frame):
         # 4. Start First
         self.start_btn.config(state="disabled")
         self.next_btn.config(state="disabled")
+        self._clear_mode_progress()
+        if bool(self.skip_animation_var.get()) and len(selected_modes) > 1:
+            # Modes are independent: in fast mode run them side by side in processes.
+            self._start_parallel_runs(selected_modes)
+            return
         self._run_next_in_queue()
 
+    def _clear_mode_progress(self) -> None:
+        for child in self.mode_progress_frame.winfo_children():
+            child.destroy()
+        self.mode_progress_vars = {}
+
+    def _start_parallel_runs(self, modes: list) -> None:
+        """Dispatch every selected mode to a worker process and poll for results."""
+        requests = [self._build_run_request(mode) for mode in modes]
+        self.run_queue = []
+        self.parallel_modes = list(modes)
+        self.parallel_runs = ParallelModeRuns(requests)
+
+        for mode in modes:
+            ttk.Label(self.mode_progress_frame, text=self.mode_labels.get(mode, mode)).pack(anchor="w", pady=(6, 0))
+            var = tk.DoubleVar(value=0.0)
+            ttk.Progressbar(self.mode_progress_frame, variable=var, maximum=100).pack(fill=tk.X)
+            self.mode_progress_vars[mode] = var
+
+        self.is_running = True
+        # Worker processes cannot be paused; the stop button cancels the batch instead.
+        self.stop_btn.config(state="normal", text="Cancel", command=self._cancel_parallel_runs)
+        self.loading_label.pack(side=tk.LEFT, padx=8)
+        self.status_var.set(f"Running {len(modes)} modes in parallel (Fast Mode)...")
+        self._poll_parallel_runs()
+
+    def _poll_parallel_runs(self) -> None:
+        """UI loop for parallel runs: update per-mode bars and collect finished modes."""
+        runs = self.parallel_runs
+        if runs is None:
+            return
+        try:
+            finished = runs.completed()
+        except Exception as e:
+            runs.cancel()
+            self.parallel_runs = None
+            self.loading_label.pack_forget()
+            messagebox.showerror("Simulation Error", f"A parallel run failed: {e}")
+            self._on_sequence_completed()
+            return
+
+        self._store_parallel_results(finished)
+
+        fractions = runs.progress()
+        for mode, fraction in fractions.items():
+            self.mode_progress_vars[mode].set(fraction * 100)
+        self.progress_var.set(100 * sum(fractions.values()) / max(1, len(fractions)))
+
+        if not runs.done:
+            self.after(100, self._poll_parallel_runs)
+            return
+
+        runs.close()
+        self._end_parallel_runs()
+
+    def _store_parallel_results(self, finished: list) -> None:
+        for mode, collector in finished:
+            mode_name = self.mode_labels.get(mode, mode)
+            if collector is None:
+                print(f"No agents generated for {mode_name}. Skipped.")
+                continue
+            self.sequence_results[mode] = collector
+            print(f"Finished {mode}. Avg Delay: {collector.summary.mean_travel_time_s}")
+
+    def _end_parallel_runs(self) -> None:
+        """Hand the results of the modes that finished to the normal end-of-sequence path."""
+        self.parallel_runs = None
+        self.loading_label.pack_forget()
+        # Results arrive in completion order; keep the selection order.
+        self.sequence_results = {m: self.sequence_results[m] for m in self.parallel_modes if m in self.sequence_results}
+        if self.sequence_results:
+            last_mode = list(self.sequence_results)[-1]
+            self.controller.state["last_sim_mode"] = last_mode
+            self.controller.state["current_sim_name"] = self.mode_labels.get(last_mode, last_mode)
+        self._on_sequence_completed()
+
+    def _cancel_parallel_runs(self) -> None:
+        """Cancel the parallel batch after confirmation, keeping the modes already finished."""
+        runs = self.parallel_runs
+        if runs is None:
+            return
+        if not messagebox.askyesno(
+            "Cancel Simulations",
+            "Cancel the modes still running? Modes that already finished keep their results.",
+        ):
+            return
+        try:
+            self._store_parallel_results(runs.completed())
+        except Exception:
+            pass  # a failed mode has no result to keep
+        runs.cancel()
+        self._end_parallel_runs()
+        self.status_var.set("Parallel runs cancelled.")
+
     def _run_next_in_queue(self) -> None:
         """Run the next simulation in the queue."""
         if not self.run_queue:
@@ -1009,20 +990,14 @@ class RunView(ttk.Frame):
             messagebox.showerror("Simulation Error", f"Failed to start {mode_name}: {e}")
             self._on_sequence_completed() # Abort
 
-    def _setup_single_run(self, mode: str, mode_name: str) -> None:
-        """Generate agents and configure model for a single run."""
+    def _build_run_request(self, mode: str) -> ModeRunRequest:
+        """Collect the UI state one mode run needs (also sent to worker processes)."""
         config_data = self.controller.state.get("scenario_config", {})
-        floorplan = self.controller.state.get("floorplan")
-        disabled_edges = list(self.controller.state.get("disabled_edges", []))
-        
         minutes = int(self.changeover_minutes_var.get() or 5)
-        duration = max(60, minutes * 60)
-        seed = config_data.get("seed", 42)
-        scale = config_data.get("scale", 1.0)
         scenario_data = config_data.get("data")
         
         # Robust fallback for scenario data
-        if not scenario_data and mode == "lesson_changeover":
+        if not scenario_data and mode in ("lesson_changeover", "full_day"):
             try:
                 from smartflow.io.importers import load_scenario
                 floorplan_path = self.controller.state.get("floorplan_path")
@@ -1034,31 +1009,45 @@ class RunView(ttk.Frame):
             except Exception:
                 pass
 
-        agents = []
-        
-        # --- GENERATION LOGIC ---
-        if mode == "break_time":
-            agents = generate_break_time_agents(floorplan, seed, scale, duration)
-        elif mode == "start_of_day":
-            agents = generate_start_of_day_agents(floorplan, seed, scale)
-        elif mode == "lesson_changeover":
-            # User Request Check: "IF I HAVE TICKED OFF LESSON CHANGEOVER, ALL STUDENTS SHOULD START IN THE ROOMS"
-            # Previously this tried to load from a scenario file (Period 0), which often contained "Start of Day" logic.
-            # We now Enforce procedural generation for consistency with "Start of Day" and "Break Time" modes.
-            
-            # Use smart lesson changeover generation (Room -> Room)
-            # User requirement: ~15-25 students per class.
-            room_count = len([n for n in floorplan.nodes if n.kind == "room"])
-            if room_count == 0: room_count = 5 # Fallback
-            
-            # Average 20 students per room
-            base_students = room_count * 20
-            agent_count = int(base_students * scale)
-            
-            agents = generate_lesson_changeover_agents(floorplan, agent_count, seed)
+        request = ModeRunRequest(
+            mode=mode,
+            floorplan=self.controller.state.get("floorplan"),
+            duration_s=float(max(60, minutes * 60)),
+            seed=config_data.get("seed", 42),
+            scale=config_data.get("scale", 1.0),
+            disabled_edges=list(self.controller.state.get("disabled_edges", [])),
+            scenario=scenario_data,
+        )
 
-        if not agents:
-            messagebox.showwarning("Warning", f"No agents generated for {mode_name}. Skipping.")
+        # Population + route caching
+        try:
+            from smartflow.io.persistence import DEFAULT_DB_PATH
+            from smartflow.io import db as dbio
+
+            request.population_db_path = DEFAULT_DB_PATH
+            floorplan_path = self.controller.state.get("floorplan_path")
+            if floorplan_path:
+                request.route_cache_db_path = str(DEFAULT_DB_PATH)
+                request.route_cache_layout_hash = dbio.compute_layout_namespace(Path(floorplan_path))
+        except Exception:
+            pass
+        return request
+
+    def _setup_single_run(self, mode: str, mode_name: str) -> None:
+        """Generate agents and configure model for a single run."""
+        request = self._build_run_request(mode)
+        if bool(self.skip_animation_var.get()):
+            # Nothing to animate: simulate in a child process so neither the UI nor
+            # the model competes for the GIL.
+            self._start_process_run(request, mode_name)
+            return
+
+        prepared = prepare_mode_run(request)
+        if prepared is None:
+            if mode == "full_day":
+                messagebox.showwarning("Full Day", "Full Day mode needs a scenario with timetable periods. Skipping.")
+            else:
+                messagebox.showwarning("Warning", f"No agents generated for {mode_name}. Skipping.")
             self._run_next_in_queue()
             return
 
@@ -1066,35 +1055,84 @@ class RunView(ttk.Frame):
         self.controller.state["last_sim_mode"] = mode
         self.controller.state["current_sim_name"] = mode_name
 
-        tick_seconds = 0.05
-        sim_config = SimulationConfig(
-            tick_seconds=tick_seconds,
-            transition_window_s=float(duration),
-            random_seed=seed, # Could offset seed by mode index
-            disabled_edges=disabled_edges,
-            lesson_changeover_s=float(duration),
-            k_paths=3, # Enable alternative routes (second fastest) for stochastic agents
+        self.model, self.total_ticks = prepared
+        self._start_model_run(mode_name)
+
+    def _start_process_run(self, request: ModeRunRequest, mode_name: str) -> None:
+        """Run one mode in a child process and poll its progress from the UI loop."""
+        self.controller.state["last_sim_mode"] = request.mode
+        self.controller.state["current_sim_name"] = mode_name
+        self.model = None
+        self.mode_process = ModeRunProcess(request)
+
+        self.is_running = True
+        self.stop_btn.config(state="normal", text="Pause")
+        self.status_var.set(f"Running {mode_name} (Fast Mode)...")
+        self.loading_label.pack(side=tk.LEFT, padx=8)
+        self.canvas.delete("all")
+        self.canvas.create_text(
+            self.canvas.winfo_width() // 2 or 400,
+            self.canvas.winfo_height() // 2 or 300,
+            text=f"⏳ Running {mode_name}...\nPlease wait.",
+            font=("Segoe UI", 14),
+            fill="#555",
+            justify="center",
         )
+        self._poll_mode_process()
 
-        # Route caching
+    def _poll_mode_process(self) -> None:
+        """UI loop for a child-process run: show progress, collect the result."""
+        process = self.mode_process
+        if process is None:
+            return
+        mode_name = self.mode_labels.get(process.mode, process.mode)
+        if not process.poll():
+            status = process.status()
+            total = int(status["total_ticks"])
+            if total > 0 and not process.paused:
+                tick = int(status["tick"])
+                self.progress_var.set(100 * tick / total)
+                self.status_var.set(
+                    f"Computing {mode_name}... {int(100 * tick / total)}% "
+                    f"(t={status['time_s']:.0f}s, {int(status['active_agents'])} walking)"
+                )
+            self.after(100, self._poll_mode_process)
+            return
+
+        self.mode_process = None
+        self.is_running = False
+        self.loading_label.pack_forget()
         try:
-            from smartflow.io.persistence import DEFAULT_DB_PATH
-            from smartflow.io import db as dbio
-            floorplan_path = self.controller.state.get("floorplan_path")
-            if floorplan_path:
-                sim_config.route_cache_db_path = str(DEFAULT_DB_PATH)
-                sim_config.route_cache_layout_hash = dbio.compute_layout_hash(Path(floorplan_path))
-        except Exception:
-            pass
+            collector = process.result()
+        except RuntimeError as e:
+            messagebox.showerror("Simulation Error", str(e))
+            self._on_sequence_completed()
+            return
+        if collector is None:
+            messagebox.showwarning("Warning", f"No agents generated for {mode_name}. Skipping.")
+        else:
+            self.sequence_results[process.mode] = collector
+            print(f"Finished {process.mode}. Avg Delay: {collector.summary.mean_travel_time_s}")
+        self.progress_var.set(100)
+        self.after(500, self._run_next_in_queue)
 
-        self.model = SmartFlowModel(floorplan, agents, sim_config)
-        
-        # Setup Runtime
-        max_sim_s = max(float(duration) * 2.0, float(duration) + 60.0)
-        self.total_ticks = int(max_sim_s / tick_seconds)
+    def _cancel_process_run(self) -> None:
+        """Abandon a paused child-process run and the rest of the queue."""
+        if self.mode_process is not None:
+            self.mode_process.cancel()
+            self.mode_process = None
+        self.run_queue = []
+        self.loading_label.pack_forget()
+        self._on_sequence_completed()
+        self.status_var.set("Simulation cancelled.")
+
+    def _start_model_run(self, mode_name: str) -> None:
+        """Reset playback state for `self.model` and start the UI loop."""
         self.current_tick = 0
-        self.agent_offsets.clear()
-        self.agent_visual_pos.clear()
+        self.agent_visual_xy = np.full((0, 2), np.nan)
+        self._edge_geometry = None
+        # The worker thread publishes a snapshot per tick; frames read it lock-free.
+        self.model.render_buffer = RenderBuffer(self.model)
         
         self.is_running = True
         self.stop_btn.config(state="normal", text="Pause")
@@ -1120,11 +1158,13 @@ class RunView(ttk.Frame):
         self._run_step()
 
     def _on_sequence_completed(self) -> None:
-        """Called when all selected modes have finished."""
+        """Called when all selected modes have finished (or the rest were cancelled)."""
         self.is_running = False
+        self._clear_mode_progress()
         self.status_var.set("All selected simulations completed.")
-        self.start_btn.config(state="normal", text="Run Again")
-        self.stop_btn.config(state="disabled")
+        # Pause/cancel repurpose both buttons; restore their default commands.
+        self.start_btn.config(state="normal", text="Run Again", command=self._start_sequence)
+        self.stop_btn.config(state="disabled", text="Pause", command=self._stop_simulation)
         
         # Store all results in state for ResultsView
         self.controller.state["all_results"] = self.sequence_results
@@ -1171,7 +1211,7 @@ class RunView(ttk.Frame):
                         break
                     with self.model_lock:
                         self.model.step()
-                        self.current_tick += 1
+                        self._sync_current_tick()
                 
                 # Tiny yield to let UI thread breathe if needed, but mostly stay busy
                 # No targeted sleep, just run as fast as CPU permits
@@ -1198,7 +1238,7 @@ class RunView(ttk.Frame):
                 
                 with self.model_lock:
                     self.model.step()
-                    self.current_tick += 1
+                    self._sync_current_tick()
                 
                 # Sleep the remainder to match realistic speed
                 elapsed = time.perf_counter() - start_t
@@ -1207,6 +1247,13 @@ class RunView(ttk.Frame):
                 if sleep_time > 0:
                     time.sleep(sleep_time)
             
+    def _sync_current_tick(self) -> None:
+        """Advance the progress counter; it follows simulated time because idle gaps may be skipped."""
+        if self.model.config.skip_idle_gaps:
+            self.current_tick = int(round(self.model.time_s / self.model.config.tick_seconds))
+        else:
+            self.current_tick += 1
+
     def _run_step(self) -> None:
         """UI loop: Updates visualization and status from background thread."""
         if not self.is_running or not self.model:
@@ -1240,15 +1287,24 @@ class RunView(ttk.Frame):
             self.after(100, self._run_step)
         else:
             self.status_var.set(f"Running... ({self.current_tick}/{self.total_ticks})")
-            # Update visualisation - acquire lock to read agents consistent state
-            with self.model_lock:
-                self._update_visualization()
+            # Update visualisation from the last published snapshot (no lock needed)
+            self._update_visualization()
             
             # Schedule next UI update (30fps target)
             self.after(33, self._run_step)
 
     def _stop_simulation(self) -> None:
-        """Pause the running simulation."""
+        """Pause the running simulation (also the Space shortcut)."""
+        if self.parallel_runs is not None:
+            # Worker processes cannot be paused; only the Cancel button stops the batch.
+            return
+        if self.mode_process is not None:
+            self.mode_process.pause()
+            self.is_running = False
+            self.status_var.set("Simulation paused. Resume to continue or Cancel to stop.")
+            self.start_btn.config(state="normal", text="Resume", command=self._resume_simulation)
+            self.stop_btn.config(state="normal", text="Cancel", command=self._cancel_process_run)
+            return
         self.is_running = False
         self.status_var.set("Simulation paused. Press Space or Resume to continue.")
         self.start_btn.config(state="normal", text="Resume", command=self._resume_simulation)
@@ -1256,6 +1312,12 @@ class RunView(ttk.Frame):
 
     def _resume_simulation(self) -> None:
         """Resume a paused simulation."""
+        if self.mode_process is not None:
+            self.mode_process.resume()
+            self.is_running = True
+            self.start_btn.config(state="disabled")
+            self.stop_btn.config(state="normal", text="Pause", command=self._stop_simulation)
+            return
         if self.model is None or self.current_tick >= self.total_ticks:
             return
         self.is_running = True
@@ -1281,34 +1343,7 @@ class RunView(ttk.Frame):
             return
 
         # --- METRICS COLLECTION ---
-        for state in self.model.agents:
-            # 1. Determine Lateness
-            is_late = bool(getattr(state, "is_late", False))
-            if not state.completed and state.active:
-                is_late = True
-            
-            scheduled = getattr(state, "scheduled_arrival_s", None)
-            actual = getattr(state, "actual_arrival_s", None)
-            
-            # 2. Determine Delay
-            # Use accumulated waiting time (congestion penalty) as the delay metric.
-            # This ensures we capture congestion even if agents arrive on time (due to generous buffers).
-            delay_s = state.waiting_time_s
-            
-            # Record
-            self.model.collector.record_agent(
-                state.profile.agent_id,
-                AgentMetrics(
-                    travel_time_s=state.travel_time_s,
-                    path_nodes=state.path_nodes,
-                    delay_s=delay_s,
-                    scheduled_arrival_s=scheduled,
-                    actual_arrival_s=actual,
-                    is_late=is_late,
-                )
-            )
-        
-        summary = self.model.collector.finalize()
+        summary = self.model.finish().summary
         
         # --- STORE RESULT ---
         if hasattr(self, "current_sim_mode"):
@@ -0,0 +1,81 @@
+"""Viewport culling for the live RunView animation.
+
+NEA note (technique):
+    - A uniform spatial grid (hash) over the screen-space bounding boxes of one
+      floor's edges: each cell lists the edges touching it. The edges visible in a
+      viewport are the union of the lists of the cells it overlaps, so the cost of a
+      query depends on the viewport size rather than on the size of the school.
+    - The visible-edge mask is cached until the viewport moves to other cells.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+class EdgeGrid:
+    """Uniform grid over edge bounding boxes (screen pixels) for viewport queries."""
+
+    def __init__(
+        self,
+        x1: np.ndarray,
+        y1: np.ndarray,
+        x2: np.ndarray,
+        y2: np.ndarray,
+        pad: np.ndarray,
+        *,
+        cell_px: float = 128.0,
+    ) -> None:
+        """Index the edges with finite endpoints; ``pad`` widens each box (lanes, dot radius).
+
+        Edges with only a finite start (e.g. stairs leaving the floor) are indexed as a
+        point at their start. Edges without a finite start are never visible.
+        """
+
+        self.edge_count = len(x1)
+        self.cell_px = float(cell_px)
+        x2 = np.where(np.isfinite(x2), x2, x1)
+        y2 = np.where(np.isfinite(y2), y2, y1)
+        indexed = np.isfinite(x1) & np.isfinite(y1)
+        cells: Dict[Tuple[int, int], List[int]] = {}
+        for e in np.flatnonzero(indexed).tolist():
+            c0 = math.floor((min(x1[e], x2[e]) - pad[e]) / self.cell_px)
+            c1 = math.floor((max(x1[e], x2[e]) + pad[e]) / self.cell_px)
+            r0 = math.floor((min(y1[e], y2[e]) - pad[e]) / self.cell_px)
+            r1 = math.floor((max(y1[e], y2[e]) + pad[e]) / self.cell_px)
+            for cx in range(c0, c1 + 1):
+                for cy in range(r0, r1 + 1):
+                    cells.setdefault((cx, cy), []).append(e)
+        self._cells = {key: np.array(edges, dtype=np.int64) for key, edges in cells.items()}
+        self._cached_range: Tuple[int, int, int, int] | None = None
+        self._cached_mask = np.zeros(self.edge_count, dtype=bool)
+
+    def visible(self, x0: float, y0: float, width: float, height: float) -> np.ndarray:
+        """Boolean mask over edges whose box overlaps the viewport ``(x0, y0, width, height)``."""
+
+        cell_range = (
+            math.floor(x0 / self.cell_px),
+            math.floor((x0 + width) / self.cell_px),
+            math.floor(y0 / self.cell_px),
+            math.floor((y0 + height) / self.cell_px),
+        )
+        if cell_range == self._cached_range:
+            return self._cached_mask
+        c0, c1, r0, r1 = cell_range
+        mask = np.zeros(self.edge_count, dtype=bool)
+        if (c1 - c0 + 1) * (r1 - r0 + 1) > len(self._cells):
+            # Viewport covers more cells than are occupied: scan the occupied ones.
+            for (cx, cy), edges in self._cells.items():
+                if c0 <= cx <= c1 and r0 <= cy <= r1:
+                    mask[edges] = True
+        else:
+            for cx in range(c0, c1 + 1):
+                for cy in range(r0, r1 + 1):
+                    edges = self._cells.get((cx, cy))
+                    if edges is not None:
+                        mask[edges] = True
+        self._cached_range, self._cached_mask = cell_range, mask
+        return mask
@@ -0,0 +1,19 @@
+"""Small floor plans shared by the simulation tests."""
+
+from __future__ import annotations
+
+from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec
+
+
+def corridor_plan() -> FloorPlan:
+    """Rooms A, B and C in a line, joined by 10 m corridors A->B and B->C."""
+
+    nodes = [
+        NodeSpec(node_id=n, label=n, kind="room", floor=0, position=(float(i) * 10.0, 0.0, 0.0))
+        for i, n in enumerate("ABC")
+    ]
+    edges = [
+        EdgeSpec(edge_id="ab", source="A", target="B", length_m=10.0, width_m=2.0, capacity_pps=2.0),
+        EdgeSpec(edge_id="bc", source="B", target="C", length_m=10.0, width_m=2.0, capacity_pps=2.0),
+    ]
+    return FloorPlan(nodes=nodes, edges=edges)
@@ -0,0 +1,51 @@
+"""Tests for the NumPy raster agent layer."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from smartflow.viz.agent_raster import rasterise_agents
+
+PALETTE = ("#0000ff", "#ff8000", "#ff0000")
+
+
+def test_dots_are_drawn_in_viewport_coordinates() -> None:
+    image = rasterise_agents(
+        np.array([110.0, 500.0]),
+        np.array([220.0, 20.0]),
+        np.array([0, 2]),
+        viewport=(100.0, 200.0, 40, 30),
+        palette=PALETTE,
+        radius=2,
+    )
+    assert image.shape == (30, 40, 4)
+    assert tuple(image[20, 10]) == (0, 0, 255, 255)
+    assert image[20, 13, 3] == 0  # outside the dot
+    # The second agent is off-screen; nothing else is drawn.
+    assert (image[..., 3] > 0).sum() == (image[15:26, 5:16, 3] > 0).sum()
+
+
+def test_overlapping_dots_show_the_highest_wait_class() -> None:
+    image = rasterise_agents(
+        np.array([10.0, 11.0, 10.5]),
+        np.array([10.0, 10.0, 10.0]),
+        np.array([0, 2, 1]),
+        viewport=(0.0, 0.0, 20, 20),
+        palette=PALETTE,
+        lod_threshold=10,
+    )
+    assert tuple(image[10, 10]) == (255, 0, 0, 255)
+
+
+def test_crowded_cells_become_density_splats() -> None:
+    rng = np.random.default_rng(0)
+    xs = np.concatenate([rng.uniform(30, 35, 40), [5.0]])
+    ys = np.concatenate([rng.uniform(30, 35, 40), [5.0]])
+    image = rasterise_agents(
+        xs, ys, np.zeros(41, dtype=int), viewport=(0.0, 0.0, 60, 60), palette=PALETTE, lod_cell_px=6, lod_threshold=4
+    )
+    # The crowd fills its cells with a translucent/opaque block of the class colour...
+    assert tuple(image[31, 31, :3]) == (0, 0, 255) and image[31, 31, 3] >= 115
+    # ...while the lone agent is still an opaque dot.
+    assert tuple(image[5, 5]) == (0, 0, 255, 255)
+    assert image[0, 59, 3] == 0
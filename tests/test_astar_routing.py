@@ -5,7 +5,9 @@ import pytest
 
 from smartflow.core.routing import (
     compute_a_star_path,
+    compute_path_cost,
     compute_shortest_path,
+    landmark_table,
 )
 
 
@@ -73,3 +75,59 @@ def test_astar_with_stairs_penalty():
 
     # With heavy stairs penalty, both should avoid B->D and go via C
     assert list(dijkstra_path) == list(astar_path)
+
+
+def _build_multi_floor_graph(floors: int = 4) -> nx.DiGraph:
+    """Corridor grid per floor, joined by two stairwells (positions ignore floors)."""
+    g = nx.DiGraph()
+    for f in range(floors):
+        for i in range(6):
+            g.add_node(f"F{f}_{i}", position=(i * 10.0, 0.0, f * 4.0), floor=f)
+        for i in range(5):
+            g.add_edge(f"F{f}_{i}", f"F{f}_{i + 1}", length_m=10.0, width_m=2.0)
+            g.add_edge(f"F{f}_{i + 1}", f"F{f}_{i}", length_m=10.0, width_m=2.0)
+    for f in range(floors - 1):
+        for i in (0, 5):
+            g.add_edge(f"F{f}_{i}", f"F{f + 1}_{i}", length_m=6.0, width_m=1.5, is_stairs=True)
+            g.add_edge(f"F{f + 1}_{i}", f"F{f}_{i}", length_m=6.0, width_m=1.5, is_stairs=True)
+    return g
+
+
+def test_astar_with_alt_heuristic():
+    """ALT landmarks should return the optimal path on the small graph."""
+    g = _build_test_graph()
+
+    dijkstra_path = compute_shortest_path(g, "A", "D")
+    astar_alt = compute_a_star_path(g, "A", "D", heuristic="alt")
+
+    assert list(dijkstra_path) == list(astar_alt)
+
+
+@pytest.mark.parametrize("stairs_penalty", [0.0, 5.0])
+def test_alt_matches_dijkstra_costs_on_multi_floor_layout(stairs_penalty):
+    """ALT bounds must stay admissible across floors, stairs penalties and congestion."""
+    g = _build_multi_floor_graph()
+    congestion = {("F0_1", "F0_2"): 2.0, ("F2_5", "F3_5"): 1.5}
+    kwargs = dict(
+        stairs_penalty=stairs_penalty,
+        congestion_map=congestion,
+        congestion_alpha=3.0,
+        congestion_p=2.0,
+    )
+    table = landmark_table(g, count=4)
+    assert len(table.landmarks) == 4
+
+    for source, target in [("F0_2", "F3_3"), ("F3_0", "F0_4"), ("F1_3", "F2_1")]:
+        expected = compute_path_cost(g, compute_shortest_path(g, source, target, **kwargs), **kwargs)
+        path = compute_a_star_path(g, source, target, heuristic="alt", landmarks=table, **kwargs)
+        assert compute_path_cost(g, path, **kwargs) == pytest.approx(expected)
+
+        bounds = table.lower_bounds(target)
+        assert bounds[table.node_index[source]] <= expected + 1e-9
+
+
+def test_landmark_table_is_cached_by_layout():
+    """Equivalent graphs share one landmark table."""
+    assert landmark_table(_build_multi_floor_graph(), count=3) is landmark_table(
+        _build_multi_floor_graph(), count=3
+    )
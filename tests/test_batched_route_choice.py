@@ -0,0 +1,115 @@
+"""Tests for batched (per OD pair) route choice."""
+
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pytest
+
+from smartflow.core.agents import AgentProfile, AgentScheduleEntry
+from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec
+from smartflow.core.model import SimulationConfig, SmartFlowModel
+from smartflow.core.routing import choose_route_indices
+
+
+def test_choose_route_indices_matches_softmax() -> None:
+    costs = [1.0, 1.5, 3.0]
+    beta = 1.2
+    rng = np.random.default_rng(7)
+    n = 20_000
+    picks = choose_route_indices(costs, [beta] * n, [0.0] * n, rng)
+
+    weights = [math.exp(-beta * (c - min(costs))) for c in costs]
+    expected = [w / sum(weights) for w in weights]
+    observed = np.bincount(picks, minlength=len(costs)) / n
+    assert observed == pytest.approx(expected, abs=0.02)
+
+
+def test_choose_route_indices_deterministic_beta() -> None:
+    rng = np.random.default_rng(0)
+    picks = choose_route_indices([2.0, 1.0], [10_000.0] * 5, [0.0] * 5, rng)
+    assert picks.tolist() == [0, 0, 0, 0, 0]
+
+
+def _diamond_plan() -> FloorPlan:
+    nodes = [
+        NodeSpec(node_id=n, label=n, kind="room" if n in "AC" else "junction", floor=0, position=pos)
+        for n, pos in (("A", (0.0, 0.0, 0.0)), ("B", (1.0, 0.0, 0.0)), ("C", (2.0, 0.0, 0.0)), ("D", (1.0, 1.0, 0.0)))
+    ]
+    edges = [
+        EdgeSpec(edge_id=u + v, source=u, target=v, length_m=1.0, width_m=2.0, capacity_pps=2.0)
+        for u, v in (("A", "B"), ("B", "C"), ("A", "D"), ("D", "C"))
+    ]
+    return FloorPlan(nodes=nodes, edges=edges)
+
+
+@pytest.mark.parametrize("route_choice_sets", [False, True])
+def test_batched_activation_assigns_valid_routes(route_choice_sets: bool) -> None:
+    profiles = [
+        AgentProfile(
+            agent_id=f"a{i}",
+            role="student",
+            speed_base_mps=1.4,
+            stairs_penalty=float(i % 2),
+            optimality_beta=1.0,
+            reroute_interval_ticks=0,
+            detour_probability=0.2,
+            schedule=[AgentScheduleEntry(period="p", origin_room="A", destination_room="C", depart_time_s=0.0)],
+        )
+        for i in range(12)
+    ]
+    config = SimulationConfig(
+        tick_seconds=0.1,
+        transition_window_s=10.0,
+        random_seed=3,
+        batch_route_choice=True,
+        route_choice_sets=route_choice_sets,
+    )
+    model = SmartFlowModel(_diamond_plan(), profiles, config)
+    model._activate_agents()
+
+    routes = {tuple(state.route) for state in model.agents}
+    assert all(state.active for state in model.agents)
+    assert routes <= {("A", "B", "C"), ("A", "D", "C")}
+    # Candidates are searched once per (origin, destination, stairs penalty).
+    assert len(model._candidate_cache) == 2
+
+
+def test_batched_reroute_shares_candidates_and_keeps_cooldown() -> None:
+    profiles = [
+        AgentProfile(
+            agent_id=f"a{i}",
+            role="student",
+            speed_base_mps=1.4,
+            stairs_penalty=0.0,
+            optimality_beta=10_000.0,
+            reroute_interval_ticks=5,
+            detour_probability=0.0,
+            schedule=[AgentScheduleEntry(period="p", origin_room="A", destination_room="C", depart_time_s=0.0)],
+        )
+        for i in range(6)
+    ]
+    config = SimulationConfig(
+        tick_seconds=0.1,
+        transition_window_s=10.0,
+        random_seed=1,
+        congestion_alpha=10.0,
+        reroute_hysteresis_margin=0.0,
+        reroute_delay_threshold_s=0.0,
+        batch_route_choice=True,
+    )
+    model = SmartFlowModel(_diamond_plan(), profiles, config)
+    for i, state in enumerate(model.agents):
+        state.active = True
+        state.route = ["A", "B", "C"]
+        state.current_edge = ("A", "B")
+        state.waiting_time_s = 999.0
+        # The last agent rerouted recently and is still cooling down.
+        state.last_reroute_tick = 8 if i == 5 else 0
+    model.congestion_map = {("A", "B"): 5.0, ("B", "C"): 5.0}
+
+    assert model._reroute_at_nodes(current_tick=10) == 5
+    assert [s.route for s in model.agents[:5]] == [["A", "D", "C"]] * 5
+    assert model.agents[5].route == ["A", "B", "C"]
+    assert len(model._candidate_cache) == 1
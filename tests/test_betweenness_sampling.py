@@ -0,0 +1,65 @@
+"""Tests for sampled, parallel and DB-cached edge betweenness."""
+
+from __future__ import annotations
+
+import networkx as nx
+import pytest
+
+from smartflow.core import graph_analysis
+from smartflow.core.graph_analysis import betweenness_sample_size, edge_betweenness
+
+
+def _grid(size: int) -> nx.DiGraph:
+    g = nx.grid_2d_graph(size, size).to_directed()
+    return nx.relabel_nodes(g, {n: f"{n[0]}_{n[1]}" for n in g.nodes})
+
+
+def test_parallel_exact_matches_networkx() -> None:
+    g = _grid(5)
+    expected = nx.edge_betweenness_centrality(g, normalized=True)
+    got = edge_betweenness(g, workers=2)
+    assert got == pytest.approx({(str(u), str(v)): b for (u, v), b in expected.items()})
+
+
+def test_sampled_betweenness_meets_error_target() -> None:
+    g = _grid(25)
+    epsilon = 0.1
+    assert betweenness_sample_size(g.number_of_edges(), epsilon) < g.number_of_nodes()
+
+    exact = edge_betweenness(g)
+    sampled = edge_betweenness(g, epsilon=epsilon, seed=3)
+    assert sampled.keys() == exact.keys()
+    assert max(abs(sampled[e] - exact[e]) for e in exact) <= epsilon
+    with pytest.raises(ValueError):
+        betweenness_sample_size(10, 0.0)
+
+
+def test_betweenness_is_cached_in_database(tmp_path, monkeypatch) -> None:
+    db_path = tmp_path / "cache.db"
+    g = _grid(4)
+    first = edge_betweenness(g, db_path=db_path)
+
+    graph_analysis._BETWEENNESS_CACHE.clear()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("betweenness should come from the database")
+
+    monkeypatch.setattr(graph_analysis.nx, "edge_betweenness_centrality", fail)
+    assert edge_betweenness(_grid(4), db_path=db_path) == first
+
+
+def test_demand_betweenness_is_cached_in_database(tmp_path, monkeypatch) -> None:
+    db_path = tmp_path / "cache.db"
+    demand = {("0_0", "3_3"): 4.0, ("3_0", "0_3"): 2.0}
+    monkeypatch.setattr(graph_analysis, "_DEMAND_BETWEENNESS_CACHE", {})
+    first = graph_analysis.demand_betweenness(_grid(4), demand, db_path=db_path)
+
+    graph_analysis._DEMAND_BETWEENNESS_CACHE.clear()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("demand betweenness should come from the database")
+
+    monkeypatch.setattr(graph_analysis, "_accumulate_flows", fail)
+    assert graph_analysis.demand_betweenness(_grid(4), demand, db_path=db_path) == first
+    ranked = graph_analysis.rank_critical_edges(_grid(4), demand=demand, db_path=db_path, top_k=1)
+    assert ranked[0].betweenness == max(first.values())
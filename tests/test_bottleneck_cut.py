@@ -0,0 +1,81 @@
+"""Tests for max-flow / min-cut bottleneck analysis."""
+
+from __future__ import annotations
+
+import pytest
+
+from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec
+from smartflow.core.graph_analysis import (
+    SPECIFIC_FLOW_PPS_PER_M,
+    bottleneck_cut,
+    egress_bottleneck,
+    period_bottlenecks,
+)
+
+
+def _wing() -> FloorPlan:
+    """Three rooms feeding a corridor that exits through a narrow door and a wide one."""
+
+    def node(node_id: str, kind: str, **meta) -> NodeSpec:
+        return NodeSpec(node_id=node_id, label=node_id, kind=kind, floor=0, position=(0.0, 0.0, 0.0), metadata=meta)
+
+    nodes = [node(f"R{i}", "room") for i in range(3)] + [
+        node("C", "junction"),
+        node("D", "junction"),
+        node("EXIT_N", "junction", is_entrance=True),
+        node("EXIT_S", "entry"),
+    ]
+    edges = [EdgeSpec(edge_id=f"r{i}", source=f"R{i}", target="C", length_m=5.0, width_m=1.0, capacity_pps=2.0) for i in range(3)]
+    edges += [
+        EdgeSpec(edge_id="cd", source="C", target="D", length_m=20.0, width_m=3.0, capacity_pps=4.0),
+        EdgeSpec(edge_id="n", source="D", target="EXIT_N", length_m=2.0, width_m=0.9, capacity_pps=0.5),
+        EdgeSpec(edge_id="s", source="D", target="EXIT_S", length_m=2.0, width_m=2.0, capacity_pps=3.0),
+    ]
+    return FloorPlan(nodes=nodes, edges=edges)
+
+
+def test_egress_cut_finds_limiting_edges_and_clearance_bound() -> None:
+    g = _wing().to_networkx()
+    result = egress_bottleneck(g, people=140.0)
+    # Doors allow 0.5 + 3.0 = 3.5 p/s, below the 4 p/s corridor and 6 p/s of room doors.
+    assert result.max_flow_pps == pytest.approx(3.5)
+    assert set(result.cut_edges) == {("D", "EXIT_N"), ("D", "EXIT_S")}
+    assert result.clearance_lower_bound_s == pytest.approx(40.0)
+
+    # Width-derived capacities: the doors (0.9 m + 2.0 m of width) still limit the flow.
+    by_width = egress_bottleneck(g, capacity="width")
+    assert by_width.max_flow_pps == pytest.approx(2.9 * SPECIFIC_FLOW_PPS_PER_M)
+    assert by_width.clearance_lower_bound_s is None
+
+
+def test_period_bottlenecks_ignore_people_at_dropped_nodes() -> None:
+    g = _wing().to_networkx()
+    # R1 is both an origin and a destination, so it leaves both groups, and the
+    # 60 people starting or ending there must not count towards the bound.
+    movements = [
+        {"origin": "R0", "destination": "EXIT_S", "count": 30},
+        {"origin": "R1", "destination": "EXIT_S", "count": 10},
+        {"origin": "R2", "destination": "R1", "count": 50},
+    ]
+    cut = period_bottlenecks(g, {"periods": [{"id": "mixed", "movements": movements}]})["mixed"]
+    assert cut.max_flow_pps == pytest.approx(2.0)
+    assert cut.clearance_lower_bound_s == pytest.approx(30 / 2.0)
+
+
+def test_period_bottlenecks_and_validation() -> None:
+    g = _wing().to_networkx()
+    scenario = {
+        "periods": [
+            {"id": "leave", "movements": [{"origin": "R0", "destination": "EXIT_S", "count": 30}]},
+            {"id": "noop", "movements": [{"origin": "R0", "destination": "R0", "count": 3}]},
+        ]
+    }
+    cuts = period_bottlenecks(g, scenario)
+    assert list(cuts) == ["leave"]
+    assert cuts["leave"].max_flow_pps == pytest.approx(2.0)
+    assert cuts["leave"].clearance_lower_bound_s == pytest.approx(15.0)
+
+    with pytest.raises(ValueError):
+        bottleneck_cut(g, ["R0"], ["R0"])
+    with pytest.raises(ValueError):
+        bottleneck_cut(g, ["R0"], ["NOPE"])
@@ -0,0 +1,72 @@
+"""Tests for the customizable contraction hierarchy backend."""
+
+from __future__ import annotations
+
+import itertools
+import random
+
+import networkx as nx
+import pytest
+
+from smartflow.core.cch import cch_structure, customize_cch
+from smartflow.core.routing import compute_cch_path, compute_path_cost, compute_shortest_path
+
+
+def _grid_campus(size: int = 5, floors: int = 2) -> nx.DiGraph:
+    """Grid floors (with a few one-way corridors) joined by two stairwells."""
+    g = nx.DiGraph()
+    rnd = random.Random(4)
+    for f in range(floors):
+        for x in range(size):
+            for y in range(size):
+                for dx, dy in ((1, 0), (0, 1)):
+                    if x + dx < size and y + dy < size:
+                        u, v = f"F{f}_{x}_{y}", f"F{f}_{x + dx}_{y + dy}"
+                        length, width = rnd.uniform(5.0, 15.0), rnd.uniform(1.0, 3.0)
+                        g.add_edge(u, v, length_m=length, width_m=width)
+                        if rnd.random() > 0.15:
+                            g.add_edge(v, u, length_m=length, width_m=width)
+        if f:
+            for x, y in ((0, 0), (size - 1, size - 1)):
+                g.add_edge(f"F{f - 1}_{x}_{y}", f"F{f}_{x}_{y}", length_m=8.0, width_m=2.0, is_stairs=True)
+                g.add_edge(f"F{f}_{x}_{y}", f"F{f - 1}_{x}_{y}", length_m=8.0, width_m=2.0, is_stairs=True)
+    return g
+
+
+def test_cch_matches_dijkstra_under_congestion() -> None:
+    g = _grid_campus()
+    rnd = random.Random(9)
+    congestion = {e: rnd.uniform(0.0, 2.0) for e in g.edges}
+    kwargs = dict(stairs_penalty=3.0, congestion_map=congestion, congestion_alpha=1.5, congestion_p=2.0)
+    metric = customize_cch(g, **kwargs)
+
+    for source, target in itertools.permutations(sorted(g.nodes)[::4], 2):
+        try:
+            expected = compute_shortest_path(g, source, target, **kwargs)
+        except nx.NetworkXNoPath:
+            with pytest.raises(nx.NetworkXNoPath):
+                compute_cch_path(g, source, target, metric=metric)
+            continue
+        got = compute_cch_path(g, source, target, metric=metric)
+        assert got[0] == source and got[-1] == target
+        assert all(g.has_edge(u, v) for u, v in zip(got, got[1:]))
+        assert compute_path_cost(g, got, **kwargs) == pytest.approx(compute_path_cost(g, expected, **kwargs))
+
+
+def test_cch_recustomization_reuses_structure() -> None:
+    g = _grid_campus()
+    structure = cch_structure(g)
+    assert cch_structure(_grid_campus()) is structure
+
+    jam = {("F0_0_0", "F0_1_0"): 50.0}
+    calm = customize_cch(g)
+    jammed = customize_cch(g, congestion_map=jam, congestion_alpha=1.0)
+    assert calm.structure is jammed.structure is structure
+
+    assert compute_cch_path(g, "F0_0_0", "F0_1_0", metric=calm) == ["F0_0_0", "F0_1_0"]
+    path = compute_cch_path(g, "F0_0_0", "F0_4_0", metric=jammed)
+    assert ("F0_0_0", "F0_1_0") not in zip(path, path[1:])
+    expected = compute_shortest_path(g, "F0_0_0", "F0_4_0", congestion_map=jam, congestion_alpha=1.0)
+    assert compute_path_cost(g, path, congestion_map=jam, congestion_alpha=1.0) == pytest.approx(
+        compute_path_cost(g, expected, congestion_map=jam, congestion_alpha=1.0)
+    )
@@ -0,0 +1,57 @@
+"""Tests for demand-weighted edge betweenness."""
+
+from __future__ import annotations
+
+import networkx as nx
+import pytest
+
+from smartflow.core import graph_analysis
+from smartflow.core.graph_analysis import demand_betweenness, edge_betweenness, rank_critical_edges
+
+
+def _grid(size: int = 4) -> nx.DiGraph:
+    g = nx.grid_2d_graph(size, size).to_directed()
+    g = nx.relabel_nodes(g, {n: f"{n[0]}_{n[1]}" for n in g.nodes})
+    nx.set_edge_attributes(g, 5.0, "length_m")
+    nx.set_edge_attributes(g, 1.0, "width_m")
+    return g
+
+
+def test_unit_demand_matches_networkx_betweenness() -> None:
+    g = _grid()
+    nodes = sorted(g.nodes)
+    demand = {(s, t): 1.0 for s in nodes for t in nodes if s != t}
+    got = demand_betweenness(g, demand)
+    expected = nx.edge_betweenness_centrality(g, normalized=False)
+    # Each pair contributes one trip, so unnormalised betweenness / pairs is the share.
+    for (u, v), value in expected.items():
+        assert got[(u, v)] == pytest.approx(value / len(demand))
+
+
+def test_demand_betweenness_follows_trips_and_splits_ties() -> None:
+    g = _grid(3)
+    got = demand_betweenness(g, {("0_0", "0_2"): 10.0, ("0_0", "1_1"): 2.0})
+    assert got[("0_0", "0_1")] == pytest.approx((10.0 + 1.0) / 12.0)
+    assert got[("0_0", "1_0")] == pytest.approx(1.0 / 12.0)
+    assert got[("2_2", "2_1")] == 0.0
+    # Cached results are copies.
+    got[("0_0", "0_1")] = -1.0
+    assert demand_betweenness(g, {("0_0", "1_1"): 2.0, ("0_0", "0_2"): 10.0})[("0_0", "0_1")] > 0
+
+
+def test_parallel_matches_serial_and_ranking_uses_demand(monkeypatch: pytest.MonkeyPatch) -> None:
+    g = _grid(5)
+    nodes = sorted(g.nodes)
+    demand = {(nodes[i], nodes[-1 - i]): float(i + 1) for i in range(len(nodes)) if nodes[i] != nodes[-1 - i]}
+    # Each call starts from an empty cache, so both results are actually computed.
+    monkeypatch.setattr(graph_analysis, "_DEMAND_BETWEENNESS_CACHE", {})
+    serial = demand_betweenness(g, demand, stairs_penalty=0.25)
+    monkeypatch.setattr(graph_analysis, "_DEMAND_BETWEENNESS_CACHE", {})
+    parallel = demand_betweenness(g.copy(), demand, stairs_penalty=0.25, workers=2)
+    assert serial.keys() == parallel.keys()
+    assert parallel == pytest.approx(serial)
+    assert any(value > 0.0 for value in serial.values())
+
+    ranked = rank_critical_edges(g, demand={("0_0", "0_4"): 5.0}, top_k=4)
+    assert {r.edge for r in ranked} == {("0_0", "0_1"), ("0_1", "0_2"), ("0_2", "0_3"), ("0_3", "0_4")}
+    assert rank_critical_edges(g, top_k=1)[0].betweenness == max(edge_betweenness(g).values())
@@ -0,0 +1,96 @@
+"""Tests for scheduled edge closures during a run."""
+
+from __future__ import annotations
+
+import pytest
+
+from smartflow.core.agents import AgentProfile, AgentScheduleEntry
+from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec
+from smartflow.core.model import EdgeClosure, SimulationConfig, SmartFlowModel
+from smartflow.core.routing import closed_edges
+
+
+def _plan(links) -> FloorPlan:
+    names = sorted({n for u, v, _ in links for n in (u, v)})
+    nodes = [
+        NodeSpec(node_id=n, label=n, kind="room", floor=0, position=(float(i), 0.0, 0.0))
+        for i, n in enumerate(names)
+    ]
+    edges = [
+        EdgeSpec(edge_id=u + v, source=u, target=v, length_m=length, width_m=2.0, capacity_pps=2.0)
+        for u, v, length in links
+    ]
+    return FloorPlan(nodes=nodes, edges=edges)
+
+
+def _profile(origin: str, destination: str) -> AgentProfile:
+    return AgentProfile(
+        agent_id=f"{origin}{destination}",
+        role="student",
+        speed_base_mps=1.4,
+        stairs_penalty=0.0,
+        optimality_beta=10_000.0,
+        reroute_interval_ticks=0,
+        detour_probability=0.0,
+        schedule=[AgentScheduleEntry(period="p", origin_room=origin, destination_room=destination, depart_time_s=0.0)],
+    )
+
+
+def _config(*closures: EdgeClosure, **kwargs) -> SimulationConfig:
+    return SimulationConfig(
+        tick_seconds=0.5, transition_window_s=60.0, random_seed=1, k_paths=1, closures=list(closures), **kwargs
+    )
+
+
+DIAMOND = [("A", "B", 2.0), ("B", "C", 2.0), ("A", "D", 4.0), ("D", "C", 4.0)]
+
+
+@pytest.mark.parametrize("route_choice_sets", [False, True])
+def test_closure_reroutes_only_affected_agents(route_choice_sets: bool) -> None:
+    config = _config(EdgeClosure("AB", start_s=0.0, end_s=5.0), route_choice_sets=route_choice_sets)
+    if route_choice_sets:
+        config.k_paths = 2
+    model = SmartFlowModel(_plan(DIAMOND), [_profile("A", "C"), _profile("D", "C")], config)
+    for state, route in zip(model.agents, (["A", "B", "C"], ["D", "C"])):
+        state.active = True
+        state.route = list(route)
+        state.current_edge = (route[0], route[1])
+
+    model._update_closures()
+
+    assert closed_edges(model.graph) == {("A", "B"), ("B", "A")}
+    assert model.agents[0].route == ["A", "D", "C"]
+    assert model.agents[0].current_edge == ("A", "D")
+    assert model.agents[1].route == ["D", "C"]
+
+
+def test_candidate_cache_is_repaired_incrementally() -> None:
+    model = SmartFlowModel(_plan(DIAMOND), [], _config(EdgeClosure("AB", start_s=1.0, end_s=2.0)))
+    assert model._route_candidates("A", "C", 0.0)[0] == [["A", "B", "C"]]
+    unaffected = model._route_candidates("D", "C", 0.0)
+
+    model.time_s = 1.0
+    model._update_closures()
+    assert ("A", "C", 0.0) not in model._candidate_cache
+    assert model._candidate_cache[("D", "C", 0.0)] is unaffected
+    assert model._route_candidates("A", "C", 0.0)[0] == [["A", "D", "C"]]
+
+    model.time_s = 2.0
+    model._update_closures()
+    assert not closed_edges(model.graph)
+    assert model._candidate_cache[("D", "C", 0.0)] is unaffected
+    assert model._route_candidates("A", "C", 0.0)[0] == [["A", "B", "C"]]
+
+
+def test_agents_wait_at_closure_without_alternative() -> None:
+    config = _config(EdgeClosure("AB", start_s=0.0, end_s=3.0))
+    model = SmartFlowModel(_plan([("A", "B", 2.0)]), [_profile("A", "B")], config)
+    state = model.agents[0]
+
+    for _ in range(6):
+        model.step()
+    assert state.active and state.position_along_edge == 0.0
+    assert state.waiting_time_s > 0.0
+
+    model.run()
+    assert state.completed
@@ -0,0 +1,79 @@
+"""Tests for full-day (multi-period) simulation with idle-gap skipping."""
+
+from __future__ import annotations
+
+import pytest
+
+from smartflow.core import population
+from smartflow.core.timetable import build_day_model, simulate_day
+
+from .plans import corridor_plan
+
+
+def _scenario() -> dict:
+    return {
+        "random_seed": 4,
+        "transition_window_s": 60,
+        "periods": [
+            {"id": "P1", "start_time": "09:00", "movements": [{"origin": "A", "destination": "C", "count": 12}]},
+            {"id": "P2", "start_time": "10:00", "movements": [{"origin": "C", "destination": "B", "count": 8}]},
+            {"id": "P3", "start_time": "11:00", "movements": [{"origin": "B", "destination": "A", "count": 6}]},
+        ],
+    }
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(population, "_POPULATION_CACHE", {})
+
+
+def _run(**overrides):
+    model = build_day_model(corridor_plan(), _scenario(), tick_seconds=1.0, k_paths=1, **overrides)
+    steps = 0
+    while not model.is_complete:
+        model.step()
+        steps += 1
+    return model, steps, model.run()
+
+
+def test_skipping_idle_gaps_matches_full_clock() -> None:
+    skipped, skipped_steps, fast = _run()
+    full, full_steps, slow = _run(skip_idle_gaps=False)
+
+    assert skipped_steps < full_steps / 10
+    assert skipped.skipped_s > 6000.0
+    assert fast.step_times_s == sorted(set(fast.step_times_s))
+    assert set(fast.agent_metrics) == set(slow.agent_metrics)
+    for agent_id, metrics in slow.agent_metrics.items():
+        assert fast.agent_metrics[agent_id].travel_time_s == pytest.approx(metrics.travel_time_s)
+    assert fast.summary.max_edge_density == pytest.approx(slow.summary.max_edge_density)
+
+
+def test_metrics_are_segmented_per_period() -> None:
+    collector = simulate_day(corridor_plan(), _scenario(), tick_seconds=1.0, k_paths=1)
+
+    assert set(collector.period_summaries) == {"P1", "P2", "P3"}
+    counts = {p: s.movements for p, s in collector.period_summaries.items()}
+    assert counts == {"P1": 12, "P2": 8, "P3": 6}
+    p1, p2 = collector.period_summaries["P1"], collector.period_summaries["P2"]
+    assert p1.end_s < p2.start_s
+    assert p1.mean_travel_time_s is not None and p1.p90_travel_time_s >= p1.mean_travel_time_s * 0.5
+    assert p1.max_edge_density is not None and p1.max_edge_density > 0.0
+
+
+def test_node_occupancy_carries_over_between_periods() -> None:
+    model = build_day_model(corridor_plan(), _scenario(), tick_seconds=1.0, k_paths=1)
+    while not any(a.profile.schedule[0].period == "P2" for a in model.agents):
+        model.step()
+    # The 8 P2 walkers are among the 12 P1 arrivals still in C: nobody is counted twice.
+    assert model.node_occupancy["C"] == 12
+    while not model.is_complete:
+        model.step()
+    # 12 people end the day where their last walk took them.
+    assert model.node_occupancy == {"A": 6, "B": 8 - 6, "C": 12 - 8}
+    assert sum(model.node_occupancy.values()) == 12
+
+
+def test_day_model_requires_periods() -> None:
+    with pytest.raises(ValueError):
+        build_day_model(corridor_plan(), {"periods": []})
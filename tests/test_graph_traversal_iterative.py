@@ -0,0 +1,64 @@
+"""Tests for iterative traversals and incremental connectivity."""
+
+from __future__ import annotations
+
+import networkx as nx
+import pytest
+
+from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec, validate_floorplan
+from smartflow.core.graph_analysis import (
+    IncrementalConnectivity,
+    has_cycle,
+    has_cycle_dfs_recursive,
+    reachable_nodes,
+    reachable_nodes_dfs_recursive,
+)
+
+
+def test_iterative_traversals_match_recursive_versions() -> None:
+    g = nx.gnp_random_graph(60, 0.04, seed=2, directed=True)
+    g = nx.relabel_nodes(g, {n: f"N{n}" for n in g.nodes})
+    for start in ("N0", "N7", "N33"):
+        assert reachable_nodes(g, start) == reachable_nodes_dfs_recursive(g, start)
+    assert reachable_nodes(g, "MISSING") == set()
+
+    dag = nx.DiGraph([("A", "B"), ("B", "C"), ("A", "C")])
+    assert has_cycle(dag) is has_cycle_dfs_recursive(dag) is False
+    dag.add_edge("C", "A")
+    assert has_cycle(dag) is has_cycle_dfs_recursive(dag) is True
+
+
+def test_iterative_traversals_handle_long_corridors() -> None:
+    chain = nx.DiGraph()
+    nx.add_path(chain, [f"C{i}" for i in range(20_000)])
+    assert len(reachable_nodes(chain, "C0")) == 20_000
+    assert has_cycle(chain) is False
+    chain.add_edge("C19999", "C0")
+    assert has_cycle(chain) is True
+
+
+def test_incremental_connectivity_tracks_edits() -> None:
+    conn = IncrementalConnectivity(["A", "B", "C"], [("A", "B")])
+    assert conn.component_count == 2
+    assert conn.connected("A", "B") and not conn.connected("A", "C")
+
+    conn.add_edge("C", "B")
+    assert conn.is_connected()
+    conn.add_edge("A", "C")
+    conn.remove_edge("B", "C")
+    assert conn.is_connected()  # still joined through A - C
+    conn.remove_node("A")
+    assert conn.component_count == 2
+    assert [len(c) for c in conn.components()] == [1, 1]
+    conn.add_node("D")
+    assert conn.component_count == 3
+
+
+def test_validate_floorplan_reports_disconnected_parts() -> None:
+    nodes = [NodeSpec(node_id=n, label=n, kind="room", floor=0, position=(0.0, 0.0, 0.0)) for n in "ABCD"]
+    edges = [EdgeSpec(edge_id="ab", source="A", target="B", length_m=1.0, width_m=1.0, capacity_pps=1.0)]
+    with pytest.raises(ValueError, match=r"1\) size=2 sample=\[A, B\]"):
+        validate_floorplan(FloorPlan(nodes=nodes, edges=edges))
+    edges.append(EdgeSpec(edge_id="cb", source="C", target="B", length_m=1.0, width_m=1.0, capacity_pps=1.0))
+    edges.append(EdgeSpec(edge_id="dc", source="D", target="C", length_m=1.0, width_m=1.0, capacity_pps=1.0))
+    validate_floorplan(FloorPlan(nodes=nodes, edges=edges))
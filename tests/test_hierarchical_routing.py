@@ -0,0 +1,113 @@
+"""Tests for hierarchical floor/building routing."""
+
+from __future__ import annotations
+
+import itertools
+
+import networkx as nx
+import pytest
+
+from smartflow.core.hierarchy import portal_overlay
+from smartflow.core.routing import compute_hierarchical_path, compute_path_cost, compute_shortest_path
+
+
+def _campus(buildings: int = 2, floors: int = 3, halls: int = 4, tag_buildings: bool = True) -> nx.DiGraph:
+    g = nx.DiGraph()
+
+    def link(u: str, v: str, length: float, width: float, stairs: bool = False) -> None:
+        g.add_edge(u, v, length_m=length, width_m=width, is_stairs=stairs)
+        g.add_edge(v, u, length_m=length, width_m=width, is_stairs=stairs)
+
+    for b in range(buildings):
+        for f in range(floors):
+            for i in range(halls):
+                meta = {"building": f"B{b}"} if tag_buildings else {}
+                g.add_node(f"B{b}F{f}H{i}", floor=f, metadata=meta)
+                g.add_node(f"B{b}F{f}R{i}", floor=f, metadata=meta)
+                link(f"B{b}F{f}H{i}", f"B{b}F{f}R{i}", 6.0, 1.5)
+                if i:
+                    link(f"B{b}F{f}H{i - 1}", f"B{b}F{f}H{i}", 10.0 + i, 3.0)
+            if f:
+                link(f"B{b}F{f - 1}H0", f"B{b}F{f}H0", 8.0, 2.0, stairs=True)
+                link(f"B{b}F{f - 1}H{halls - 1}", f"B{b}F{f}H{halls - 1}", 8.0, 2.0, stairs=True)
+        if b:
+            link(f"B{b - 1}F0H{halls - 1}", f"B{b}F0H0", 40.0, 4.0)
+    return g
+
+
+@pytest.mark.parametrize("tag_buildings", [True, False])
+@pytest.mark.parametrize("stairs_penalty", [0.0, 4.0])
+def test_hierarchical_matches_dijkstra(tag_buildings: bool, stairs_penalty: float) -> None:
+    g = _campus(tag_buildings=tag_buildings)
+    nodes = sorted(g.nodes)[::3]
+    for source, target in itertools.permutations(nodes, 2):
+        expected = compute_shortest_path(g, source, target, stairs_penalty=stairs_penalty)
+        got = compute_hierarchical_path(g, source, target, stairs_penalty=stairs_penalty)
+        assert got[0] == source and got[-1] == target
+        assert all(g.has_edge(u, v) for u, v in zip(got, got[1:]))
+        assert compute_path_cost(g, got, stairs_penalty=stairs_penalty) == pytest.approx(
+            compute_path_cost(g, expected, stairs_penalty=stairs_penalty)
+        )
+
+
+def test_portal_overlay_is_small_and_cached() -> None:
+    overlay = portal_overlay(_campus(), stairs_penalty=1.0)
+    # Stair landings at both corridor ends on every floor; the inter-building link
+    # joins two of those landings, so it adds no extra portals.
+    assert len(overlay.cells) == 6
+    assert overlay.portal_count == 12
+    assert portal_overlay(_campus(), stairs_penalty=1.0) is overlay
+    assert portal_overlay(_campus(), stairs_penalty=2.0) is not overlay
+
+
+def test_hierarchical_path_errors_match_networkx() -> None:
+    g = _campus(buildings=1)
+    g.add_node("ISLAND", floor=0)
+    with pytest.raises(nx.NetworkXNoPath):
+        compute_hierarchical_path(g, "B0F0H0", "ISLAND")
+    with pytest.raises(nx.NodeNotFound):
+        compute_hierarchical_path(g, "B0F0H0", "MISSING")
+
+
+def test_model_builds_few_overlays_for_continuous_penalties(monkeypatch: pytest.MonkeyPatch) -> None:
+    from smartflow.core import hierarchy
+    from smartflow.core.agents import AgentProfile, AgentScheduleEntry
+    from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec
+    from smartflow.core.model import SimulationConfig, SmartFlowModel
+
+    built = []
+    build = hierarchy.build_portal_overlay
+    monkeypatch.setattr(hierarchy, "build_portal_overlay", lambda *a, **kw: built.append(kw) or build(*a, **kw))
+    monkeypatch.setattr(hierarchy, "_OVERLAY_CACHE", {})
+    plan = FloorPlan(
+        nodes=[
+            NodeSpec(node_id=n, label=n, kind="room", floor=f, position=(float(i) * 10.0, 0.0, float(f)))
+            for i, (n, f) in enumerate([("A", 0), ("S0", 0), ("S1", 1), ("B", 1)])
+        ],
+        edges=[
+            EdgeSpec(edge_id="a", source="A", target="S0", length_m=10.0, width_m=2.0, capacity_pps=2.0),
+            EdgeSpec(
+                edge_id="s", source="S0", target="S1", length_m=6.0, width_m=2.0, capacity_pps=2.0, is_stairs=True
+            ),
+            EdgeSpec(edge_id="b", source="S1", target="B", length_m=10.0, width_m=2.0, capacity_pps=2.0),
+        ],
+    )
+    agents = [
+        AgentProfile(
+            agent_id=f"a{i}",
+            role="student",
+            speed_base_mps=1.3,
+            stairs_penalty=1.0 + 0.1 * i,
+            optimality_beta=3.0,
+            reroute_interval_ticks=0,
+            detour_probability=0.0,
+            schedule=[AgentScheduleEntry(period="P1", origin_room="A", destination_room="B", depart_time_s=0.0)],
+        )
+        for i in range(30)
+    ]
+    config = SimulationConfig(tick_seconds=1.0, transition_window_s=60.0, random_seed=1, use_hierarchy=True)
+    model = SmartFlowModel(plan, agents, config)
+    model.run()
+
+    assert all(a.completed for a in model.agents)
+    assert 0 < len(built) <= 8
@@ -0,0 +1,114 @@
+"""Tests for the compiled binary layout cache."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+
+import pytest
+
+from smartflow.core import floorplan as fp
+from smartflow.core.compiled import compile_graph
+from smartflow.io.db import compute_layout_hash
+
+
+def _write_layout(path, width: float = 2.0) -> None:
+    data = {
+        "nodes": [
+            {"id": "A", "type": "room", "pos": [0, 0, 0], "building": "Main"},
+            {"id": "B", "type": "junction", "pos": [5, 0, 0]},
+            {"id": "C", "type": "room", "pos": [10, 0, 0]},
+        ],
+        "edges": [
+            {"id": "ab", "from": "A", "to": "B", "length_m": 5.0, "width_m": width, "capacity_pps": 1.0},
+            {"id": "bc", "from": "B", "to": "C", "length_m": 5.0, "width_m": width, "capacity_pps": 1.0},
+            {"id": "ca", "from": "C", "to": "A", "length_m": 9.0, "width_m": 1.0, "capacity_pps": 1.0, "lanes": 1},
+        ],
+    }
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_process_cache():
+    fp._LOADED_LAYOUTS.clear()
+    fp._SOURCE_HASHES.clear()
+    yield
+    fp._LOADED_LAYOUTS.clear()
+    fp._SOURCE_HASHES.clear()
+
+
+def test_second_load_skips_parse_and_graph_build(tmp_path, monkeypatch) -> None:
+    layout = tmp_path / "plan.json"
+    _write_layout(layout)
+    first = fp.load_floorplan(layout)
+    assert fp.layout_cache_path(layout).exists()
+
+    # A new process: nothing in memory, only the sidecar on disk.
+    fp._LOADED_LAYOUTS.clear()
+    monkeypatch.setattr(fp, "_parse_floorplan", lambda raw: pytest.fail("layout should come from the cache"))
+    second = fp.load_floorplan(layout)
+    assert second.nodes == first.nodes and second.edges == first.edges
+
+    g1, g2 = second.to_networkx(), second.to_networkx()
+    assert g1 is not g2 and sorted(g1.edges) == sorted(first.to_networkx().edges)
+    # The cached compilation is attached instead of recompiling.
+    compiled = compile_graph(g1)
+    assert compile_graph(g2) is compiled
+    monkeypatch.undo()
+    assert compiled.layout_hash == compile_graph(fp.load_floorplan(layout, use_cache=False).to_networkx()).layout_hash
+    g1.remove_edge("A", "B")
+    assert g2.has_edge("A", "B") and compile_graph(g1) is not compiled
+
+
+def test_cache_follows_source_hash(tmp_path) -> None:
+    layout = tmp_path / "plan.json"
+    _write_layout(layout)
+    fp.load_floorplan(layout)
+
+    # Touched but identical content: reused.
+    st = os.stat(layout)
+    os.utime(layout, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    assert fp.load_floorplan(layout).edges[0].width_m == 2.0
+
+    # Edited content: rebuilt.
+    _write_layout(layout, width=4.0)
+    os.utime(layout, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000_000))
+    plan = fp.load_floorplan(layout)
+    assert plan.edges[0].width_m == 4.0
+    assert compute_layout_hash(layout) == hashlib.sha256(layout.read_bytes()).hexdigest()
+
+
+def test_edited_plan_rebuilds_graph(tmp_path) -> None:
+    layout = tmp_path / "plan.json"
+    _write_layout(layout)
+    plan = fp.load_floorplan(layout)
+    plan.edges = [e for e in plan.edges if e.edge_id != "bc"]
+    assert not plan.to_networkx().has_edge("B", "C")
+    assert fp.load_floorplan(layout, use_cache=False).edges == fp.load_floorplan(layout).edges
+
+
+class _Payload:
+    """Pickle payload that would create a marker file when unpickled."""
+
+    def __init__(self, marker) -> None:
+        self.marker = str(marker)
+
+    def __reduce__(self):
+        return (open, (self.marker, "w"))
+
+
+def test_sidecar_cannot_run_code(tmp_path) -> None:
+    layout = tmp_path / "plan.json"
+    _write_layout(layout)
+    marker = tmp_path / "pwned"
+    fp.layout_cache_path(layout).write_bytes(pickle.dumps({"version": 1, "payload": _Payload(marker)}))
+
+    plan = fp.load_floorplan(layout)
+    assert not marker.exists()
+    assert [n.node_id for n in plan.nodes] == ["A", "B", "C"]
+    # The planted file was replaced by a rebuilt (pickle-free) artefact.
+    fp._LOADED_LAYOUTS.clear()
+    assert fp._read_layout_artefact(layout) is not None
+    assert fp.load_floorplan(layout).nodes[0].metadata == {"building": "Main"}
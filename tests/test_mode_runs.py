@@ -0,0 +1,90 @@
+"""Tests for headless and parallel runs of the RunView simulation modes."""
+
+from __future__ import annotations
+
+import pytest
+
+from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec
+from smartflow.core.mode_runs import ModeRunProcess, ModeRunRequest, prepare_mode_run, run_mode, run_modes_parallel
+from smartflow.core.model import SimulationConfig
+
+
+def _plan() -> FloorPlan:
+    kinds = {"E": "entrance", "R1": "room", "R2": "room", "K": "canteen"}
+    nodes = [
+        NodeSpec(node_id=n, label=n, kind=kind, floor=0, position=(float(i) * 10.0, 0.0, 0.0))
+        for i, (n, kind) in enumerate(kinds.items())
+    ]
+    edges = []
+    for u, v in (("E", "R1"), ("R1", "R2"), ("R2", "K")):
+        edges.append(EdgeSpec(edge_id=f"{u}{v}", source=u, target=v, length_m=10.0, width_m=2.0, capacity_pps=2.0))
+        edges.append(EdgeSpec(edge_id=f"{v}{u}", source=v, target=u, length_m=10.0, width_m=2.0, capacity_pps=2.0))
+    return FloorPlan(nodes=nodes, edges=edges)
+
+
+def _requests() -> list:
+    plan = _plan()
+    return [
+        ModeRunRequest(mode=mode, floorplan=plan, duration_s=60.0, seed=3, scale=0.25)
+        for mode in ("start_of_day", "lesson_changeover", "break_time")
+    ]
+
+
+def test_parallel_runs_match_serial_runs() -> None:
+    requests = _requests()
+    progress = []
+    serial = {r.mode: run_mode(r, progress.append) for r in requests}
+    parallel = run_modes_parallel(requests, workers=2)
+
+    assert progress[-1] == 1.0
+    assert list(parallel) == [r.mode for r in requests]
+    for mode, expected in serial.items():
+        got = parallel[mode]
+        assert expected is not None and got is not None
+        assert set(got.agent_metrics) == set(expected.agent_metrics)
+        for agent_id, metrics in expected.agent_metrics.items():
+            assert got.agent_metrics[agent_id].travel_time_s == pytest.approx(metrics.travel_time_s)
+        assert got.summary.max_edge_density == pytest.approx(expected.summary.max_edge_density)
+
+
+def test_prepare_mode_run_validates_mode() -> None:
+    with pytest.raises(ValueError):
+        prepare_mode_run(ModeRunRequest(mode="nope", floorplan=_plan()))
+    # Full day needs timetable periods.
+    assert prepare_mode_run(ModeRunRequest(mode="full_day", floorplan=_plan())) is None
+    model, ticks = prepare_mode_run(ModeRunRequest(mode="break_time", floorplan=_plan(), duration_s=60.0))
+    assert ticks == int(120.0 / model.config.tick_seconds)
+
+
+def test_process_run_returns_result_and_supports_pause_and_cancel() -> None:
+    request = _requests()[0]
+    expected = run_mode(request)
+
+    process = ModeRunProcess(request)
+    got = process.result(timeout=60.0)
+    assert set(got.agent_metrics) == set(expected.agent_metrics)
+    assert got.summary.mean_travel_time_s == pytest.approx(expected.summary.mean_travel_time_s)
+    assert process.status()["tick"] > 0
+
+    paused = ModeRunProcess(request)
+    paused.pause()
+    assert paused.paused
+    paused.cancel()
+    assert paused.poll()
+    with pytest.raises(RuntimeError):
+        paused.result()
+
+
+def test_mode_run_delay_is_queueing_time() -> None:
+    model, _ = prepare_mode_run(ModeRunRequest(mode="break_time", floorplan=_plan(), duration_s=60.0, seed=3))
+    while not model.is_complete:
+        model.step()
+    collector = model.finish()
+
+    # RunView semantics: delay is time spent queueing, even for agents who arrive on time.
+    queued_on_time = [a for a in model.agents if a.waiting_time_s > 0.0 and not a.is_late]
+    assert queued_on_time
+    for state in model.agents:
+        assert collector.agent_metrics[state.profile.agent_id].delay_s == state.waiting_time_s
+    with pytest.raises(ValueError):
+        SimulationConfig(tick_seconds=1.0, transition_window_s=60.0, random_seed=1, delay_metric="nope")
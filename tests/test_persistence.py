@@ -6,11 +6,17 @@ These tests verify that a run can be saved to a fresh database and read back.
 from __future__ import annotations
 
 import json
+import sqlite3
 from pathlib import Path
 
+import numpy as np
+
+from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec
 from smartflow.core.metrics import AgentMetrics, MetricsCollector
+from smartflow.core.model import SimulationConfig, SmartFlowModel
 from smartflow.io.persistence import save_current_run
 from smartflow.io.db import (
+    diff_layout_edges,
     get_dashboard_stats,
     get_or_create_cached_route,
     get_run_agent_aggregates,
@@ -101,3 +107,78 @@ def test_route_cache_round_trip(tmp_path: Path) -> None:
         key_parts=["shortest"],
     )
     assert fetched == payload
+
+
+def test_diff_layout_edges_classifies_changes() -> None:
+    old = {"AB": ["A", "B", 10.0, 2.0, False], "BC": ["B", "C", 10.0, 2.0, False], "CD": ["C", "D", 4.0, 2.0, False]}
+    new = {"AB": ["A", "B", 10.0, 1.0, False], "BC": ["B", "C", 10.0, 4.0, False], "DE": ["D", "E", 1.0, 1.0, False]}
+    worsened, improved = diff_layout_edges(old, new)
+    assert worsened == {"AB", "CD"}
+    assert improved == {"B", "D"}
+
+
+def _corridor(widths: dict) -> FloorPlan:
+    # Two independent corridors: A-B-C and X-Y-Z.
+    names = ["A", "B", "C", "X", "Y", "Z"]
+    nodes = [NodeSpec(node_id=n, label=n, kind="room", floor=0, position=(float(i), 0.0, 0.0)) for i, n in enumerate(names)]
+    edges = [
+        EdgeSpec(edge_id=u + v, source=u, target=v, length_m=10.0, width_m=widths.get(u + v, 2.0), capacity_pps=2.0)
+        for u, v in (("A", "B"), ("B", "C"), ("X", "Y"), ("Y", "Z"))
+    ]
+    return FloorPlan(nodes=nodes, edges=edges)
+
+
+def test_route_cache_survives_unrelated_layout_edits(tmp_path: Path) -> None:
+    db_path = tmp_path / "cache.db"
+
+    def open_model(widths: dict) -> SmartFlowModel:
+        config = SimulationConfig(
+            tick_seconds=0.1,
+            transition_window_s=10.0,
+            random_seed=1,
+            k_paths=1,
+            route_cache_db_path=str(db_path),
+            route_cache_layout_hash="campus",
+        )
+        return SmartFlowModel(_corridor(widths), [], config)
+
+    def cached_origins() -> list:
+        with sqlite3.connect(db_path) as conn:
+            return sorted(r[0] for r in conn.execute("SELECT origin FROM route_cache"))
+
+    model = open_model({})
+    model._route_candidates("A", "C", 0.0)
+    model._route_candidates("X", "Z", 0.0)
+    assert cached_origins() == ["A", "X"]
+
+    # Narrowing Y->Z only invalidates routes that use it.
+    open_model({"YZ": 1.0})
+    assert cached_origins() == ["A"]
+
+    # Widening B->C can only help routes whose Dijkstra ball contains B.
+    open_model({"YZ": 1.0, "BC": 3.0})
+    assert cached_origins() == []
+
+    # Unchanged layout: nothing is invalidated.
+    model = open_model({"YZ": 1.0, "BC": 3.0})
+    model._route_candidates("X", "Z", 0.0)
+    open_model({"YZ": 1.0, "BC": 3.0})
+    assert cached_origins() == ["X"]
+
+
+def test_route_dependencies_only_search_the_route_radius() -> None:
+    from smartflow.core.compiled import compile_graph, dijkstra_distances
+
+    config = SimulationConfig(tick_seconds=0.1, transition_window_s=10.0, random_seed=1)
+    model = SmartFlowModel(_corridor({}), [], config)
+    compiled = compile_graph(model.graph)
+    costs = compiled.edge_costs()
+    a, b, c = (compiled.node_index[n] for n in "ABC")
+    full = dijkstra_distances(compiled, costs, a)
+    limited = dijkstra_distances(compiled, costs, a, limit=full[b])
+    # Nodes inside the radius are settled exactly; C (beyond it) is never expanded.
+    assert np.array_equal(limited <= full[b], full <= full[b])
+    assert limited[c] > full[b]
+
+    _, dep_nodes = model._route_cache_dependencies("A", [["A", "B"]], 0.0)
+    assert dep_nodes == ["A", "B"]
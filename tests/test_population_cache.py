@@ -0,0 +1,110 @@
+"""Tests for the cached scenario compiler (`compile_population`)."""
+
+from __future__ import annotations
+
+import dataclasses
+
+import pytest
+
+from smartflow.core import population
+from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec
+from smartflow.core.population import AgentTable, compile_population, population_layout_hash
+from smartflow.core.scenario_loader import synthesise_population
+
+
+def _plan(width: float = 2.0) -> FloorPlan:
+    nodes = [
+        NodeSpec(node_id=n, label=n, kind=kind, floor=0, position=(float(i), 0.0, 0.0))
+        for i, (n, kind) in enumerate((("A", "room"), ("B", "room"), ("C", "canteen"), ("T", "toilet")))
+    ]
+    edges = [
+        EdgeSpec(edge_id=f"{u}{v}", source=u, target=v, length_m=10.0, width_m=width, capacity_pps=2.0)
+        for u, v in (("A", "B"), ("B", "C"), ("C", "T"))
+    ]
+    return FloorPlan(nodes=nodes, edges=edges)
+
+
+def _scenario() -> dict:
+    return {
+        "random_seed": 5,
+        "transition_window_s": 60,
+        "periods": [
+            {
+                "id": "P1",
+                "start_time": "09:00",
+                "movements": [
+                    {"origin": "A", "destination": "B", "count": 40},
+                    {"origin": "B", "destination": "T", "count": 5},
+                    {"origin": "A", "destination": "C", "chain_id": "c"},
+                    {"origin": "C", "destination": "A", "chain_id": "c", "delay_s": 20},
+                ],
+            }
+        ],
+    }
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(population, "_POPULATION_CACHE", {})
+
+
+def test_table_round_trips_profiles() -> None:
+    plan, scenario = _plan(), _scenario()
+    profiles = synthesise_population(scenario, plan, scale=1.5)
+    table = compile_population(plan, scenario, scale=1.5)
+
+    assert table.profiles() == profiles
+    assert AgentTable.from_json(table.to_json()).profiles() == profiles
+    assert not table.speed_base_mps.flags.writeable
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        table.agent_ids = ()  # type: ignore[misc]
+
+    departs = [p.schedule[0].depart_time_s for p in table.iter_profiles()]
+    assert departs == sorted(departs)
+    assert len(departs) == len(table)
+
+
+def test_memory_and_disk_cache_skip_generation(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    plan, scenario = _plan(), _scenario()
+    db = tmp_path / "cache.db"
+    table = compile_population(plan, scenario, db_path=db)
+    assert compile_population(plan, _scenario(), db_path=db) is table
+
+    def fail(*args, **kwargs):
+        raise AssertionError("population should come from the cache")
+
+    monkeypatch.setitem(population.POPULATION_MODES, "scenario", fail)
+    monkeypatch.setattr(population, "_POPULATION_CACHE", {})
+    # Edge edits do not change the population layout hash.
+    assert population_layout_hash(_plan(width=3.0)) == population_layout_hash(plan)
+    assert compile_population(_plan(width=3.0), scenario, db_path=db).profiles() == table.profiles()
+
+    with pytest.raises(AssertionError):
+        compile_population(plan, scenario, scale=2.0, db_path=db)
+    with pytest.raises(AssertionError):
+        compile_population(plan, scenario, seed=6, db_path=db)
+
+
+def test_procedural_modes_are_keyed_by_parameters() -> None:
+    plan = _plan()
+    short = compile_population(plan, mode="break_time", seed=1, params={"duration_s": 120.0})
+    assert compile_population(plan, mode="break_time", seed=1, params={"duration_s": 120.0}) is short
+    long = compile_population(plan, mode="break_time", seed=1, params={"duration_s": 900.0})
+    assert long is not short
+    assert max(long.depart_time_s) > max(short.depart_time_s)
+
+    assert len(compile_population(plan, mode="lesson_changeover", seed=1)) > 0
+    assert len(compile_population(plan, mode="random", seed=1, params={"count": 7})) == 7
+    with pytest.raises(ValueError):
+        compile_population(plan, mode="nope")
+
+
+def test_route_based_strategies_key_on_edge_geometry() -> None:
+    routed = _scenario()
+    routed["behaviour"] = {"departure_strategy": "minimise_bottleneck"}
+    table = compile_population(_plan(), routed)
+    assert compile_population(_plan(), routed) is table
+    # Wider corridors change the routes the strategy staggers against.
+    assert compile_population(_plan(width=3.0), routed) is not table
+    # Strategies that ignore routes still share populations across edge edits.
+    assert compile_population(_plan(width=3.0), _scenario()) is compile_population(_plan(), _scenario())
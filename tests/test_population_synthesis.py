@@ -0,0 +1,87 @@
+"""Tests for the vectorised population synthesiser."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from smartflow.core.algorithms import histogram_peak
+from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec
+from smartflow.core.scenario_loader import create_agents_from_scenario, synthesise_population
+
+
+def _plan() -> FloorPlan:
+    nodes = [
+        NodeSpec(node_id=n, label=n, kind=kind, floor=0, position=(float(i), 0.0, 0.0))
+        for i, (n, kind) in enumerate((("A", "room"), ("B", "room"), ("T", "toilet")))
+    ]
+    edges = [
+        EdgeSpec(edge_id="ab", source="A", target="B", length_m=10.0, width_m=2.0, capacity_pps=2.0),
+        EdgeSpec(edge_id="bt", source="B", target="T", length_m=5.0, width_m=2.0, capacity_pps=2.0),
+    ]
+    return FloorPlan(nodes=nodes, edges=edges)
+
+
+def _scenario(strategy: str = "minimise_peak") -> dict:
+    return {
+        "random_seed": 7,
+        "transition_window_s": 60,
+        "behaviour": {
+            "departure_strategy": strategy,
+            "speed_base_mps": {"uniform": [0.2, 3.0]},
+            "stairs_penalty": {"student": {"normal": {"mean": 2.0, "sigma": 0.5}}},
+            "reroute_interval_ticks": {"uniform": [5, 15]},
+            "depart_jitter_s": {"uniform": [0, 30]},
+        },
+        "periods": [
+            {
+                "id": "P1",
+                "start_time": "09:00",
+                "movements": [
+                    {"origin": "A", "destination": "B", "count": 300},
+                    {"origin": "B", "destination": "T", "count": 20},
+                    {"origin": "A", "destination": "GONE", "count": 5},
+                    {"origin": "A", "destination": "B", "chain_id": "c1"},
+                    {"origin": "B", "destination": "A", "chain_id": "c1", "delay_s": 30},
+                ],
+            },
+            {"id": "P2", "start_time": "09:10", "movements": [{"origin": "B", "destination": "A", "count": 10}]},
+        ],
+    }
+
+
+def test_population_is_reproducible_and_matches_legacy_structure() -> None:
+    plan = _plan()
+    scenario = _scenario()
+    first = synthesise_population(scenario, plan)
+    assert first == synthesise_population(scenario, plan)
+    assert "departure_bin_s" not in scenario["behaviour"]  # input not mutated
+
+    legacy = create_agents_from_scenario(_scenario(), plan, vectorised=False)
+    assert [a.agent_id for a in first] == [a.agent_id for a in legacy]
+    assert [[(e.origin_room, e.destination_room) for e in a.schedule][:1] for a in first] == [
+        [(e.origin_room, e.destination_room) for e in a.schedule][:1] for a in legacy
+    ]
+    # Toilet trips get a follow-up leg back to a room, as in the legacy sampler.
+    toilet = [a for a in first if a.schedule[0].destination_room == "T"]
+    assert toilet and all(len(a.schedule) == 2 and a.schedule[1].destination_room in "AB" for a in toilet)
+    chain = next(a for a in first if a.agent_id == "student_chain_c1")
+    assert chain.schedule[1].depart_time_s - chain.schedule[0].depart_time_s == pytest.approx(30.0)
+
+
+def test_population_attributes_follow_distributions() -> None:
+    agents = synthesise_population(_scenario(), _plan(), scale=2.0)
+    speeds = np.array([a.speed_base_mps for a in agents])
+    assert speeds.min() >= 0.6 and speeds.max() <= 2.2
+    assert np.mean([a.stairs_penalty for a in agents]) == pytest.approx(2.0, abs=0.1)
+    assert {a.reroute_interval_ticks for a in agents} <= set(range(5, 15))
+
+    p1 = [a.schedule[0].depart_time_s for a in agents if a.schedule[0].period == "P1" and "chain" not in a.agent_id]
+    # 640 departures over 12 bins of 5 s: round-robin keeps each bin at ceil(640 / 12).
+    assert histogram_peak(p1, bin_size=5.0) <= 54
+    p2 = [a.schedule[0].depart_time_s for a in agents if a.schedule[0].period == "P2"]
+    assert min(p2) >= 600.0
+
+    random_agents = synthesise_population(_scenario("random"), _plan())
+    jitter = [a.schedule[0].depart_time_s for a in random_agents if a.schedule[0].period == "P1"]
+    assert 0.0 <= min(jitter) and max(jitter) <= 30.0 + 30.0
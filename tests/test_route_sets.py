@@ -0,0 +1,122 @@
+"""Tests for precomputed route choice sets."""
+
+from __future__ import annotations
+
+import networkx as nx
+import pytest
+
+from smartflow.core.agents import AgentProfile, AgentScheduleEntry
+from smartflow.core.compiled import compile_graph
+from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec
+from smartflow.core.model import SimulationConfig, SmartFlowModel
+from smartflow.core.route_sets import RouteSetCache, _overlap, build_route_choice_set
+from smartflow.core.routing import compute_path_cost
+
+
+def _ladder_graph() -> nx.DiGraph:
+    """Two parallel corridors (top/bottom) joined by rungs, plus a stairs shortcut."""
+    g = nx.DiGraph()
+    for i in range(5):
+        for a, b in ((f"T{i}", f"T{i + 1}"), (f"B{i}", f"B{i + 1}")):
+            g.add_edge(a, b, length_m=10.0, width_m=2.0)
+            g.add_edge(b, a, length_m=10.0, width_m=2.0)
+    for i in range(6):
+        g.add_edge(f"T{i}", f"B{i}", length_m=4.0, width_m=2.0)
+        g.add_edge(f"B{i}", f"T{i}", length_m=4.0, width_m=2.0)
+    g.add_edge("T0", "T5", length_m=30.0, width_m=2.0, is_stairs=True)
+    return g
+
+
+def test_route_set_costs_match_compute_path_cost() -> None:
+    g = _ladder_graph()
+    route_set = build_route_choice_set(g, "T0", "T5", size=4)
+    assert 1 < len(route_set) <= 4
+
+    compiled = compile_graph(g)
+    congestion = {("T1", "T2"): 1.2, ("B3", "B4"): 0.4}
+    kwargs = dict(stairs_penalty=2.5, congestion_map=congestion, congestion_alpha=2.0, congestion_p=2.0)
+    edge_costs = compiled.edge_costs(
+        stairs_penalty=2.5,
+        congestion=compiled.congestion_array(congestion),
+        congestion_alpha=2.0,
+        congestion_p=2.0,
+    )
+
+    costs = route_set.costs(edge_costs)
+    for path, cost in zip(route_set.paths, costs):
+        assert cost == pytest.approx(compute_path_cost(g, path, **kwargs))
+
+
+def test_route_set_is_diverse_and_shared() -> None:
+    g = _ladder_graph()
+    route_set = build_route_choice_set(g, "T0", "T5", size=3, max_overlap=0.5)
+    assert len(route_set) == 3
+    compiled = compile_graph(g)
+    edges = [compiled.path_edge_indices(p).tolist() for p in route_set.paths]
+    # Only the first (shortest) route bypasses the filter here; the stairs-free route
+    # is already found by the penalty search, so the forced fallback adds nothing.
+    for j in range(1, len(edges)):
+        for i in range(j):
+            assert _overlap(edges[j], edges[i], compiled.length_m) <= 0.5
+
+    first = RouteSetCache(g, size=3).get("T0", "T5")
+    second = RouteSetCache(_ladder_graph(), size=3).get("T0", "T5")
+    assert first is second
+
+
+def test_overlap_filter_rejects_near_duplicate_routes() -> None:
+    # A long shared trunk A->B, then two short parallel branches to C: the second route
+    # shares 10 of its 12.4 m (81%) with the first.
+    g = nx.DiGraph()
+    g.add_edge("A", "B", length_m=10.0, width_m=1.0)
+    for via, length in (("X", 1.0), ("Y", 1.2)):
+        g.add_edge("B", via, length_m=length, width_m=1.0)
+        g.add_edge(via, "C", length_m=length, width_m=1.0)
+
+    loose = build_route_choice_set(g, "A", "C", size=2, max_overlap=0.9)
+    assert loose.paths == (("A", "B", "X", "C"), ("A", "B", "Y", "C"))
+    strict = build_route_choice_set(g, "A", "C", size=2, max_overlap=0.5)
+    assert strict.paths == (("A", "B", "X", "C"),)
+
+
+def test_model_reroutes_with_route_sets() -> None:
+    nodes = [
+        NodeSpec(node_id=n, label=n, kind="room" if n in "AC" else "junction", floor=0, position=pos)
+        for n, pos in (("A", (0.0, 0.0, 0.0)), ("B", (1.0, 0.0, 0.0)), ("C", (2.0, 0.0, 0.0)), ("D", (1.0, 1.0, 0.0)))
+    ]
+    edges = [
+        EdgeSpec(edge_id=u + v, source=u, target=v, length_m=1.0, width_m=2.0, capacity_pps=2.0)
+        for u, v in (("A", "B"), ("B", "C"), ("A", "D"), ("D", "C"))
+    ]
+    entry = AgentScheduleEntry(period="p", origin_room="A", destination_room="C", depart_time_s=0.0)
+    profile = AgentProfile(
+        agent_id="a1",
+        role="student",
+        speed_base_mps=1.4,
+        stairs_penalty=0.0,
+        optimality_beta=10_000.0,
+        reroute_interval_ticks=0,
+        detour_probability=0.0,
+        schedule=[entry],
+    )
+    config = SimulationConfig(
+        tick_seconds=0.1,
+        transition_window_s=10.0,
+        random_seed=1,
+        congestion_alpha=10.0,
+        reroute_hysteresis_margin=0.0,
+        reroute_delay_threshold_s=0.0,
+        route_choice_sets=True,
+    )
+
+    model = SmartFlowModel(FloorPlan(nodes=nodes, edges=edges), [profile], config)
+    assert model.route_sets is not None
+    state = model.agents[0]
+    state.active = True
+    state.route = ["A", "B", "C"]
+    state.current_edge = ("A", "B")
+    state.waiting_time_s = 999.0
+    model.congestion_map = {("A", "B"): 5.0, ("B", "C"): 5.0}
+
+    assert model._attempt_reroute(state, current_tick=1) is True
+    assert state.route[:3] == ["A", "D", "C"]
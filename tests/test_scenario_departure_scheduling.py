@@ -45,3 +45,66 @@ def test_departure_strategy_minimise_peak_flattens_departures() -> None:
     # Greedy balancing should keep the peak close to ceil(100/12) == 9.
     peak = histogram_peak(depart_times, bin_size=5.0)
     assert peak <= 10
+
+
+def _two_wing_floorplan() -> FloorPlan:
+    """Rooms N1/N2 share one staircase (J->UP) at different distances; W1->W2 is a separate wing."""
+
+    names = [("N1", "room"), ("N2", "room"), ("J", "junction"), ("UP", "room"), ("W1", "room"), ("W2", "room")]
+    nodes = [
+        NodeSpec(node_id=n, label=n, kind=kind, floor=0, position=(float(i) * 10.0, 0.0, 0.0))
+        for i, (n, kind) in enumerate(names)
+    ]
+    edges = [
+        EdgeSpec(edge_id="n1", source="N1", target="J", length_m=13.5, width_m=2.0, capacity_pps=2.0),
+        EdgeSpec(edge_id="n2", source="N2", target="J", length_m=33.75, width_m=2.0, capacity_pps=2.0),
+        EdgeSpec(edge_id="st", source="J", target="UP", length_m=5.0, width_m=1.0, capacity_pps=1.0, is_stairs=True),
+        EdgeSpec(edge_id="w", source="W1", target="W2", length_m=10.0, width_m=3.0, capacity_pps=3.0),
+    ]
+    return FloorPlan(nodes=nodes, edges=edges)
+
+
+def _stair_peak(agents, bin_s: float = 5.0) -> int:
+    # At 1.35 m/s the staircase is reached 10 s (N1) or 25 s (N2) after departing.
+    shift = {"N1": 2, "N2": 5}
+    load: dict = {}
+    for a in agents:
+        entry = a.schedule[0]
+        if entry.origin_room in shift:
+            b = int(entry.depart_time_s // bin_s) + shift[entry.origin_room]
+            load[b] = load.get(b, 0) + 1
+    return max(load.values())
+
+
+def test_minimise_bottleneck_staggers_shared_staircase() -> None:
+    floorplan = _two_wing_floorplan()
+
+    def scenario(strategy: str) -> dict:
+        return {
+            "random_seed": 2,
+            "transition_window_s": 60,
+            "behaviour": {"departure_strategy": strategy, "departure_bin_s": 5, "speed_base_mps": {"value": 1.35}},
+            "periods": [
+                {
+                    "id": "P1",
+                    "start_time": "09:00",
+                    "movements": [
+                        {"origin": "N1", "destination": "UP", "count": 60},
+                        {"origin": "N2", "destination": "UP", "count": 60},
+                        {"origin": "W1", "destination": "W2", "count": 60},
+                    ],
+                }
+            ],
+        }
+
+    flat = create_agents_from_scenario(scenario("minimise_peak"), floorplan)
+    staggered = create_agents_from_scenario(scenario("minimise_bottleneck"), floorplan)
+    assert staggered == create_agents_from_scenario(scenario("minimise_bottleneck"), floorplan)
+    assert all(0.0 <= a.schedule[0].depart_time_s <= 60.0 for a in staggered)
+
+    # 120 stair users over the 15 bins they can reach: ceil(120 / 15) == 8 instead of 10.
+    assert _stair_peak(flat) == 10
+    assert _stair_peak(staggered) == 8
+    # The separate wing only competes with itself and stays flat (60 over 12 bins).
+    wing = [a.schedule[0].depart_time_s for a in staggered if a.schedule[0].origin_room == "W1"]
+    assert histogram_peak(wing, bin_size=5.0) == 5
@@ -0,0 +1,74 @@
+"""Tests for stairs-penalty classes (shared routing across similar agents)."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from smartflow.core.agents import AgentProfile, AgentScheduleEntry
+from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec
+from smartflow.core.model import SimulationConfig, SmartFlowModel
+from smartflow.core.routing import stairs_penalty_classes
+
+
+def test_classes_respect_count_and_minimise_error() -> None:
+    rnd = random.Random(5)
+    penalties = [rnd.uniform(0.0, 10.0) for _ in range(500)]
+    mapping, error = stairs_penalty_classes(penalties, 4)
+
+    assert len(set(mapping.values())) <= 4
+    assert max(abs(p - mapping[p]) for p in penalties) == pytest.approx(error)
+    # Four equal-width intervals would already achieve range / 8.
+    assert error <= (max(penalties) - min(penalties)) / 8 + 1e-9
+
+
+def test_classes_are_exact_when_few_distinct_values() -> None:
+    mapping, error = stairs_penalty_classes([0.0, 2.0, 2.0, 5.0], 3)
+    assert mapping == {0.0: 0.0, 2.0: 2.0, 5.0: 5.0}
+    assert error == 0.0
+
+
+def _two_floor_plan() -> FloorPlan:
+    # A -> C either flat (long corridor) or via a short stair detour.
+    nodes = [
+        NodeSpec(node_id="A", label="A", kind="room", floor=0, position=(0.0, 0.0, 0.0)),
+        NodeSpec(node_id="C", label="C", kind="room", floor=0, position=(4.0, 0.0, 0.0)),
+        NodeSpec(node_id="B", label="B", kind="junction", floor=0, position=(2.0, -1.0, 0.0)),
+        NodeSpec(node_id="U", label="U", kind="junction", floor=1, position=(2.0, 1.0, 3.0)),
+    ]
+    edges = [
+        EdgeSpec(edge_id="AB", source="A", target="B", length_m=6.0, width_m=1.0, capacity_pps=2.0),
+        EdgeSpec(edge_id="BC", source="B", target="C", length_m=6.0, width_m=1.0, capacity_pps=2.0),
+        EdgeSpec(edge_id="AU", source="A", target="U", length_m=3.0, width_m=1.0, capacity_pps=2.0, is_stairs=True),
+        EdgeSpec(edge_id="UC", source="U", target="C", length_m=3.0, width_m=1.0, capacity_pps=2.0, is_stairs=True),
+    ]
+    return FloorPlan(nodes=nodes, edges=edges)
+
+
+def test_model_shares_candidates_within_bound() -> None:
+    profiles = [
+        AgentProfile(
+            agent_id=f"a{i}",
+            role="student",
+            speed_base_mps=1.4,
+            stairs_penalty=0.1 * i,
+            optimality_beta=10_000.0,
+            reroute_interval_ticks=0,
+            detour_probability=0.0,
+            schedule=[AgentScheduleEntry(period="p", origin_room="A", destination_room="C", depart_time_s=0.0)],
+        )
+        for i in range(40)
+    ]
+    config = SimulationConfig(tick_seconds=0.1, transition_window_s=10.0, random_seed=2, stairs_penalty_classes=3)
+    model = SmartFlowModel(_two_floor_plan(), profiles, config)
+    model._activate_agents()
+
+    assert len(model._candidate_cache) <= 3
+    assert 0.0 < model.penalty_class_error <= (3.9 / 6) + 1e-9
+    for state in model.agents:
+        penalty = state.profile.stairs_penalty
+        exact = min(model._path_cost(p, penalty) for p in (["A", "B", "C"], ["A", "U", "C"]))
+        chosen = model._path_cost(state.route, penalty)
+        # Both routes differ by two stairs edges.
+        assert chosen - exact <= 2 * model.penalty_class_error + 1e-9
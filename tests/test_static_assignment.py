@@ -0,0 +1,66 @@
+"""Tests for the static traffic assignment estimator."""
+
+from __future__ import annotations
+
+import networkx as nx
+import pytest
+
+from smartflow.core.assignment import assign_scenario, od_demand_from_scenario, static_assignment
+
+
+def _parallel_routes() -> nx.DiGraph:
+    # A -> C through a wide corridor (via B) or a narrow, shorter one (via D).
+    g = nx.DiGraph()
+    g.add_edge("A", "B", length_m=10.0, width_m=3.0)
+    g.add_edge("B", "C", length_m=10.0, width_m=3.0)
+    g.add_edge("A", "D", length_m=8.0, width_m=1.5)
+    g.add_edge("D", "C", length_m=8.0, width_m=1.5)
+    return g
+
+
+@pytest.mark.parametrize("method", ["frank_wolfe", "msa"])
+def test_equilibrium_equalises_used_route_costs(method: str) -> None:
+    g = _parallel_routes()
+    result = static_assignment(
+        g, {("A", "C"): 1000.0}, window_s=60.0, congestion_alpha=1.0, method=method, max_iterations=200, tolerance=1e-4
+    )
+    via_b = result.costs[("A", "B")] + result.costs[("B", "C")]
+    via_d = result.costs[("A", "D")] + result.costs[("D", "C")]
+
+    assert result.volumes[("A", "B")] + result.volumes[("A", "D")] == pytest.approx(1000.0)
+    assert result.volumes[("A", "B")] > 0 and result.volumes[("A", "D")] > 0
+    assert via_b == pytest.approx(via_d, rel=2e-2)
+    assert result.relative_gap < 1e-2
+    # Ratio is volume / (window * speed * width * jam).
+    assert result.ratios[("A", "D")] == pytest.approx(result.volumes[("A", "D")] / (60.0 * 1.35 * 1.5 * 2.5))
+
+
+def test_free_flow_is_all_or_nothing_and_reports_unroutable() -> None:
+    g = _parallel_routes()
+    g.add_node("Z")
+    result = static_assignment(g, {("A", "C"): 10.0, ("A", "Z"): 3.0, ("A", "Q"): 1.0}, window_s=60.0, congestion_alpha=0.0)
+    assert result.volumes[("A", "B")] == pytest.approx(10.0)
+    assert result.volumes[("A", "D")] == 0.0
+    assert set(result.unassigned) == {("A", "Z"), ("A", "Q")}
+
+
+def test_scenario_demand_and_assignment() -> None:
+    scenario = {
+        "transition_window_s": 120,
+        "periods": [
+            {"id": "p1", "movements": [{"origin": "A", "destination": "C", "count": 30}]},
+            {
+                "id": "p2",
+                "movements": [
+                    {"origin": "A", "destination": "C", "count": 99, "chain_id": "x"},
+                    {"origin": "C", "destination": "C", "count": 5},
+                ],
+            },
+        ],
+    }
+    assert od_demand_from_scenario(scenario, scale=2.0) == {("A", "C"): 61.0}
+    assert od_demand_from_scenario(scenario, period_index=1) == {("A", "C"): 1.0}
+
+    result = assign_scenario(_parallel_routes(), scenario)
+    assert result.volumes[("A", "B")] + result.volumes[("A", "D")] == pytest.approx(31.0)
+    assert result.overloaded(threshold=0.0)[0][1] == max(result.ratios.values())
@@ -0,0 +1,120 @@
+"""Tests for streaming (departure-ordered) agent populations."""
+
+from __future__ import annotations
+
+import pytest
+
+from smartflow.core.model import SimulationConfig, SmartFlowModel
+from smartflow.core.population import compile_population
+from smartflow.core.scenario_loader import departure_ordered, iter_agents_from_scenario, synthesise_population
+
+from .plans import corridor_plan
+
+
+def _scenario() -> dict:
+    return {
+        "random_seed": 3,
+        "transition_window_s": 60,
+        "behaviour": {"stairs_penalty": {"student": {"uniform": [0.0, 4.0]}}},
+        "periods": [
+            {
+                "id": "P1",
+                "start_time": "09:00",
+                "movements": [
+                    {"origin": "A", "destination": "C", "count": 20},
+                    {"origin": "C", "destination": "A", "count": 10},
+                    {"origin": "A", "destination": "B", "chain_id": "c1"},
+                    {"origin": "B", "destination": "C", "chain_id": "c1", "delay_s": 30},
+                ],
+            },
+            {"id": "P2", "start_time": "09:20", "movements": [{"origin": "B", "destination": "A", "count": 15}]},
+            {"id": "P3", "start_time": "09:10", "movements": [{"origin": "C", "destination": "B", "count": 5}]},
+        ],
+    }
+
+
+def _config(**kwargs) -> SimulationConfig:
+    return SimulationConfig(tick_seconds=1.0, transition_window_s=1500.0, random_seed=1, k_paths=1, **kwargs)
+
+
+def test_stream_matches_population_in_departure_order() -> None:
+    plan, scenario = corridor_plan(), _scenario()
+    streamed = list(iter_agents_from_scenario(scenario, plan))
+    population = synthesise_population(scenario, plan)
+
+    assert sorted(a.agent_id for a in streamed) == sorted(a.agent_id for a in population)
+    departs = [a.schedule[0].depart_time_s for a in streamed]
+    assert departs == sorted(departs)
+    by_id = {a.agent_id: a for a in population}
+    assert all(by_id[a.agent_id] == a for a in streamed)
+
+
+def test_streaming_run_matches_eager_run_with_bounded_state() -> None:
+    plan, scenario = corridor_plan(), _scenario()
+    eager = SmartFlowModel(plan, list(iter_agents_from_scenario(scenario, plan)), _config())
+    eager_metrics = eager.run().agent_metrics
+
+    streaming = SmartFlowModel(plan, iter_agents_from_scenario(scenario, plan), _config(agent_lookahead_s=5.0))
+    peak = 0
+    while not streaming.is_complete:
+        streaming.step()
+        peak = max(peak, len(streaming.agents))
+    collector = streaming.run()
+
+    assert peak < len(eager_metrics)
+    assert streaming.retired_agents == len(eager_metrics)
+    assert set(collector.agent_metrics) == set(eager_metrics)
+    for agent_id, metrics in eager_metrics.items():
+        assert collector.agent_metrics[agent_id].travel_time_s == pytest.approx(metrics.travel_time_s)
+        assert collector.agent_metrics[agent_id].path_nodes == metrics.path_nodes
+
+
+def test_stream_must_be_ordered_by_departure() -> None:
+    plan = corridor_plan()
+    agents = list(iter_agents_from_scenario(_scenario(), plan))
+    with pytest.raises(ValueError):
+        SmartFlowModel(plan, iter(agents[::-1]), _config(agent_lookahead_s=1e9))
+
+    # `departure_ordered` is the streaming form for pre-built lists.
+    model = SmartFlowModel(plan, departure_ordered(agents[::-1]), _config())
+    assert model.run().summary.mean_travel_time_s is not None
+
+
+def test_streamed_penalty_classes_stay_within_limit() -> None:
+    plan = corridor_plan()
+    model = SmartFlowModel(plan, iter_agents_from_scenario(_scenario(), plan), _config(stairs_penalty_classes=3))
+    model.run()
+    assert len(set(model._penalty_classes.values())) <= 3
+    assert all(abs(p - c) <= model.penalty_class_error + 1e-12 for p, c in model._penalty_classes.items())
+
+
+@pytest.mark.parametrize("classes", [3, 8])
+def test_streamed_penalties_are_classified_from_the_whole_population(classes: int) -> None:
+    plan, scenario = corridor_plan(), _scenario()
+    config = _config(stairs_penalty_classes=classes)
+    eager = SmartFlowModel(plan, synthesise_population(scenario, plan), config)
+    table = compile_population(plan, scenario)
+    streamed = SmartFlowModel(plan, table.iter_profiles(), config, stairs_penalties=table.stairs_penalty)
+    streamed.run()
+
+    assert streamed.penalty_class_error == pytest.approx(eager.penalty_class_error)
+    assert sorted(set(streamed._penalty_classes.values())) == sorted(set(eager._penalty_classes.values()))
+
+
+def test_finish_records_stream_remainder_and_unfinished_movements() -> None:
+    plan, scenario = corridor_plan(), _scenario()
+    population = synthesise_population(scenario, plan)
+    model = SmartFlowModel(plan, iter_agents_from_scenario(scenario, plan), _config(agent_lookahead_s=5.0))
+    # Stop part-way through, as RunView and headless mode runs do when their ticks run out.
+    while not any(agent.active and not agent.completed for agent in model.agents):
+        model.step()
+    walking = {agent.profile.agent_id for agent in model.agents if agent.active and not agent.completed}
+    assert model._next_profile is not None
+
+    collector = model.finish()
+    assert set(collector.agent_metrics) == {agent.agent_id for agent in population}
+    unfinished = {m.agent_id for m in collector.movements if m.arrival_s is None}
+    assert unfinished == walking
+    assert all(collector.agent_metrics[agent_id].is_late for agent_id in walking)
+    recorded = len(collector.movements)
+    assert model.finish() is collector and len(collector.movements) == recorded
@@ -0,0 +1,81 @@
+"""Tests for per-floor render buckets and viewport culling over an edge grid."""
+
+from __future__ import annotations
+
+import numpy as np
+
+from smartflow.core.floorplan import EdgeSpec, FloorPlan, NodeSpec
+from smartflow.core.model import SimulationConfig, SmartFlowModel
+from smartflow.core.scenario_loader import synthesise_population
+from smartflow.core.snapshots import RenderBuffer
+from smartflow.viz.viewport import EdgeGrid
+
+
+def _two_floor_model() -> SmartFlowModel:
+    spec = {"A0": 0, "B0": 0, "S0": 0, "S1": 1, "A1": 1, "B1": 1}
+    nodes = [
+        NodeSpec(node_id=n, label=n, kind="room", floor=f, position=(float(i % 3) * 10.0, 0.0, float(f)))
+        for i, (n, f) in enumerate(spec.items())
+    ]
+    pairs = [("A0", "B0"), ("B0", "S0"), ("S0", "S1"), ("S1", "A1"), ("A1", "B1")]
+    edges = []
+    for u, v in pairs:
+        for a, b in ((u, v), (v, u)):
+            edges.append(
+                EdgeSpec(
+                    edge_id=f"{a}{b}", source=a, target=b, length_m=10.0, width_m=2.0,
+                    capacity_pps=2.0, is_stairs=(a[0] == b[0] == "S"),
+                )
+            )
+    plan = FloorPlan(nodes=nodes, edges=edges)
+    scenario = {
+        "random_seed": 5,
+        "transition_window_s": 20,
+        "periods": [
+            {
+                "id": "P1",
+                "start_time": "09:00",
+                "movements": [
+                    {"origin": "A0", "destination": "B1", "count": 20},
+                    {"origin": "B1", "destination": "A0", "count": 20},
+                ],
+            }
+        ],
+    }
+    config = SimulationConfig(tick_seconds=0.5, transition_window_s=300.0, random_seed=1, k_paths=1)
+    return SmartFlowModel(plan, synthesise_population(scenario, plan), config)
+
+
+def test_snapshot_rows_are_bucketed_by_floor() -> None:
+    model = _two_floor_model()
+    buffer = RenderBuffer(model)
+    model.render_buffer = buffer
+    for _ in range(30):
+        model.step()
+
+    everything = buffer.latest()
+    per_floor = {f: buffer.latest(floor=f) for f in (0, 1)}
+    assert len(per_floor[0]) and len(per_floor[1])
+    assert len(per_floor[0]) + len(per_floor[1]) == len(everything)
+    for floor, snapshot in per_floor.items():
+        assert snapshot.floor == floor
+        assert all(model.graph.nodes[buffer.edge_keys[e][0]]["floor"] == floor for e in snapshot.edge)
+    assert sorted(everything.agent_key.tolist()) == sorted(
+        per_floor[0].agent_key.tolist() + per_floor[1].agent_key.tolist()
+    )
+    assert len(buffer.latest(floor=7)) == 0
+
+
+def test_edge_grid_returns_edges_overlapping_the_viewport() -> None:
+    # Three horizontal edges far apart, plus one leaving the floor (no end point).
+    x1 = np.array([0.0, 1000.0, 5000.0, 40.0, np.nan])
+    y1 = np.array([0.0, 0.0, 3000.0, 40.0, np.nan])
+    x2 = np.array([100.0, 1100.0, 5100.0, np.nan, 0.0])
+    y2 = np.array([0.0, 0.0, 3000.0, np.nan, 0.0])
+    grid = EdgeGrid(x1, y1, x2, y2, np.full(5, 4.0), cell_px=128.0)
+
+    assert grid.visible(0, 0, 800, 600).tolist() == [True, False, False, True, False]
+    assert grid.visible(900, -50, 800, 600).tolist() == [False, True, False, False, False]
+    assert grid.visible(4900, 2900, 300, 300).tolist() == [False, False, True, False, False]
+    # Zoomed far out: every indexed edge is visible.
+    assert grid.visible(-1e6, -1e6, 2e6, 2e6).tolist() == [True, True, True, True, False]